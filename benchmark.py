@@ -0,0 +1,135 @@
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Optional
+
+RESULT_FIELDS = ["instance", "engine", "method", "status", "objective", "bound", "gap", "time_to_first_solution",
+                 "runtime", "wall_time", "peak_rss_mb", "cache_hits", "cache_misses", "verified", "cpus", "error"]
+
+def _redirect_output(log_path: str):
+    """Leitet stdout/stderr des Worker-Prozesses (auch die Gurobi-Ausgabe auf C-Ebene) in eine Datei um."""
+    sys.stdout.flush(); sys.stderr.flush()
+    fd = os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    os.dup2(fd, 1); os.dup2(fd, 2)
+    os.close(fd)
+
+def run_single(instance_path: str, engine: str, time_limit: int, threads: int, workers: int,
+               cpu_slots, log_dir: Optional[str], method: str = "auto") -> dict:
+    """Löst eine Instanz in einem eigenen Prozess und misst Wandzeit und Speicherspitze.
+
+    Die besten Lösungen werden dabei mit dem Verifier geprüft (Spalte "verified").
+
+    Der Prozess belegt für die Dauer des Laufs einen CPU-Slot aus cpu_slots (oder None
+    ohne Pinning), damit parallele Läufe sich nicht gegenseitig die Kerne wegnehmen.
+    """
+    cpus = cpu_slots.get() if cpu_slots is not None else None
+    result = {"instance": instance_path, "engine": engine, "status": "ok", "error": None,
+              "cpus": " ".join(map(str, cpus)) if cpus else None}
+    try:
+        if cpus and hasattr(os, "sched_setaffinity"): os.sched_setaffinity(0, cpus)
+        if log_dir:
+            _redirect_output(os.path.join(log_dir, os.path.splitext(os.path.basename(instance_path))[0] + ".log"))
+        from lbbd_main import solve_instance
+
+        start = time.perf_counter()
+        summary = solve_instance(instance_path, time_limit, engine=engine, workers=workers, threads=threads, verify=True,
+                                 method=method)
+        result["wall_time"] = time.perf_counter() - start
+        result.update({key: summary.get(key) for key in RESULT_FIELDS if key in summary})
+        if result["objective"] is None: result["status"] = "no_solution"
+    except Exception as e:
+        result.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+        traceback.print_exc()
+    finally:
+        if cpus is not None: cpu_slots.put(cpus)
+    # ru_maxrss ist unter Linux in KiB angegeben
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+def cpu_slot_sets(jobs: int, threads: int) -> List[List[int]]:
+    """Teilt die verfügbaren CPUs in 'jobs' disjunkte Blöcke zu je 'threads' Kernen auf."""
+    available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    if jobs * threads > len(available): return []
+    return [available[i * threads:(i + 1) * threads] for i in range(jobs)]
+
+def run_benchmark(pattern: str, engine: str, time_limit: int, threads: int, jobs: int, workers: int = 1,
+                  pin: bool = True, log_dir: Optional[str] = None, method: str = "auto") -> List[dict]:
+    """Führt alle Instanzen, die auf 'pattern' passen, in einem Prozesspool aus.
+
+    Jeder Lauf bekommt einen frischen Prozess (max_tasks_per_child=1), damit globale Solver-Zustände
+    und die Speicherspitze nicht zwischen Instanzen geteilt werden.
+    """
+    instances = sorted(glob.glob(pattern))
+    if not instances: raise FileNotFoundError(f"Keine Instanzen gefunden für: {pattern}")
+    if log_dir: os.makedirs(log_dir, exist_ok=True)
+    print(f"Benchmark: {len(instances)} Instanzen, Engine {engine}, {jobs} parallele Läufe à {threads} Threads")
+
+    ctx = multiprocessing.get_context("spawn")
+    manager, cpu_slots = None, None
+    slots = cpu_slot_sets(jobs, threads) if pin else []
+    if pin and not slots:
+        print("  -> Warnung: Zu wenige CPUs für das Pinning, Läufe werden nicht gebunden.")
+    if slots:
+        manager = ctx.Manager()
+        cpu_slots = manager.Queue()
+        for cpus in slots: cpu_slots.put(cpus)
+
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx, max_tasks_per_child=1) as pool:
+            futures = {pool.submit(run_single, path, engine, time_limit, threads, workers, cpu_slots, log_dir, method): path
+                       for path in instances}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:  # z.B. abgestürzter Worker-Prozess
+                    result = {"instance": futures[future], "engine": engine, "status": "error", "error": repr(e)}
+                results.append(result)
+                print(f"  [{len(results)}/{len(instances)}] {os.path.basename(result['instance'])}: "
+                      f"{result['status']}, Ziel {result.get('objective')}, Wandzeit {result.get('wall_time') or 0:.1f}s")
+    finally:
+        if manager is not None: manager.shutdown()
+    results.sort(key=lambda r: r["instance"])
+    return results
+
+def write_results(results: List[dict], csv_path: Optional[str] = None, json_path: Optional[str] = None):
+    if csv_path:
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for result in results: writer.writerow(result)
+        print(f"✓ Ergebnisse in '{csv_path}' gespeichert.")
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump([{key: r.get(key) for key in RESULT_FIELDS} for r in results], f, indent=4)
+        print(f"✓ Ergebnisse in '{json_path}' gespeichert.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reproduzierbarer Benchmark des LBBD-Solvers über mehrere Instanzen.")
+    parser.add_argument("pattern", nargs="?", default="data/displib_instances_phase1/line*.json",
+                        help="Glob-Muster der Instanzen")
+    parser.add_argument("--engine", choices=["longest_path", "gurobi", "z3", "portfolio"], default="longest_path")
+    parser.add_argument("--method", choices=["lbbd", "monolithic", "auto"], default="auto")
+    parser.add_argument("--time-limit", type=int, default=600, help="Zeitlimit je Instanz in Sekunden")
+    parser.add_argument("--threads", type=int, default=1, help="Threads je Lauf (Gurobi-Master und CPU-Pinning)")
+    parser.add_argument("--jobs", type=int, default=None, help="Parallele Läufe (Standard: CPUs / threads)")
+    parser.add_argument("--workers", type=int, default=1, help="Threads für das zerlegte Subproblem je Lauf")
+    parser.add_argument("--no-pin", action="store_true", help="Läufe nicht an CPUs binden")
+    parser.add_argument("--csv", default="benchmark_results.csv", help="Pfad der CSV-Ausgabe ('' = keine)")
+    parser.add_argument("--json", default=None, help="Pfad der JSON-Ausgabe")
+    parser.add_argument("--log-dir", default="benchmark_logs", help="Verzeichnis für die Solver-Logs je Instanz")
+    args = parser.parse_args()
+
+    jobs = args.jobs or max(1, (os.cpu_count() or 1) // args.threads)
+    results = run_benchmark(args.pattern, args.engine, args.time_limit, args.threads, jobs,
+                            workers=args.workers, pin=not args.no_pin, log_dir=args.log_dir or None,
+                            method=args.method)
+    write_results(results, csv_path=args.csv or None, json_path=args.json)
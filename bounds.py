@@ -0,0 +1,68 @@
+import numpy as np
+import model
+import time_windows
+
+def planning_horizon(problem: model.ProblemInstance) -> float:
+    """Obere Schranke für alle Startzeiten einer optimalen Lösung.
+
+    Bei fester Pfadwahl und Reihenfolge ist der früheste Zeitplan (jede Operation so früh wie
+    möglich) zulässig, wenn es überhaupt ein zulässiger ist, und wegen der monotonen Zielfunktion
+    optimal. Jede Startzeit darin ist ein längster Weg ab einem start_lb, auf dem jede Operation
+    höchstens einmal mit ihrer Dauer bzw. ihrer größten Release-Zeit vorkommt.
+    """
+    a = problem.arrays
+    if not a.num_operations: return 0.0
+    release = np.zeros(a.num_operations)
+    np.maximum.at(release, np.repeat(np.arange(a.num_operations), np.diff(a.res_ptr)), a.res_release)
+    return float(a.start_lb.max() + a.min_duration.sum() + release.sum())
+
+def objective_floor(problem: model.ProblemInstance, windows: time_windows.TimeWindows) -> float:
+    """Untere Schranke für den Zielfunktionswert: Kosten der Komponenten zu ihren frühesten Startzeiten.
+
+    Es zählen nur Komponenten auf Operationen, die jeder Weg besucht; die übrigen kosten nichts,
+    wenn der gewählte Weg sie umgeht.
+    """
+    a = problem.arrays
+    mandatory = windows.mandatory_operations()
+    return float(sum(obj.cost(windows.earliest[g]) for obj in problem.objective_components
+                     for g in [a.gid(obj.train, obj.operation)] if mandatory[g]))
+
+class BigM:
+    """Kleinste gültige Big-M-Werte je Constraint aus der Zeitfenster-Propagation.
+
+    Startzeiten liegen in [earliest, latest] (latest ohne start_ub durch planning_horizon begrenzt).
+    Eine über Binärvariablen abschaltbare Constraint lhs >= rhs braucht als M nur das Maximum von
+    rhs - lhs über diese Zeitfenster. Optimalitäts-Cuts senken theta nie unter objective_floor,
+    daher reicht dort Zielwert minus objective_floor als Koeffizient.
+    """
+    def __init__(self, problem: model.ProblemInstance, windows: time_windows.TimeWindows):
+        self.problem = problem
+        self.horizon = planning_horizon(problem)
+        self.earliest = windows.earliest
+        self.latest = np.minimum(windows.latest, self.horizon)
+        self.objective_floor = objective_floor(problem, windows)
+
+    def window(self, t_idx: int, o_idx: int):
+        g = self.problem.arrays.gid(t_idx, o_idx)
+        return float(self.earliest[g]), float(self.latest[g])
+
+    def precedence(self, t_idx: int, o_idx: int, s_idx: int) -> float:
+        """M für x[t, s] >= x[t, o] + Dauer, abgeschaltet wenn s nicht gewählt ist."""
+        duration = self.problem.trains[t_idx].operations[o_idx].min_duration
+        return max(0.0, self.window(t_idx, o_idx)[1] + duration - self.window(t_idx, s_idx)[0])
+
+    def conflict(self, t1: int, s1: int, release: float, t2: int, o2: int) -> float:
+        """M für x[t2, o2] >= x[t1, s1] + Release, abgeschaltet bei anderer Reihenfolge oder anderem Nachfolger s1."""
+        return max(0.0, self.window(t1, s1)[1] + release - self.window(t2, o2)[0])
+
+    def delay(self, obj: model.ObjectiveComponent) -> float:
+        """M für delay >= x - threshold, abgeschaltet wenn die Operation nicht auf dem Weg liegt."""
+        return max(0.0, self.window(obj.train, obj.operation)[1] - obj.threshold)
+
+    def late(self, obj: model.ObjectiveComponent) -> float:
+        """M für x <= threshold - 1 + M * late (Sprungkosten der Komponente)."""
+        return max(0.0, self.window(obj.train, obj.operation)[1] - obj.threshold + 1)
+
+    def cut_coefficient(self, objective_value: float, coefficient: float) -> float:
+        """Koeffizient einer Master-Variablen im Optimalitäts-Cut, begrenzt auf die mögliche Zielwertsenkung."""
+        return min(coefficient, max(0.0, objective_value - self.objective_floor))
@@ -0,0 +1,65 @@
+from typing import Hashable, List, Optional, Sequence, Tuple
+from subproblem_longest_path import TimingNetwork
+
+DEFAULT_MAX_CHECKS = 20
+
+def extract_conflict(lb: List[int], ub: List[float], fixed_edges: Sequence[Tuple[int, int, int]],
+                     switchable_edges: Sequence[Tuple[int, int, int, Hashable]],
+                     max_checks: int = DEFAULT_MAX_CHECKS) -> Optional[List[Hashable]]:
+    """Kleiner Konflikt eines unzulässigen Zeitplanungsnetzes als Liste von Schlüsseln schaltbarer Kanten.
+
+    Kanten sind (src, dst, weight) für x[dst] >= x[src] + weight; die festen gelten immer, die
+    schaltbaren tragen zusätzlich ihren Schlüssel. Die Longest-Path-Suche liefert einen Zyklus
+    (auch mit Gewicht 0, siehe TimingNetwork.solve) oder eine Kette, die ein start_ub verletzt; deren schaltbare Kanten sind der erste
+    Konflikt. Ein Deletion-Filter versucht danach, jeden Schlüssel einzeln wegzulassen: Bleibt das
+    Netz aus den festen und den übrigen Konfliktkanten unzulässig, wird der Konflikt auf die
+    Kanten des neuen Zyklus verkleinert. max_checks begrenzt die Anzahl dieser Prüfungen.
+
+    Gibt None zurück, wenn das Netz zulässig ist, und eine leere Liste, wenn der Konflikt nur aus
+    festen Kanten und Zeitfenstern besteht.
+    """
+    conflict = _find_conflict(lb, ub, fixed_edges, switchable_edges)
+    if conflict is None or len(conflict) < 2 or max_checks <= 0: return conflict
+    edges = {edge[3]: edge for edge in switchable_edges}
+    # Jeder kleinere Konflikt liegt im Zusammenhang der Konfliktkanten; nur dieser Teil wird geprüft
+    lb, ub, fixed_edges, edges = _restrict(lb, ub, fixed_edges, [edges[key] for key in conflict])
+    checks = 0
+    for key in list(conflict):
+        if checks >= max_checks: break
+        if key not in conflict or len(conflict) == 1: continue
+        checks += 1
+        smaller = _find_conflict(lb, ub, fixed_edges, [edges[k] for k in conflict if k != key])
+        if smaller is not None: conflict = smaller
+    return conflict
+
+def _find_conflict(lb: List[int], ub: List[float], fixed_edges: Sequence[Tuple[int, int, int]],
+                   switchable_edges: Sequence[Tuple[int, int, int, Hashable]]) -> Optional[List[Hashable]]:
+    network = TimingNetwork(lb, ub)
+    for src, dst, weight in fixed_edges:
+        network.add_edge(src, dst, weight)
+    for src, dst, weight, key in switchable_edges:
+        network.add_edge(src, dst, weight, [key])
+    conflict_edges = network.solve()
+    if conflict_edges is None: return None
+    return list(dict.fromkeys(key for e in conflict_edges for key in (network.tags[e] or ())))
+
+def _restrict(lb: List[int], ub: List[float], fixed_edges: Sequence[Tuple[int, int, int]],
+              conflict_edges: List[Tuple[int, int, int, Hashable]]) -> tuple:
+    """Teilnetz der Zusammenhangskomponenten (über feste und Konfliktkanten), die Konfliktkanten enthalten."""
+    parent = list(range(len(lb)))
+
+    def find(v: int) -> int:
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+
+    for src, dst, *_ in list(fixed_edges) + conflict_edges:
+        r1, r2 = find(src), find(dst)
+        if r1 != r2: parent[r1] = r2
+    roots = {find(edge[0]) for edge in conflict_edges}
+    nodes = [v for v in range(len(lb)) if find(v) in roots]
+    index = {v: i for i, v in enumerate(nodes)}
+    fixed = [(index[src], index[dst], weight) for src, dst, weight in fixed_edges if src in index]
+    edges = {key: (index[src], index[dst], weight, key) for src, dst, weight, key in conflict_edges}
+    return [lb[v] for v in nodes], [ub[v] for v in nodes], fixed, edges
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+from typing import Dict, Optional, Set, Tuple
+import gurobipy as gp
+import cuts
+import model
+
+POOL_VERSION = 1
+
+# Ein Literal ist ("y", t1, o1, t2, o2) oder ("z", t, o, s); ein Cut verbietet, dass alle seine Literale gelten
+Literal = Tuple
+
+def train_fingerprint(problem: model.ProblemInstance, t: int) -> str:
+    """Hash der Daten von Zug t (Zeitfenster, Dauern, Nachfolger, Ressourcen mit Release-Zeiten)."""
+    ops = [[op.start_lb, op.start_ub if op.start_ub < float('inf') else None, op.min_duration,
+            op.successors, [[r["resource"], r["release_time"]] for r in op.resources]]
+           for op in problem.trains[t].operations]
+    return hashlib.sha256(json.dumps(ops).encode("utf-8")).hexdigest()
+
+def literal_trains(literal: Literal) -> Tuple[int, ...]:
+    return (literal[1], literal[3]) if literal[0] == "y" else (literal[1],)
+
+def variable_literals(master) -> Dict[gp.Var, Literal]:
+    """Literal je y/z-Variable eines Master-Modells."""
+    literals = {var: ("y",) + key for key, var in master.y.items()}
+    literals.update({var: ("z",) + key for key, var in master.z.items()})
+    return literals
+
+def renumber_literal(literal: Literal, trains: Dict[int, int]) -> Optional[Literal]:
+    """Literal mit umnummerierten Zügen (alt -> neu), None falls ein Zug entfallen ist."""
+    if any(t not in trains for t in literal_trains(literal)): return None
+    if literal[0] == "y": return ("y", trains[literal[1]], literal[2], trains[literal[3]], literal[4])
+    return ("z", trains[literal[1]], literal[2], literal[3])
+
+class CutPool:
+    """Persistenter Vorrat an Feasibility-Cuts über wiederholte Läufe auf demselben Netz.
+
+    Die Cuts werden über die Schlüssel ihrer Master-Variablen gespeichert, nicht über die
+    Gurobi-Objekte, und beim Hinzufügen dedupliziert. Ein Konflikt des Subproblems ist eine Kette
+    aus Kanten der beteiligten Züge; zu jedem Cut wird daher der Fingerabdruck der Züge seiner
+    Variablen abgelegt. Beim Laden in ein Master-Modell entfallen Cuts, deren Züge sich geändert
+    haben oder deren Variablen es nicht mehr gibt (z.B. durch die Zeitfenster-Propagation).
+    Mit lazy werden die Cuts als Lazy Constraints (Lazy = 1) statt als feste Constraints übernommen.
+    """
+    def __init__(self, lazy: bool = False):
+        self.lazy = lazy
+        self.cuts: Dict[frozenset, Dict[int, str]] = {}  # Literale -> {Zug: Fingerabdruck}
+        self.added = 0  # Im aktuellen Lauf neu aufgenommene Cuts
+        self._fingerprints: Dict[int, str] = {}
+        self._master = None
+        self._key_map: Dict[gp.Var, Literal] = {}
+        self._applied: Set[frozenset] = set()  # Bereits in das aktuelle Master-Modell übernommene Cuts
+
+    def __len__(self) -> int:
+        return len(self.cuts)
+
+    def add(self, cut: cuts.Cut, master) -> bool:
+        """Nimmt einen Feasibility-Cut (auch innerhalb eines CombinedCut) auf; True, falls neu."""
+        if isinstance(cut, cuts.CombinedCut):
+            return any([self.add(c, master) for c in cut.cuts])
+        if not isinstance(cut, cuts.FeasibilityCut) or not cut.conflict_vars: return False
+        keys = self._keys(master)
+        literals = frozenset(keys[v] for v in cut.conflict_vars)
+        if literals in self.cuts: return False
+        trains = {t for literal in literals for t in literal_trains(literal)}
+        self.cuts[literals] = {t: self._fingerprint(master.problem, t) for t in trains}
+        self.added += 1
+        return True
+
+    def apply(self, master, check_trains: bool = True) -> int:
+        """Fügt die noch gültigen Cuts dem Master-Modell hinzu und gibt deren Anzahl zurück.
+
+        Cuts, die bereits in dieses Master-Modell übernommen wurden, entfallen. Ohne check_trains
+        werden die Fingerabdrücke nicht geprüft; das ist zulässig, wenn die Zeitfenster seit der
+        Entstehung der Cuts nur enger geworden sind (siehe reoptimization).
+        """
+        variables = {literal: var for var, literal in self._keys(master).items()}
+        self._fingerprints = {}  # Die Instanz kann sich seit dem letzten Aufruf geändert haben
+        num_trains = len(master.problem.trains)
+        applied = 0
+        for literals, trains in self.cuts.items():
+            if literals in self._applied: continue
+            if check_trains and any(t >= num_trains or self._fingerprint(master.problem, t) != fp
+                                    for t, fp in trains.items()): continue
+            if any(literal not in variables for literal in literals): continue
+            constr = master.model.addConstr(gp.quicksum(variables[l] for l in literals) <= len(literals) - 1)
+            if self.lazy: constr.Lazy = 1
+            self._applied.add(literals)
+            applied += 1
+        return applied
+
+    def renumber(self, trains: Dict[int, int]):
+        """Nummeriert die Züge aller Cuts um (alt -> neu); Cuts entfallener Züge werden verworfen."""
+        renumbered = {}
+        for literals, fingerprints in self.cuts.items():
+            new_literals = [renumber_literal(literal, trains) for literal in literals]
+            if None in new_literals: continue
+            renumbered[frozenset(new_literals)] = {trains[t]: fp for t, fp in fingerprints.items()}
+        self.cuts = renumbered
+        self._master, self._applied = None, set()
+
+    def save(self, path: str):
+        """Schreibt den Vorrat als JSON (atomar per os.replace)."""
+        data = {"version": POOL_VERSION, "cuts": [
+            {"literals": sorted(list(l) for l in literals), "trains": {str(t): fp for t, fp in sorted(trains.items())}}
+            for literals, trains in self.cuts.items()
+        ]}
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+
+    @classmethod
+    def load(cls, path: str, lazy: bool = False) -> "CutPool":
+        """Liest einen gespeicherten Vorrat; fehlt die Datei oder passt die Version nicht, ist er leer."""
+        pool = cls(lazy)
+        if not os.path.exists(path): return pool
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return pool
+        if data.get("version") != POOL_VERSION: return pool
+        for entry in data["cuts"]:
+            literals = frozenset(tuple(l) for l in entry["literals"])
+            pool.cuts[literals] = {int(t): fp for t, fp in entry["trains"].items()}
+        return pool
+
+    def _fingerprint(self, problem: model.ProblemInstance, t: int) -> str:
+        if t not in self._fingerprints: self._fingerprints[t] = train_fingerprint(problem, t)
+        return self._fingerprints[t]
+
+    def _keys(self, master) -> Dict[gp.Var, Literal]:
+        """Literal je Master-Variable; wird (wie die Fingerabdrücke) je Master-Modell neu aufgebaut."""
+        if self._master is not master:
+            self._master, self._fingerprints, self._applied = master, {}, set()
+            self._key_map = variable_literals(master)
+        return self._key_map
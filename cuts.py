@@ -1,37 +1,82 @@
 import gurobipy as gp
 from gurobipy import GRB
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 class Cut:
     """Basisklasse für alle Schnittgleichungen."""
     def add_to_model(self, model_instance, where):
         raise NotImplementedError
 
+    def size(self) -> int:
+        """Anzahl der Master-Variablen im Cut."""
+        raise NotImplementedError
+
 class FeasibilityCut(Cut):
     """Ein Feasibility-Cut (No-Good-Cut), generiert aus einem Konflikt."""
     def __init__(self, conflict_vars: List[gp.Var]):
         self.conflict_vars = conflict_vars
 
+    def get_expr(self, master_model=None):
+        return gp.quicksum(v for v in self.conflict_vars) <= len(self.conflict_vars) - 1
+
     def add_to_model(self, model_instance, where):
         """Fügt den Cut als Lazy Constraint hinzu."""
-        expr = gp.quicksum(v for v in self.conflict_vars) <= len(self.conflict_vars) - 1
-        model_instance.cbLazy(expr)
+        model_instance.cbLazy(self.get_expr())
+
+    def size(self) -> int:
+        return len(self.conflict_vars)
+
+class CombinedCut(Cut):
+    """Fasst mehrere Cuts zusammen, z.B. je einen Feasibility-Cut pro unzulässiger Komponente."""
+    def __init__(self, cuts: List[Cut]):
+        self.cuts = cuts
+
+    def add_to_model(self, model_instance, where):
+        for cut in self.cuts:
+            cut.add_to_model(model_instance, where)
+
+    def size(self) -> int:
+        return sum(cut.size() for cut in self.cuts)
 
 class OptimalityCut(Cut):
-    """Ein Benders-Optimalitäts-Cut."""
-    def __init__(self, objective_value: float, events: List[Dict], master_solution_vars: List[gp.Var]):
+    """Ein Benders-Optimalitäts-Cut: theta >= Zielwert - Summe der Koeffizienten abweichender Variablen.
+
+    coefficients ordnet den Master-Variablen, deren Abweichung von der aktuellen Lösung den Zielwert
+    senken kann, den Betrag zu, um den er dadurch höchstens sinkt (Abweichung: 1 - v für aktive,
+    v für inaktive Variablen). Ohne coefficients wird der No-Good über alle Variablen mit dem
+    Zielwert als Koeffizient gebildet; wegen theta >= 0 ist das ein gültiges Big-M. Beim Einfügen
+    werden die Koeffizienten auf Zielwert minus untere Schranke des Masters begrenzt (bounds.BigM).
+    """
+    def __init__(self, objective_value: float, events: List[Dict], master_solution_vars: Dict[gp.Var, float],
+                 coefficients: Optional[Dict[gp.Var, float]] = None):
         self.objective_value = objective_value
         self.events = events
         # Speichert die Listen der aktiven (Wert 1) und inaktiven (Wert 0) Master-Variablen
         self.active_vars = [v for v, x in master_solution_vars.items() if x > 0.5]
         self.inactive_vars = [v for v, x in master_solution_vars.items() if x < 0.5]
+        if coefficients is None:
+            coefficients = dict.fromkeys(master_solution_vars, objective_value) if objective_value > 0 else {}
+        self.coefficients = coefficients
+
+    def get_expr(self, master_model):
+        active, big_m = set(self.active_vars), master_model.big_m
+        coefficients = {v: big_m.cut_coefficient(self.objective_value, c) for v, c in self.coefficients.items()}
+        deviation_expr = gp.quicksum(c * (1 - v) if v in active else c * v for v, c in coefficients.items())
+        return master_model.theta >= self.objective_value - deviation_expr
 
     def add_to_model(self, model_instance, where):
-        """Fügt den Cut als Lazy Constraint hinzu. KORRIGIERTE VERSION."""
-        # Die Variablen sind bereits korrekt gespeichert, kein Nachschlagen nötig.
-        deviation_expr = gp.quicksum(1 - v for v in self.active_vars) + gp.quicksum(v for v in self.inactive_vars)
-        
-        M = 1000000  # Eine sichere obere Schranke
-        theta = model_instance._master_model.theta
-        expr = theta >= self.objective_value - M * deviation_expr
-        model_instance.cbLazy(expr)
\ No newline at end of file
+        """Fügt den Cut als Lazy Constraint hinzu (entfällt bei Zielwert 0, da theta >= 0)."""
+        if self.objective_value <= 0: return
+        model_instance.cbLazy(self.get_expr(model_instance._master_model))
+
+    def size(self) -> int:
+        return len(self.coefficients)
+
+    @staticmethod
+    def combine(cuts: List["OptimalityCut"], master_solution_vars: Dict[gp.Var, float]) -> "OptimalityCut":
+        """Summe der Cuts unabhängiger Teilprobleme (Zielwerte, Events und Koeffizienten addieren sich)."""
+        objective = sum(cut.objective_value for cut in cuts)
+        coefficients: Dict[gp.Var, float] = {}
+        for cut in cuts:
+            for v, c in cut.coefficients.items(): coefficients[v] = min(coefficients.get(v, 0.0) + c, objective)
+        return OptimalityCut(objective, [event for cut in cuts for event in cut.events], master_solution_vars, coefficients)
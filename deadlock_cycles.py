@@ -0,0 +1,110 @@
+from typing import Dict, FrozenSet, List, Optional
+
+DEFAULT_MAX_CYCLES = 500000
+DEFAULT_MAX_PER_TRAINS = 100
+
+def find_deadlock_cycles(arrays, conflict_index, max_length: int = 3, max_cycles: int = DEFAULT_MAX_CYCLES,
+                         max_per_trains: Optional[int] = DEFAULT_MAX_PER_TRAINS) -> List[tuple]:
+    """Zählt Deadlock-Zyklen über 3 bis max_length Züge im gerichteten Konfliktgraphen auf.
+
+    Eine Kante mit Schlüssel (t_i, a, t_j, b) steht für y = 1: t_j beginnt b frühestens, wenn t_i
+    den Nachfolger von a erreicht (plus Release-Zeit). Ein Zyklus t_1 -> ... -> t_k -> t_1 ist
+    unzulässig, wenn jeder Zug an der Operation b, an der er wartet, selbst vorausfährt (a = b)
+    oder unmittelbar davor (einziger Nachfolger von a ist b), und die Summe aus Release-Zeiten
+    und Dauern entlang des Zyklus nicht negativ ist. Das ist die klassische Verklemmung, in der jeder
+    Zug eine Ressource hält und die des nächsten braucht; auch ohne Release-Zeiten ist die Rotation
+    im selben Zeitpunkt unzulässig, da jedes Ende-Event vor dem Start-Event des nächsten Zuges liegt.
+
+    Die Suche läuft über einen nach Operationen indizierten Kantenindex; ihr Aufwand wächst mit
+    der Zahl der Konflikte und der gefundenen Zyklen, nicht mit der Zahl der Zugtripel. Jeder
+    Zyklus wird genau einmal ausgegeben (beginnend beim kleinsten Zug) als Tupel von y-Schlüsseln.
+
+    Da auf Strecken mit vielen Ressourcen je Operation dieselben Züge über sehr viele Op-Paare
+    verklemmen können, werden je Zugmenge höchstens max_per_trains Zyklen (None = unbegrenzt)
+    und insgesamt höchstens max_cycles Zyklen ausgegeben.
+    """
+    offsets = arrays.train_offsets.tolist()
+    durations = arrays.min_duration.tolist()
+    succ_ptr, succ_idx = arrays.succ_ptr.tolist(), arrays.succ_idx.tolist()
+    n = len(durations)
+
+    # Einziger Nachfolger je Operation (globaler Index, -1 = keiner oder mehrere) und die
+    # möglichen Ausstiegsoperationen je Eintrittsoperation b: b selbst und jedes a mit Nachfolger b
+    only_succ = [-1] * n
+    exits: List[List[int]] = [[g] for g in range(n)]
+    for t in range(len(offsets) - 1):
+        for g in range(offsets[t], offsets[t + 1]):
+            if succ_ptr[g + 1] - succ_ptr[g] == 1:
+                s = offsets[t] + succ_idx[succ_ptr[g]]
+                only_succ[g] = s
+                exits[s].append(g)
+
+    # Ausgehende Kanten je Ausstiegsoperation, nach Zielzug: a -> Zug -> [(b, y-Schlüssel, Release-Zeit)],
+    # sowie eingehende Kanten je Eintrittsoperation, nach Ausstiegsoperation: b -> a -> [(Zug, Schlüssel, Release)]
+    out_edges: Dict[int, Dict[int, List[tuple]]] = {}
+    in_edges: Dict[int, Dict[int, List[tuple]]] = {}
+    for t1, o1, t2, o2, _, rel1, rel2 in conflict_index:
+        g1, g2 = offsets[t1] + o1, offsets[t2] + o2
+        out_edges.setdefault(g1, {}).setdefault(t2, []).append((g2, (t1, o1, t2, o2), rel1))
+        out_edges.setdefault(g2, {}).setdefault(t1, []).append((g1, (t2, o2, t1, o1), rel2))
+        in_edges.setdefault(g2, {}).setdefault(g1, []).append((t1, (t1, o1, t2, o2), rel1))
+        in_edges.setdefault(g1, {}).setdefault(g2, []).append((t2, (t2, o2, t1, o1), rel2))
+
+    cycles: List[tuple] = []
+    path: List[tuple] = []
+    on_path = set()
+    per_trains: Dict[FrozenSet[int], int] = {}
+
+    def saturated(trains: FrozenSet[int]) -> bool:
+        return max_per_trains is not None and per_trains.get(trains, 0) >= max_per_trains
+
+    def extend(start: int, first_exit: int, closing: list, closers: set, entry: int, slack: int) -> bool:
+        """Erweitert den Pfad ab der Eintrittsoperation 'entry'; False, sobald die Obergrenze erreicht ist."""
+        if len(path) + 1 >= 3:
+            trains = frozenset(on_path) | {start}
+            for b, sources in closing:
+                for a in exits[entry]:
+                    a_slack = slack + (durations[entry] if a == entry else 0)
+                    for _, key, rel in sources.get(a, ()):
+                        if a_slack + rel + (durations[b] if b == first_exit else 0) < 0: continue
+                        if saturated(trains): return True
+                        per_trains[trains] = per_trains.get(trains, 0) + 1
+                        cycles.append(tuple(path) + (key,))
+                        if len(cycles) >= max_cycles: return False
+        if len(path) + 1 >= max_length: return True
+        last_level = len(path) + 2 == max_length
+        for a in exits[entry]:
+            a_slack = slack + (durations[entry] if a == entry else 0)
+            for train, edges in out_edges.get(a, {}).items():
+                if train <= start or train in on_path: continue
+                # Auf der letzten Ebene lohnt der Abstieg nur in Züge, die den Zyklus schließen können,
+                # und nur, solange die Zugmenge noch Zyklen aufnimmt
+                if last_level and (train not in closers or saturated(frozenset(on_path) | {start, train})): continue
+                on_path.add(train)
+                for b, key, rel in edges:
+                    path.append(key)
+                    ok = extend(start, first_exit, closing, closers, b, a_slack + rel)
+                    path.pop()
+                    if not ok: return False
+                on_path.discard(train)
+        return True
+
+    for start in range(len(offsets) - 1):
+        for a in range(offsets[start], offsets[start + 1]):
+            if a not in out_edges: continue
+            # Der Zyklus schließt mit einer Kante in a selbst oder in dessen einzigen Nachfolger
+            closing = [(b, in_edges[b]) for b in (a, only_succ[a]) if b != -1 and b in in_edges]
+            if not closing: continue
+            closers = {train for _, sources in closing for edges in sources.values() for train, _, _ in edges}
+            for train, edges in out_edges[a].items():
+                if train <= start: continue
+                on_path.add(train)
+                for b, key, rel in edges:
+                    path.append(key)
+                    ok = extend(start, a, closing, closers, b, rel)
+                    path.pop()
+                    if not ok:
+                        print(f"  -> Warnung: Obergrenze von {max_cycles} Deadlock-Zyklen erreicht, Aufzählung abgebrochen.")
+                        return cycles
+                on_path.discard(train)
+    return cycles
@@ -0,0 +1,276 @@
+import heapq
+from typing import Dict, List, Optional, Tuple
+import model
+import cuts
+import instrumentation
+import master_model as master_module
+from subproblem_longest_path import SubproblemLongestPath
+
+PRIORITIES = ("fifo", "edd")
+INF = float('inf')
+
+class GreedyDispatcher:
+    """Greedy-Disposition als Startlösung (MIP-Start und erster Incumbent) für den Master.
+
+    Die Züge werden nacheinander in Prioritätsreihenfolge eingeplant (fifo: frühester Start,
+    edd: früheste Zielfunktions-Schwelle). Jeder Zug sucht per A* über (Operation, freies
+    Zeitintervall) seinen frühesten Weg zum Ausgang, wobei er in jeder Operation warten darf,
+    solange deren Ressourcen nicht von bereits eingeplanten Zügen belegt werden; die kürzesten
+    Restdauern zum Ausgang dienen als Schätzer. Verklemmungen entstehen so nicht. Die belegten
+    Intervalle werden danach reserviert; Startoperationen sind bis zur frühesten Abfahrt vorab belegt.
+
+    Aus den Zeiten ergeben sich die y/z-Werte, abgeglichen mit den Swap- und Zyklus-Constraints des
+    Masters, die mit dem Longest-Path-Subproblem bewertet werden. Meldet es einen Konflikt (etwa über Operationen abseits der gewählten Wege), wird die
+    knappste Reihenfolge darin umgedreht, jede höchstens einmal.
+    """
+    def __init__(self, problem: model.ProblemInstance, master_model: master_module.MasterModel,
+                 priority: str = "fifo", max_repairs: int = 100):
+        if priority not in PRIORITIES: raise ValueError(f"Unbekannte Priorität: {priority}")
+        self.problem = problem
+        self.master_model = master_model
+        self.priority = priority
+        self.max_repairs = max_repairs
+        self.master_solution: Dict = {}
+        a = problem.arrays
+        self._offsets = a.train_offsets.tolist()
+        self._lb, self._ub = a.start_lb.tolist(), a.start_ub.tolist()
+        self._durations = a.min_duration.tolist()
+        res_ptr, res_release = a.res_ptr.tolist(), a.res_release.tolist()
+        self._resources = [a.res_id[res_ptr[g]:res_ptr[g + 1]].tolist() for g in range(len(self._lb))]
+        self._release = [res_release[res_ptr[g]:res_ptr[g + 1]] for g in range(len(self._lb))]
+        self._allowed = master_model.time_windows.allowed
+
+    def run(self) -> Optional[cuts.OptimalityCut]:
+        """Liefert die bewertete Startlösung als OptimalityCut oder None, falls keine gefunden wird."""
+        with instrumentation.current().timer("heuristic.dispatch"):
+            plan = self._dispatch()
+            if plan is None: return None
+            margins = self._decide_orders(*plan)
+        with instrumentation.current().timer("heuristic.evaluate"):
+            return self._evaluate(margins)
+
+    def _train_order(self) -> List[int]:
+        trains = range(len(self.problem.trains))
+        if self.priority == "edd":
+            deadline = {}
+            for obj in self.problem.objective_components:
+                deadline[obj.train] = min(deadline.get(obj.train, INF), obj.threshold)
+            return sorted(trains, key=lambda t: (deadline.get(t, INF), self._lb[self._offsets[t]], t))
+        return sorted(trains, key=lambda t: (self._lb[self._offsets[t]], t))
+
+    def _dispatch(self) -> Optional[tuple]:
+        """Plant alle Züge ein; liefert (Nachfolger je Operation, Startzeiten der Wegoperationen, späteste Starts).
+
+        Startoperationen noch nicht eingeplanter Züge gelten bis zu deren frühester Abfahrt als belegt.
+        Findet ein Zug keinen Weg, wird er vorgezogen und seine Vorab-Belegung verdoppelt, damit
+        früher eingeplante Züge ihm ausweichen, falls er erneut später an die Reihe kommt.
+        """
+        earliest = self.master_model.time_windows.earliest.tolist()
+        hold = {}  # Zug -> Ende der Vorab-Belegung seiner Startoperation
+        for t in range(len(self.problem.trains)):
+            g = self._offsets[t]
+            if self._allowed[g]: hold[t] = min(earliest[s] for s in self._allowed[g])
+        order = self._train_order()
+        for _ in range(self.max_repairs):
+            reservations: Dict[int, List[Tuple[float, float, int]]] = {}
+            for t, leave in hold.items():
+                g = self._offsets[t]
+                for r, rel in zip(self._resources[g], self._release[g]):
+                    reservations.setdefault(r, []).append((self._lb[g], leave + rel, t))
+            plan = self._plan_trains(order, reservations)
+            if isinstance(plan, tuple): return plan
+            lb = self._lb[self._offsets[plan]]
+            hold[plan] = lb + 2 * max(hold[plan] - lb, 1)
+            order.remove(plan)
+            order.insert(0, plan)
+        print("  -> Greedy-Disposition: keine Einplanung aller Züge gefunden.")
+        return None
+
+    def _plan_trains(self, order: List[int], reservations: Dict[int, List[Tuple[float, float, int]]]):
+        """Plant die Züge in der gegebenen Reihenfolge; liefert (Nachfolger, Zeiten, späteste Starts) oder den ersten Zug ohne Weg.
+
+        Operationen abseits des Weges werden im Modell ebenfalls eingeplant: sie belegen ihre
+        Ressourcen mindestens von ihrem spätesten Start bis zum Start ihres Nachfolgers (plus
+        Release-Zeit), ohne den Weg zu verschieben. Auch diese Intervalle werden reserviert.
+        """
+        successor, times, latest = [-1] * len(self._lb), {}, {}
+        for t in order:
+            # Die eigene Vorab-Belegung der Startoperation wird durch den Weg ersetzt
+            for r in self._resources[self._offsets[t]]:
+                reservations[r] = [iv for iv in reservations.get(r, []) if iv[2] != t]
+            path = self._plan_train(t, reservations)
+            if path is None: return t
+            occupied = []
+            for (g, x), (s, x_next) in zip(path, path[1:]):
+                successor[g] = s
+                occupied.append((g, x, x_next))
+            times.update(path)
+            base = self._offsets[t]
+            for g in range(base + len(self.problem.trains[t].operations) - 1, base - 1, -1):
+                if g in times or not self._allowed[g]: continue
+                # Der Nachfolger mit dem spätesten Start schiebt die Belegung möglichst weit nach hinten
+                follow, s = max((times[s] if s in times else latest.get(s, INF), -s) for s in self._allowed[g])
+                successor[g] = -s
+                latest[g] = follow - self._durations[g]
+                if follow < INF: occupied.append((g, latest[g], follow))
+            for g, start, end in occupied:
+                for r, rel in zip(self._resources[g], self._release[g]):
+                    reservations.setdefault(r, []).append((start, end + rel, t))
+        return successor, times, latest
+
+    def _free_intervals(self, g: int, reservations: Dict[int, List[Tuple[float, float, int]]]) -> List[Tuple[float, float]]:
+        """Zeitintervalle, in denen keine Ressource von g durch einen anderen Zug belegt ist."""
+        if not self._allowed[g]: return [(0, INF)]  # Ohne Nachfolger entsteht keine Reihenfolge-Constraint
+        busy = sorted((start, end) for r in self._resources[g] for start, end, _ in reservations.get(r, ()) if start < end)
+        free, cursor = [], 0
+        for start, end in busy:
+            if start > cursor: free.append((cursor, start))
+            cursor = max(cursor, end)
+        free.append((cursor, INF))
+        return free
+
+    def _plan_train(self, t: int, reservations) -> Optional[List[Tuple[int, float]]]:
+        """A* über (Operation, freies Intervall) nach der frühesten Ankunft; liefert [(g, Startzeit), ...]."""
+        base = self._offsets[t]
+        h = self.problem.trains[t].get_shortest_paths_to_exit()
+        intervals: Dict[int, list] = {}
+
+        def free(g: int) -> list:
+            if g not in intervals: intervals[g] = self._free_intervals(g, reservations)
+            return intervals[g]
+
+        start = base
+        heap, best, pred = [], {}, {}
+        for k, (a, b) in enumerate(free(start)):
+            x = max(self._lb[start], a)
+            if x < b and x <= self._ub[start]:
+                best[start, k] = x
+                heapq.heappush(heap, (x + h[0], x, start, k))
+                break
+        while heap:
+            _, x, g, k = heapq.heappop(heap)
+            if x > best[g, k]: continue
+            if not self._allowed[g]:
+                path, state = [], (g, k)
+                while state is not None:
+                    path.append((state[0], best[state]))
+                    state = pred.get(state)
+                return path[::-1]
+            stay_until = free(g)[k][1] - max(self._release[g], default=0)
+            for s in self._allowed[g]:
+                depart = max(x + self._durations[g], self._lb[s])
+                for k2, (a, b) in enumerate(free(s)):
+                    if b <= depart: continue
+                    tau = max(depart, a)
+                    if tau > self._ub[s] or tau > stay_until: break
+                    if tau < best.get((s, k2), INF):
+                        best[s, k2], pred[s, k2] = tau, (g, k)
+                        heapq.heappush(heap, (tau + h[s - base], tau, s, k2))
+        return None
+
+    def _decide_orders(self, successor: List[int], times: Dict[int, float], latest: Dict[int, float]) -> Dict:
+        """Setzt die y/z-Werte passend zu den Zeiten; liefert je y-Variable mit Wert 1 den Rang zum Umdrehen.
+
+        Operationen abseits der Wege stehen zu ihrem spätesten Start fest, wie sie reserviert wurden.
+        Führt ihr Nachfolger-Weg ohne feste Zeit zum Ausgang, können sie beliebig spät beginnen und
+        kommen in jedem Konflikt als zweite an die Reihe.
+        """
+        master, offsets = self.master_model, self._offsets
+        earliest = master.time_windows.earliest.tolist()
+
+        def entry(g: int) -> float:
+            return times[g] if g in times else latest.get(g, INF)
+
+        values, margins = {}, {}
+        for (t_idx, o_idx, s_idx), var in master.z.items():
+            values[var] = 1.0 if successor[offsets[t_idx] + o_idx] == offsets[t_idx] + s_idx else 0.0
+        for t1, o1, t2, o2, _, rel1, rel2 in master.conflict_index:
+            g1, g2 = offsets[t1] + o1, offsets[t2] + o2
+            s1, s2 = successor[g1], successor[g2]
+            x1, x2 = entry(g1), entry(g2)
+            if s1 == -1 or s2 == -1 or (x1 == INF and x2 == INF):
+                # Keine Reihenfolge-Constraint bzw. beide frei verschiebbar
+                first12 = (earliest[g1], t1) <= (earliest[g2], t2)
+            elif x1 == INF or x2 == INF:
+                first12 = x2 == INF
+            else:
+                late12 = entry(s1) + rel1 - x2  # > 0: t1 vor t2 verschiebt t2
+                late21 = entry(s2) + rel2 - x1
+                if (late12 <= 0) != (late21 <= 0): first12 = late12 <= 0
+                elif late12 <= 0: first12 = (x1, t1) <= (x2, t2)
+                else: first12 = late12 <= late21
+            first, second = master.y[t1, o1, t2, o2], master.y[t2, o2, t1, o1]
+            if not first12: first, second = second, first
+            values[first], values[second] = 1.0, 0.0
+            # Reihenfolgen mit Operationen abseits der Wege werden beim Reparieren zuerst umgedreht
+            margins[first] = (g1 in times and g2 in times, abs(earliest[g1] - earliest[g2]) if INF in (x1, x2) else abs(x1 - x2))
+        for key in master.fixed_orders:
+            t1, o1, t2, o2 = key
+            values[master.y[key]], values[master.y[t2, o2, t1, o1]] = 1.0, 0.0
+        self.master_solution = values
+        self._apply_master_constraints(margins)
+        return margins
+
+    def _links(self):
+        """Gegenrichtung je y-Variable und die Variablen, die laut Swap-Constraints gleich sein müssen."""
+        master = self.master_model
+        reverse = {var: master.y[t2, o2, t1, o1] for (t1, o1, t2, o2), var in master.y.items()}
+        partners: Dict = {}
+        for c1, c2 in self.problem.get_2_train_swap_constraints():
+            if c1 not in master.y or c2 not in master.y: continue
+            for v1, v2 in ((master.y[c1], master.y[c2]), (reverse[master.y[c1]], reverse[master.y[c2]])):
+                partners.setdefault(v1, []).append(v2)
+                partners.setdefault(v2, []).append(v1)
+        return reverse, partners
+
+    def _flip(self, var, reverse: Dict, partners: Dict, flipped: set):
+        """Setzt var auf 0 (Gegenrichtung auf 1), ebenso alle über Swap-Constraints gekoppelten Variablen."""
+        stack = [var]
+        while stack:
+            v = stack.pop()
+            if self.master_solution[v] < 0.5: continue
+            flipped.add(v)
+            self.master_solution[v], self.master_solution[reverse[v]] = 0.0, 1.0
+            stack.extend(partners.get(v, ()))
+
+    def _apply_master_constraints(self, margins: Dict):
+        """Bringt die Reihenfolgen mit den Swap- und Zyklus-Constraints des Masters in Einklang.
+
+        Die Zeiten der Disposition erlauben Tausch und Rotation im selben Zeitpunkt, die nach der
+        Event-Reihenfolge von DISPLIB unzulässig sind; das Subproblem erkennt sie nicht. Abweichende
+        Swap-Paare übernehmen die Reihenfolge mit dem größeren Abstand, in geschlossenen Zyklen wird
+        die knappste Reihenfolge umgedreht.
+        """
+        master, values = self.master_model, self.master_solution
+        reverse, partners = self._links()
+        fixed = lambda v: v.LB > 0.5 or reverse[v].LB > 0.5
+        rank = lambda v: (fixed(v), margins.get(v, (True, INF)))
+        flipped = set()
+        for v1, others in partners.items():
+            for v2 in others:
+                if values[v1] == values[v2]: continue
+                # Die 1-Variable mit dem kleineren Rang wird umgedreht
+                one, zero = (v1, v2) if values[v1] > 0.5 else (v2, v1)
+                if rank(one) < rank(reverse[zero]): self._flip(one, reverse, partners, flipped)
+                else: self._flip(reverse[zero], reverse, partners, flipped)
+        for cycle in self.problem.get_deadlock_cycle_constraints(master.max_cycle_length):
+            if not all(key in master.y for key in cycle): continue
+            variables = [master.y[key] for key in cycle]
+            if all(values[v] > 0.5 for v in variables):
+                self._flip(min(variables, key=rank), reverse, partners, flipped)
+
+    def _evaluate(self, margins: Dict) -> Optional[cuts.OptimalityCut]:
+        """Bewertet die Belegung und repariert Konflikte durch Umdrehen der knappsten Reihenfolge."""
+        master = self.master_model
+        subproblem = SubproblemLongestPath(self.problem, master)
+        reverse, partners = self._links()
+        flipped = set()
+        for _ in range(self.max_repairs + 1):
+            cut = subproblem.solve(self.master_solution)
+            if isinstance(cut, cuts.OptimalityCut): return cut
+            candidates = [v for v in cut.conflict_vars
+                          if v in reverse and v.LB < 0.5 and v not in flipped and reverse[v] not in flipped]
+            if not candidates: return None
+            flip = min(candidates, key=lambda v: margins.get(v, (True, INF)))
+            self._flip(flip, reverse, partners, flipped)
+        return None
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import mmap
+import os
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+CACHE_SUFFIX = ".lbbdcache"
+CACHE_VERSION = 5
+_MAGIC = b"LBBDCACH"
+_ALIGN = 64
+
+def cache_path_for(instance_path: str) -> str:
+    """Die Cache-Datei liegt neben der JSON-Instanz."""
+    return instance_path + CACHE_SUFFIX
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _padding(offset: int) -> int:
+    return (-offset) % _ALIGN
+
+def write_cache(path: str, source_hash: str, meta: dict, arrays: Dict[str, np.ndarray]):
+    """Schreibt Metadaten und Arrays in eine Cache-Datei.
+
+    Aufbau: Magic, Header-Länge (uint64), JSON-Header (Version, Hash der Quelle, Metadaten,
+    Array-Tabelle mit dtype/shape/offset), danach die Rohdaten aller Arrays, jeweils auf
+    64 Byte ausgerichtet. Die Datei wird atomar per os.replace veröffentlicht.
+    """
+    arrays = {name: np.ascontiguousarray(arr) for name, arr in arrays.items()}
+    table, offset = {}, 0
+    for name, arr in arrays.items():
+        offset += _padding(offset)
+        table[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += arr.nbytes
+    header = json.dumps({"version": CACHE_VERSION, "source_sha256": source_hash, "meta": meta,
+                         "arrays": table}).encode("utf-8")
+    data_start = len(_MAGIC) + 8 + len(header)
+    data_start += _padding(data_start)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(len(header).to_bytes(8, "little"))
+            f.write(header)
+            f.write(b"\0" * (data_start - len(_MAGIC) - 8 - len(header)))
+            written = 0
+            for name, arr in arrays.items():
+                pad = table[name]["offset"] - written
+                f.write(b"\0" * pad)
+                f.write(arr.tobytes())
+                written += pad + arr.nbytes
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+
+def read_cache(path: str, source_hash: str) -> Optional[Tuple[dict, Dict[str, np.ndarray]]]:
+    """Öffnet eine Cache-Datei per mmap und liefert (Metadaten, Arrays).
+
+    Die Arrays sind schreibgeschützte Sichten direkt auf die gemappte Datei. Gibt None zurück,
+    wenn die Datei fehlt, beschädigt ist oder nicht zum Hash der Quelle passt.
+    """
+    if not os.path.exists(path): return None
+    with open(path, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None  # Leere Datei
+    try:
+        if buffer[:len(_MAGIC)] != _MAGIC: return None
+        header_len = int.from_bytes(buffer[len(_MAGIC):len(_MAGIC) + 8], "little")
+        header = json.loads(buffer[len(_MAGIC) + 8:len(_MAGIC) + 8 + header_len].decode("utf-8"))
+        if header.get("version") != CACHE_VERSION or header.get("source_sha256") != source_hash:
+            return None
+        data_start = len(_MAGIC) + 8 + header_len
+        data_start += _padding(data_start)
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype, shape = np.dtype(spec["dtype"]), tuple(spec["shape"])
+            count = int(np.prod(shape, dtype=np.int64))
+            arr = np.frombuffer(buffer, dtype=dtype, count=count, offset=data_start + spec["offset"])
+            arrays[name] = arr.reshape(shape)
+        return header["meta"], arrays
+    except (ValueError, KeyError, TypeError, UnicodeDecodeError):
+        return None
@@ -0,0 +1,113 @@
+import json
+import threading
+import time
+from typing import Optional
+
+class _Timer:
+    __slots__ = ("_owner", "_name", "_start")
+
+    def __init__(self, owner: "Instrumentation", name: str):
+        self._owner, self._name = owner, name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._owner.add_time(self._name, time.perf_counter() - self._start)
+        return False
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class Instrumentation:
+    """Sammelt Laufzeiten und Zähler je Phase sowie optional einen JSONL-Trace der Callbacks.
+
+    Zeiten werden pro Name aufsummiert (Gesamtzeit und Anzahl); die Zugriffe sind über ein Lock
+    geschützt, da Subproblem-Komponenten parallel in Worker-Threads gelöst werden können.
+    """
+    enabled = True
+
+    def __init__(self, trace_path: Optional[str] = None):
+        self.timers = {}    # Name -> [Gesamtzeit, Anzahl]
+        self.counters = {}  # Name -> Wert
+        self._lock = threading.Lock()
+        self._trace = open(trace_path, 'w') if trace_path else None
+
+    def timer(self, name: str) -> _Timer:
+        return _Timer(self, name)
+
+    def add_time(self, name: str, seconds: float):
+        with self._lock:
+            entry = self.timers.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def trace(self, record: dict):
+        if self._trace is None: return
+        with self._lock:
+            self._trace.write(json.dumps(record) + "\n")
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "timers": {name: {"total": total, "count": n} for name, (total, n) in sorted(self.timers.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def report(self):
+        summary = self.summary()
+        print("Instrumentierung (Gesamtzeit / Aufrufe):")
+        for name, entry in summary["timers"].items():
+            print(f"  {name:<28} {entry['total']:10.3f}s  {entry['count']:8d}x")
+        for name, value in summary["counters"].items():
+            print(f"  {name:<28} {value:10d}")
+
+    def close(self):
+        if self._trace is not None:
+            self._trace.close()
+            self._trace = None
+
+class NullInstrumentation:
+    """Deaktivierte Instrumentierung: alle Aufrufe sind No-ops ohne Zeitmessung."""
+    enabled = False
+
+    def timer(self, name: str) -> _NullTimer:
+        return _NULL_TIMER
+
+    def add_time(self, name: str, seconds: float): pass
+
+    def count(self, name: str, n: int = 1): pass
+
+    def trace(self, record: dict): pass
+
+    def summary(self) -> dict:
+        return {"timers": {}, "counters": {}}
+
+    def report(self): pass
+
+    def close(self): pass
+
+_current = NullInstrumentation()
+
+def current():
+    """Die aktive Instrumentierung (standardmäßig deaktiviert)."""
+    return _current
+
+def activate(instrumentation) -> object:
+    """Setzt die aktive Instrumentierung und gibt die vorherige zurück."""
+    global _current
+    previous, _current = _current, instrumentation
+    return previous
@@ -1,82 +1,337 @@
 import time
-import json
-import os
 import argparse
+import hashlib
+from collections import OrderedDict
+from typing import Optional
 import gurobipy as gp
 from gurobipy import GRB
 
+import instrumentation
 from model import ProblemInstance
 from master_model import MasterModel
 from subproblem_gurobi import SubproblemGurobi
-from cuts import FeasibilityCut, OptimalityCut
+from subproblem_longest_path import SubproblemLongestPath
+from subproblem_decomposition import DecomposedSubproblem
+from heuristic import GreedyDispatcher, PRIORITIES
+from cuts import Cut, FeasibilityCut, OptimalityCut
+from cut_pool import CutPool
+from verifier import verify_solution
+from solution_writer import solution_path, write_solution
+from utils import choose_method, solve_monolithic
 
 # Globale Variablen für den Callback, um die beste Lösung zu speichern
 best_obj = float('inf')
 best_solution_events = None
+best_cut = None
+first_solution_time = None
+
+class SubproblemCache:
+    """Begrenzter LRU-Cache für Subproblem-Ergebnisse.
+
+    Der Schlüssel ist ein kompakter Hash der y/z-Belegung; bei einem Treffer wird der
+    gespeicherte Cut (Feasibility oder Optimalität) ohne Subproblem-Lauf zurückgegeben.
+    """
+    def __init__(self, master_vars: list, maxsize: int = 1024):
+        self.master_vars = master_vars
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def key(self, master_solution: dict) -> bytes:
+        bits = bytes(1 if master_solution[v] > 0.5 else 0 for v in self.master_vars)
+        return hashlib.blake2b(bits, digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[Cut]:
+        cut = self._entries.get(key)
+        if cut is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return cut
+
+    def put(self, key: bytes, cut: Cut):
+        if self.maxsize <= 0: return
+        self._entries[key] = cut
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
 
 def benders_callback(model, where):
     """Dieser Callback wird von Gurobi aufgerufen, wenn eine neue Master-Lösung gefunden wurde."""
-    global best_obj, best_solution_events
+    global best_obj, best_solution_events, best_cut, first_solution_time
 
     if where == GRB.Callback.MIPSOL:
+        stats = instrumentation.current()
+        callback_start = time.perf_counter()
         # 1. Hole die aktuelle Master-Lösung (Variablen-Objekte -> Werte)
         master_vars_map = model._master_model.y | model._master_model.z
         master_solution = {var_obj: model.cbGetSolution(var_obj) for var_obj in master_vars_map.values()}
 
-        # 2. Löse das Subproblem mit dieser Lösung
-        subproblem = SubproblemGurobi(model._problem, master_solution, model._master_model)
-        cut = subproblem.solve()
+        # 2. Löse das (persistente) Subproblem mit dieser Lösung, sofern die Belegung nicht bereits bekannt ist
+        cache_key = model._cache.key(master_solution)
+        cut = model._cache.get(cache_key)
+        cache_hit, subproblem_time = cut is not None, 0.0
+        if cut is None:
+            subproblem_start = time.perf_counter()
+            cut = model._subproblem.solve(master_solution)
+            subproblem_time = time.perf_counter() - subproblem_start
+            model._cache.put(cache_key, cut)
+            if model._cut_pool is not None: model._cut_pool.add(cut, model._master_model)
 
         # 3. Füge den entsprechenden Cut als Lazy Constraint hinzu
         if isinstance(cut, OptimalityCut):
             if cut.objective_value < best_obj:
+                if best_solution_events is None: first_solution_time = model.cbGet(GRB.Callback.RUNTIME)
                 best_obj = cut.objective_value
                 best_solution_events = cut.events
+                best_cut = cut
+                if model._verify: verify_incumbent(model._problem, model._master_model, cut)
+                if model._incumbent_path: write_incumbent(model._master_model, cut, model._incumbent_path)
         
         # Das Cut-Objekt weiß selbst, wie es sich dem Modell hinzufügt
-        cut.add_to_model(model, where)
+        with stats.timer("cut.add"):
+            cut.add_to_model(model, where)
+
+        if stats.enabled:
+            stats.add_time("callback", time.perf_counter() - callback_start)
+            stats.count(f"cuts.{type(cut).__name__}")
+            stats.trace({
+                "runtime": model.cbGet(GRB.Callback.RUNTIME), "cache_hit": cache_hit, "cut": type(cut).__name__,
+                "cut_size": cut.size(), "subproblem_time": subproblem_time,
+                "objective": cut.objective_value if isinstance(cut, OptimalityCut) else None,
+            })
+
+
+def verify_incumbent(problem: ProblemInstance, master: MasterModel, cut: OptimalityCut) -> bool:
+    """Prüft eine neue beste Lösung (Events der gewählten Wege) mit dem Verifier und meldet Verletzungen."""
+    with instrumentation.current().timer("verify"):
+        result = verify_solution(problem, master.path_events(cut), cut.objective_value)
+    if not result.feasible:
+        print(f"  -> Warnung: Lösung mit Zielfunktionswert {cut.objective_value:.2f} ist laut Verifier unzulässig:")
+        for error in result.errors[:5]: print(f"       {error}")
+    return result.feasible
+
+
+def write_incumbent(master: MasterModel, cut: OptimalityCut, path: str):
+    """Schreibt eine neue beste Lösung (Events der gewählten Wege) atomar nach path."""
+    with instrumentation.current().timer("solution.write"):
+        write_solution(path, cut.objective_value, master.path_events(cut))
+
+
+def create_subproblem(engine: str, problem: ProblemInstance, master: MasterModel):
+    """Erzeugt die Subproblem-Engine. Z3 wird nur importiert, wenn es gebraucht wird.
 
+    "portfolio" lässt die Engines aus subproblem_portfolio.PORTFOLIO_ENGINES je Aufruf gegeneinander antreten.
+    """
+    if engine == "longest_path":
+        return SubproblemLongestPath(problem, master)
+    if engine == "gurobi":
+        return SubproblemGurobi(problem, master)
+    if engine == "z3":
+        from subproblem_z3 import SubproblemZ3
+        return SubproblemZ3(problem, master)
+    if engine == "portfolio":
+        from subproblem_portfolio import PORTFOLIO_ENGINES, PortfolioSubproblem
+        return PortfolioSubproblem(problem, master, {name: create_subproblem(name, problem, master) for name in PORTFOLIO_ENGINES})
+    raise ValueError(f"Unbekannte Subproblem-Engine: {engine}")
 
-def solve_instance(instance_path: str, time_limit: int):
-    """Löst die Instanz mit einem Branch-and-Cut-Ansatz."""
-    global best_obj, best_solution_events
+
+def optimize(problem: ProblemInstance, time_limit: float, engine: str = "longest_path", cache_size: int = 1024,
+             workers: int = 1, threads: Optional[int] = None, max_cycle_length: int = 3,
+             heuristic: Optional[str] = "fifo", cut_pool: Optional[CutPool] = None,
+             master: Optional[MasterModel] = None, subproblem=None, start: Optional[OptimalityCut] = None,
+             verify: bool = False, incumbent_path: Optional[str] = None) -> dict:
+    """Löst eine geladene Instanz mit Branch-and-Cut (Parameter siehe solve_instance).
+
+    Ein bestehendes Master-Modell und Subproblem können wiederverwendet werden (siehe
+    reoptimization); ein übergebenes Subproblem wird nicht geschlossen. start ist eine bereits
+    bewertete Lösung, die wie die Greedy-Disposition als MIP-Start dient (die bessere gewinnt).
+    Mit verify wird jede neue beste Lösung mit dem Verifier geprüft (Ergebnis der letzten unter "verified"),
+    mit incumbent_path sofort als Lösungsdatei geschrieben.
+
+    Gibt Zielfunktionswert und Events der besten Lösung (None, falls keine gefunden), deren
+    Optimalitäts-Cut ("cut", enthält die y/z-Belegung), das Master-Modell ("master") sowie
+    Schranke, Laufzeiten und Cache-Zähler zurück.
+    """
+    global best_obj, best_solution_events, best_cut, first_solution_time
     best_obj = float('inf') # Reset für jeden Lauf
     best_solution_events = None
+    best_cut = None
+    first_solution_time = None
 
-    print(f"--- Starte Branch-and-Cut Solver für: {instance_path} ---")
-    problem = ProblemInstance(instance_path)
-    master = MasterModel(problem)
+    stats = instrumentation.current()
+    if master is None: master = MasterModel(problem, max_cycle_length=max_cycle_length, cut_pool=cut_pool)
 
     master.model.Params.LazyConstraints = 1
     master.model.setParam('TimeLimit', time_limit)
+    if threads is not None: master.model.setParam('Threads', threads)
+
+    starts = [start] if start is not None else []
+    if heuristic is not None:
+        dispatched = GreedyDispatcher(problem, master, priority=heuristic).run()
+        if dispatched is not None:
+            starts.append(dispatched)
+            print(f"  -> Startlösung der Greedy-Disposition ({heuristic}): {dispatched.objective_value:.2f}")
+        else:
+            print("  -> Greedy-Disposition ohne zulässige Startlösung.")
+    if starts:
+        start = min(starts, key=lambda cut: cut.objective_value)
+        master.set_start(start)
+        best_obj, best_solution_events, best_cut, first_solution_time = start.objective_value, start.events, start, 0.0
+        if verify: verify_incumbent(problem, master, start)
+        if incumbent_path: write_incumbent(master, start, incumbent_path)
 
     # Übergebe die notwendigen Objekte an den Callback via "private" Attribute
     master.model._problem = problem
     master.model._master_model = master
+    master.model._cut_pool = cut_pool
+    master.model._verify = verify
+    master.model._incumbent_path = incumbent_path
+    if subproblem is not None:
+        master.model._subproblem = subproblem
+    elif workers > 1:
+        master.model._subproblem = DecomposedSubproblem(
+            problem, master, lambda: create_subproblem(engine, problem, master), workers)
+    else:
+        master.model._subproblem = create_subproblem(engine, problem, master)
+    master.model._cache = SubproblemCache(list(master.y.values()) + list(master.z.values()), cache_size)
 
     # Starte die Optimierung mit dem Callback
-    master.model.optimize(benders_callback)
+    try:
+        with stats.timer("master.optimize"):
+            master.model.optimize(benders_callback)
+    finally:
+        if subproblem is None and hasattr(master.model._subproblem, "close"): master.model._subproblem.close()
 
     print("-----------------------------------------------------------------")
     print(f"Optimierung beendet. Laufzeit: {master.model.Runtime:.2f} Sekunden.")
+    cache = master.model._cache
+    print(f"Subproblem-Cache: {cache.hits} Treffer, {cache.misses} Fehlzugriffe.")
+    return {
+        "objective": best_obj if best_solution_events else None, "events": best_solution_events, "cut": best_cut,
+        "master": master, "bound": master.model.ObjBound if master.model.SolCount > 0 else None,
+        "time_to_first_solution": first_solution_time, "runtime": master.model.Runtime,
+        "cache_hits": cache.hits, "cache_misses": cache.misses,
+        "verified": verify_incumbent(problem, master, best_cut) if verify and best_cut is not None else None,
+    }
+
+
+def solve_instance(instance_path: str, time_limit: int, engine: str = "longest_path", cache_size: int = 1024,
+                   workers: int = 1, use_instance_cache: bool = True, threads: Optional[int] = None,
+                   instrument: bool = False, trace_path: Optional[str] = None, max_cycle_length: int = 3,
+                   heuristic: Optional[str] = "fifo", window_length: Optional[int] = None, window_overlap: int = 0,
+                   cut_pool_path: Optional[str] = None, lazy_cut_pool: bool = False, verify: bool = False,
+                   write_incumbents: bool = False, method: str = "auto"):
+    """Löst die Instanz mit einem Branch-and-Cut-Ansatz.
+
+    Mit workers > 1 wird das Subproblem in unabhängige Zug-Komponenten zerlegt, die parallel
+    gelöst werden. Mit use_instance_cache wird die vorverarbeitete Instanz neben der JSON-Datei
+    zwischengespeichert und bei wiederholten Läufen per mmap geladen. threads begrenzt die
+    Gurobi-Threads des Masterproblems (None = Gurobi-Standard). Mit instrument werden Zeiten und
+    Zähler je Phase gesammelt und in der Zusammenfassung unter "instrumentation" ausgegeben;
+    trace_path schreibt zusätzlich je Callback eine JSONL-Zeile. max_cycle_length legt fest, bis zu
+    wie vielen Zügen Deadlock-Zyklen vorab als Constraints in den Master aufgenommen werden.
+    heuristic wählt die Priorität der Greedy-Disposition ("fifo", "edd"), deren Lösung als MIP-Start
+    und erster Incumbent dient (None = ohne Startlösung). Mit window_length wird die Instanz im
+    rollierenden Horizont gelöst (Fenster dieser Länge, die sich um window_overlap überlappen,
+    siehe rolling_horizon); eine Schranke gibt es dann nicht. cut_pool_path lädt die Feasibility-Cuts
+    früherer Läufe aus dieser Datei in den Master (mit lazy_cut_pool als Lazy Constraints) und
+    schreibt die um die neuen Cuts ergänzte Sammlung zurück (nicht im rollierenden Horizont).
+    Mit verify werden jede neue beste Lösung und das Endergebnis mit dem Verifier geprüft
+    (Zusammenfassung: "verified"). Die beste Lösung wird nach solutions/solution_<Instanz> geschrieben
+    (nur die Events der gewählten Wege), mit write_incumbents bereits jede neue beste Lösung während
+    des Laufs (nicht im rollierenden Horizont). method "monolithic" löst statt mit LBBD das kompakte
+    monolithische Modell (siehe utils.build_monolithic_model); der Standard "auto" wählt es für kleine
+    Instanzen (siehe utils.choose_method), außer cut_pool_path oder write_incumbents verlangen LBBD.
+    """
+    stats = instrumentation.Instrumentation(trace_path) if instrument or trace_path else instrumentation.NullInstrumentation()
+    previous_stats = instrumentation.activate(stats)
+    try:
+        print(f"--- Starte Branch-and-Cut Solver für: {instance_path} ---")
+        problem = ProblemInstance(instance_path, use_cache=use_instance_cache)
+        options = dict(engine=engine, cache_size=cache_size, workers=workers, threads=threads,
+                       max_cycle_length=max_cycle_length, heuristic=heuristic, verify=verify)
+        if method == "auto":
+            method = "lbbd" if cut_pool_path or write_incumbents else choose_method(problem)
+            print(f"  -> Automatische Wahl: {method}")
+        if window_length is not None:
+            from rolling_horizon import RollingHorizon
+            result = RollingHorizon(problem, window_length, window_overlap).solve(time_limit, **options)
+            if verify and result["events"]:
+                result["verified"] = verify_solution(problem, result["events"], result["objective"]).feasible
+        elif method == "monolithic":
+            result = solve_monolithic(problem, time_limit, threads=threads, max_cycle_length=max_cycle_length,
+                                      heuristic=heuristic)
+            if verify and result["cut"] is not None:
+                result["verified"] = verify_incumbent(problem, result["master"], result["cut"])
+        else:
+            pool = CutPool.load(cut_pool_path, lazy=lazy_cut_pool) if cut_pool_path else None
+            incumbent_path = solution_path(instance_path) if write_incumbents else None
+            result = optimize(problem, time_limit, cut_pool=pool, incumbent_path=incumbent_path, **options)
+            if pool is not None:
+                pool.save(cut_pool_path)
+                print(f"Cut-Pool: {pool.added} neue Cuts, {len(pool)} insgesamt in '{cut_pool_path}' gespeichert.")
+
+        objective, events, bound = result["objective"], result["events"], result["bound"]
+        gap = None
+        if events and bound is not None:
+            gap = max(0.0, objective - bound) / abs(objective) if objective != 0 else 0.0
+        summary = {
+            "instance": instance_path, "engine": engine, "method": method, "objective": objective,
+            "bound": bound, "gap": gap, "time_to_first_solution": result["time_to_first_solution"],
+            "runtime": result["runtime"], "cache_hits": result["cache_hits"], "cache_misses": result["cache_misses"],
+            "verified": result.get("verified"),
+        }
+        if stats.enabled:
+            stats.report()
+            summary["instrumentation"] = stats.summary()
     
-    if best_solution_events:
-        print(f"\nBeste gefundene Lösung mit Zielfunktionswert: {best_obj:.2f}")
-        # Speichern der Lösung...
-        output_dir = "solutions"
-        os.makedirs(output_dir, exist_ok=True)
-        solution_path = os.path.join(output_dir, f"solution_{os.path.basename(instance_path)}")
-        sorted_events = sorted(best_solution_events, key=lambda e: (e["time"], e["train"], e["operation"]))
-        with open(solution_path, 'w') as f:
-            json.dump({"objective_value": int(round(best_obj)), "events": sorted_events}, f, indent=4)
-        print(f"✓ Beste Lösung in '{solution_path}' gespeichert.")
-    else:
-        print("\nKeine zulässige Lösung innerhalb der Limits gefunden.")
+        if events:
+            print(f"\nBeste gefundene Lösung mit Zielfunktionswert: {objective:.2f}")
+            # Der rollierende Horizont liefert bereits nur die Events der gewählten Wege
+            if result.get("cut") is not None: events = result["master"].path_events(result["cut"])
+            path = write_solution(solution_path(instance_path), objective, events)
+            print(f"✓ Beste Lösung in '{path}' gespeichert.")
+        else:
+            print("\nKeine zulässige Lösung innerhalb der Limits gefunden.")
+    finally:
+        instrumentation.activate(previous_stats)
+        stats.close()
+    return summary
 
 
 if __name__ == "__main__":
-    # Dieser Teil bleibt wie von Ihnen gewünscht, um den Pfad direkt im Code zu setzen
-    instance_file_to_run = "data/displib_instances_phase1/line1_critical_0.json"
-    TIME_LIMIT_SECONDS = 600
-    
-    solve_instance(instance_file_to_run, TIME_LIMIT_SECONDS)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Löst eine DISPLIB-Instanz mit LBBD (Branch-and-Cut).")
+    parser.add_argument("instance", nargs="?", default="data/displib_instances_phase1/line1_critical_0.json")
+    parser.add_argument("--time-limit", type=int, default=600, help="Zeitlimit in Sekunden")
+    parser.add_argument("--engine", choices=["longest_path", "gurobi", "z3", "portfolio"], default="longest_path")
+    parser.add_argument("--method", choices=["lbbd", "monolithic", "auto"], default="auto",
+                        help="LBBD, monolithisches Modell oder automatische Wahl nach Instanzgröße")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Threads für das zerlegte Subproblem (lohnt nur mit gurobi, z3 oder portfolio)")
+    parser.add_argument("--threads", type=int, default=None, help="Gurobi-Threads des Masterproblems")
+    parser.add_argument("--max-cycle-length", type=int, default=3, help="Längste Deadlock-Zyklen (Züge) im Master")
+    parser.add_argument("--heuristic", choices=PRIORITIES + ("none",), default="fifo",
+                        help="Priorität der Greedy-Disposition für die Startlösung")
+    parser.add_argument("--window-length", type=int, default=None,
+                        help="Rollierender Horizont mit Fenstern dieser Länge (Zeiteinheiten der Instanz)")
+    parser.add_argument("--window-overlap", type=int, default=0, help="Überlappung aufeinanderfolgender Fenster")
+    parser.add_argument("--cut-pool", default=None, help="Feasibility-Cuts aus dieser Datei laden und dort speichern")
+    parser.add_argument("--lazy-cut-pool", action="store_true", help="Cuts aus dem Cut-Pool als Lazy Constraints laden")
+    parser.add_argument("--no-instance-cache", action="store_true", help="Instanz nicht zwischenspeichern")
+    parser.add_argument("--instrument", action="store_true", help="Zeiten und Zähler je Phase ausgeben")
+    parser.add_argument("--trace", default=None, help="JSONL-Trace der Callbacks in diese Datei schreiben")
+    parser.add_argument("--verify", action="store_true", help="Jede neue beste Lösung mit dem Verifier prüfen")
+    parser.add_argument("--write-incumbents", action="store_true", help="Jede neue beste Lösung sofort speichern")
+    args = parser.parse_args()
+
+    solve_instance(args.instance, args.time_limit, engine=args.engine, workers=args.workers,
+                   use_instance_cache=not args.no_instance_cache, threads=args.threads,
+                   instrument=args.instrument, trace_path=args.trace, max_cycle_length=args.max_cycle_length,
+                   heuristic=None if args.heuristic == "none" else args.heuristic,
+                   window_length=args.window_length, window_overlap=args.window_overlap,
+                   cut_pool_path=args.cut_pool, lazy_cut_pool=args.lazy_cut_pool, verify=args.verify,
+                   write_incumbents=args.write_incumbents, method=args.method)
\ No newline at end of file
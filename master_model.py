@@ -1,17 +1,46 @@
 import gurobipy as gp
+import numpy as np
 from gurobipy import GRB
 import model
+import bounds
 import cuts
-from typing import Dict
+import instrumentation
+import time_windows
+import verifier
+from typing import Dict, List, Optional, Tuple
 
 class MasterModel:
-    def __init__(self, problem_instance: model.ProblemInstance):
+    def __init__(self, problem_instance: model.ProblemInstance, max_cycle_length: int = 3, cut_pool=None):
         self.problem = problem_instance
+        self.max_cycle_length = max_cycle_length  # Längste Deadlock-Zyklen (Anzahl Züge) als initiale Constraints
+        self.cut_pool = cut_pool  # Feasibility-Cuts früherer Läufe (cut_pool.CutPool), werden initial übernommen
         self.model = gp.Model("Master-LBBD")
         self.model.Params.OutputFlag = 0
-        self._create_variables()
-        self._create_initial_constraints()
-        self.model.update()
+        with instrumentation.current().timer("master.time_windows"):
+            self._propagate_time_windows()
+        with instrumentation.current().timer("master.build"):
+            self._create_variables()
+            self._create_initial_constraints()
+            self.model.update()
+
+    def _propagate_time_windows(self):
+        """Reduziert die Konflikte auf die, deren Reihenfolge durch die Zeitfenster nicht bereits feststeht.
+
+        self.conflict_index enthält nur noch Konflikte mit y-Variablen; Subprobleme arbeiten auf
+        diesem Teilindex. self.fixed_orders sind die erzwungenen Reihenfolgen als y-Schlüssel,
+        self.big_m die daraus abgeleiteten Big-M-Werte (bounds.BigM).
+        """
+        self.time_windows = time_windows.TimeWindows(self.problem)
+        self.big_m = bounds.BigM(self.problem, self.time_windows)
+        status = self.time_windows.classify_conflicts(self.problem.conflict_index)
+        keep = (status == time_windows.FREE) | (status == time_windows.FIRST_BEFORE) | (status == time_windows.SECOND_BEFORE)
+        self.conflict_index = self.problem.conflict_index.restrict(keep)
+        self.fixed_orders = self.time_windows.forced_orders(self.problem.conflict_index, status)
+        stats = self.time_windows.statistics(status)
+        print(f"  -> Zeitfenster: {len(self.conflict_index)} von {len(self.problem.conflict_index)} Konflikten verbleiben "
+              f"({stats['irrelevant']} ohne Nachfolger, {stats['implied']} implizit, {stats['fixed']} mit fester Reihenfolge).")
+        if self.time_windows.infeasible_ops:
+            print(f"  -> Warnung: {len(self.time_windows.infeasible_ops)} Operationen mit leerem Zeitfenster.")
 
     def _create_variables(self):
         self.theta = self.model.addVar(name="theta", vtype=GRB.CONTINUOUS, lb=0.0)
@@ -23,43 +52,197 @@ class MasterModel:
         }
         self.y: Dict[tuple, gp.Var] = {
             key: self.model.addVar(vtype=GRB.BINARY, name=f"y_{key[0]}_{key[1]}_{key[2]}_{key[3]}")
-            for t1, o1, t2, o2 in (
-                (c[0][0], c[0][1], c[1][0], c[1][1]) for c in self.problem.get_conflicts()
-            ) for key in [(t1, o1, t2, o2), (t2, o2, t1, o1)]
+            for t1, o1, t2, o2, *_ in self.conflict_index
+            for key in [(t1, o1, t2, o2), (t2, o2, t1, o1)]
         }
 
     def _create_initial_constraints(self):
         print("Erstelle initiale Master-Constraints...")
-        # Path Pruning
-        paths_pruned = 0
-        for t_idx, train in enumerate(self.problem.trains):
-            shortest_paths = train.get_shortest_paths_to_exit()
-            exit_op_ub = train.operations[-1].start_ub
-            if exit_op_ub == float('inf'): continue
-            for o_idx, op in enumerate(train.operations):
-                if len(op.successors) > 1:
-                    for s_idx in op.successors:
-                        earliest_finish = op.start_lb + op.min_duration + shortest_paths.get(s_idx, float('inf'))
-                        if earliest_finish > exit_op_ub and (t_idx, o_idx, s_idx) in self.z:
-                            self.model.addConstr(self.z[t_idx, o_idx, s_idx] == 0)
-                            paths_pruned += 1
-        if paths_pruned > 0: print(f"  -> {paths_pruned} unmögliche Pfade entfernt.")
+        # Path Pruning (aus der Zeitfenster-Propagation)
+        for key in self.time_windows.pruned_paths:
+            self.z[key].ub = 0
+        if self.time_windows.pruned_paths: print(f"  -> {len(self.time_windows.pruned_paths)} unmögliche Pfade entfernt.")
         # Path Choice
         for t_idx, train in enumerate(self.problem.trains):
             for o_idx, op in enumerate(train.operations):
                 if len(op.successors) > 1:
                     self.model.addConstr(gp.quicksum(self.z[t_idx, o_idx, s_idx] for s_idx in op.successors) == 1)
         # Ordering
-        for (t1, o1), (t2, o2) in self.problem.get_conflicts():
+        for t1, o1, t2, o2, *_ in self.conflict_index:
             self.model.addConstr(self.y[t1, o1, t2, o2] + self.y[t2, o2, t1, o1] == 1)
+        for key in self.fixed_orders:
+            self.y[key].lb = 1
         # 2-Train Swaps
-        for c1, c2 in self.problem.get_2_train_swap_constraints():
+        with instrumentation.current().timer("master.swap_enumeration"):
+            swaps = self.problem.get_2_train_swap_constraints()
+        for c1, c2 in swaps:
             if c1 in self.y and c2 in self.y: self.model.addConstr(self.y[c1] == self.y[c2])
-        # 3-Train Cycles
-        for y1, y2, y3 in self.problem.get_3_train_cycle_constraints():
-            if y1 in self.y and y2 in self.y and y3 in self.y: self.model.addConstr(self.y[y1] + self.y[y2] + self.y[y3] <= 2)
+        # k-Train Cycles
+        with instrumentation.current().timer("master.cycle_enumeration"):
+            cycles = self.problem.get_deadlock_cycle_constraints(self.max_cycle_length)
+        for cycle in cycles:
+            if all(key in self.y for key in cycle):
+                self.model.addConstr(gp.quicksum(self.y[key] for key in cycle) <= len(cycle) - 1)
+        # Cuts aus dem Cut-Pool (die Variablen müssen dafür bereits im Modell sein)
+        if self.cut_pool is not None and len(self.cut_pool):
+            self.model.update()
+            applied = self.cut_pool.apply(self)
+            print(f"  -> {applied} von {len(self.cut_pool)} Cuts aus dem Cut-Pool übernommen"
+                  f"{' (lazy)' if self.cut_pool.lazy else ''}.")
+        # Untere Schranke für theta aus den pfadabhängigen frühesten Startzeiten
+        with instrumentation.current().timer("master.objective_bound"):
+            self._create_objective_bound()
         self.model.setObjective(self.theta, GRB.MINIMIZE)
 
+    def _create_objective_bound(self):
+        """theta >= Summe der Kosten der Zielkomponenten zu ihren frühesten Startzeiten.
+
+        Der konstante Anteil nutzt die früheste Startzeit aus der Zeitfenster-Propagation. Wählt der
+        Master zusätzlich einen Nachfolger s von q (z[q, s] = 1), beginnt s frühestens zu
+        earliest[q] + dauer[q] und jede über eindeutige Nachfolger erreichbare Operation entsprechend
+        später. Je Komponente mit solchen Kanten schätzt eine Variable delay_k >= 0 die Mehrkosten
+        über das Maximum dieser Implikationen ab.
+
+        Kosten fallen nur an, wenn die Operation auf dem gewählten Weg liegt. Für Operationen, die
+        nicht jeder Weg besucht, werden Grund- und Mehrkosten mit der Wegvariable on_path
+        (siehe _create_path_indicators) gewichtet.
+        """
+        a, windows = self.problem.arrays, self.time_windows
+        offsets, durations = a.train_offsets.tolist(), a.min_duration.tolist()
+        earliest = windows.earliest.tolist()
+        predecessors = [[] for _ in windows.allowed]
+        for g, succs in enumerate(windows.allowed):
+            for s in succs: predecessors[s].append(g)
+        self._create_path_indicators()
+
+        base_total, excess = 0.0, []
+        for k, obj in enumerate(self.problem.objective_components):
+            target = offsets[obj.train] + obj.operation
+            base = obj.cost(earliest[target])
+            on_path = self.on_path.get((obj.train, obj.operation))
+            if on_path is None: base_total += base
+            elif base > 0: excess.append(base * on_path)
+            # Rückwärts über eindeutige Nachfolger; distance[v] = Mindestabstand von v bis zum Ziel
+            distance, stack, bounds = {target: 0}, [target], {}
+            while stack:
+                v = stack.pop()
+                for q in predecessors[v]:
+                    if len(windows.allowed[q]) == 1:
+                        if q not in distance:
+                            distance[q] = distance[v] + durations[q]
+                            stack.append(q)
+                        continue
+                    extra = obj.cost(earliest[q] + durations[q] + distance[v]) - base
+                    key = (obj.train, q - offsets[obj.train], v - offsets[obj.train])
+                    if extra > 0 and key in self.z: bounds[key] = max(bounds.get(key, 0), extra)
+            if not bounds: continue
+            delay = self.model.addVar(name=f"delay_{k}", vtype=GRB.CONTINUOUS, lb=0.0)
+            for key, extra in bounds.items():
+                if on_path is None: self.model.addConstr(delay >= extra * self.z[key])
+                else: self.model.addConstr(delay >= extra * (self.z[key] + on_path - 1))
+            excess.append(delay)
+        if excess: self.model.addConstr(self.theta >= base_total + gp.quicksum(excess))
+        else: self.theta.lb = base_total
+        if base_total > 0 or excess:
+            print(f"  -> Zielschranke: theta >= {base_total:g}, {len(excess)} Komponenten mit pfadabhängiger Schranke.")
+
+    def _create_path_indicators(self):
+        """Wegvariablen on_path[t, o] für Operationen mit Zielkomponente, die nicht jeder Weg besucht.
+
+        on_path[t, s] >= on_path[t, o] + z[t, o, s] - 1 entlang der erlaubten Kanten (Operationen
+        auf jedem Weg zählen als 1) erzwingt on_path = 1 für jede Operation des gewählten Weges. Nach
+        unten ist on_path frei; da theta minimiert wird, ist on_path in einer optimalen Lösung genau
+        dann 1, wenn die Operation auf dem Weg liegt. Angelegt werden die Variablen für alle nicht
+        zwingenden Operationen der betroffenen Züge, da der Weg zum Ziel über jede davon laufen kann.
+        """
+        a, windows = self.problem.arrays, self.time_windows
+        offsets = a.train_offsets.tolist()
+        mandatory = windows.mandatory_operations().tolist()
+        self.on_path: Dict[tuple, gp.Var] = {}
+        trains = sorted({obj.train for obj in self.problem.objective_components
+                         if not mandatory[offsets[obj.train] + obj.operation]})
+        for t_idx in trains:
+            for g in range(offsets[t_idx], offsets[t_idx + 1]):
+                if not mandatory[g]:
+                    self.on_path[t_idx, g - offsets[t_idx]] = self.model.addVar(
+                        name=f"on_path_{t_idx}_{g - offsets[t_idx]}", vtype=GRB.CONTINUOUS, lb=0.0, ub=1.0)
+            for g in range(offsets[t_idx], offsets[t_idx + 1]):
+                o_idx = g - offsets[t_idx]
+                for s in windows.allowed[g]:
+                    s_idx = s - offsets[t_idx]
+                    if (t_idx, s_idx) not in self.on_path: continue
+                    before = self.on_path.get((t_idx, o_idx), 1)
+                    chosen = self.z.get((t_idx, o_idx, s_idx), 1)
+                    self.model.addConstr(self.on_path[t_idx, s_idx] >= before + chosen - 1)
+
+    def tighten_time_windows(self) -> int:
+        """Propagiert die Zeitfenster nach einer Verschärfung (start_lb höher, start_ub tiefer) neu.
+
+        Bisherige Fixierungen und entfernte Pfade bleiben gültig, da engere Zeitfenster nur weitere
+        Reihenfolgen und Pfade ausschließen. Neu erzwungene Reihenfolgen und unmögliche Pfade werden
+        als Variablenschranken übernommen. Gibt die Anzahl neu fixierter Variablen zurück; bleiben die
+        Zeitfenster gleich, entfällt die Einstufung der Konflikte.
+        """
+        previous = self.time_windows
+        self.time_windows = time_windows.TimeWindows(self.problem)
+        self.big_m = bounds.BigM(self.problem, self.time_windows)
+        if np.array_equal(previous.earliest, self.time_windows.earliest) and \
+                np.array_equal(previous.latest, self.time_windows.latest) and \
+                previous.pruned_paths == self.time_windows.pruned_paths: return 0
+        status = self.time_windows.classify_conflicts(self.conflict_index)
+        fixed = 0
+        for key in self.time_windows.forced_orders(self.conflict_index, status):
+            if self.y[key].lb < 1:
+                self.y[key].lb = 1
+                self.fixed_orders.append(key)
+                fixed += 1
+        for key in self.time_windows.pruned_paths:
+            if self.z[key].ub > 0:
+                self.z[key].ub = 0
+                fixed += 1
+        self.model.update()
+        return fixed
+
+    def set_start(self, cut: cuts.OptimalityCut):
+        """Übergibt die y/z-Belegung eines bewerteten Optimalitäts-Cuts als MIP-Start."""
+        for var in cut.active_vars: var.Start = 1.0
+        for var in cut.inactive_vars: var.Start = 0.0
+        self.theta.Start = cut.objective_value
+
+    def get_chosen_successor(self, master_solution: Dict[gp.Var, float], t_idx: int, o_idx: int) -> int:
+        """Nachfolger von (t_idx, o_idx) gemäß Master-Lösung, -1 falls keiner gewählt ist."""
+        op = self.problem.trains[t_idx].operations[o_idx]
+        if not op.successors: return -1
+        if len(op.successors) == 1: return op.successors[0]
+        for s_idx in op.successors:
+            if master_solution.get(self.z[t_idx, o_idx, s_idx], 0.0) > 0.5: return s_idx
+        return -1
+
+    def chosen_paths(self, master_solution: Dict[gp.Var, float], trains: Optional[List[int]] = None) -> Dict[tuple, Tuple[gp.Var, ...]]:
+        """Operationen auf den gewählten Wegen (alle Züge oder die übergebenen) mit den z-Variablen davor.
+
+        Nur diese Operationen kommen in einer DISPLIB-Lösung vor und werden in der Zielfunktion
+        bewertet; Komponenten auf nicht gewählten Alternativen kosten nichts. Die z-Variablen sind
+        die der Verzweigungen, über die der Weg die Operation erreicht.
+        """
+        paths = {}
+        for t_idx in (range(len(self.problem.trains)) if trains is None else trains):
+            o_idx = 0 if self.problem.trains[t_idx].operations else -1
+            chosen: Tuple[gp.Var, ...] = ()
+            while o_idx != -1:
+                paths[t_idx, o_idx] = chosen
+                s_idx = self.get_chosen_successor(master_solution, t_idx, o_idx)
+                z_var = self.z.get((t_idx, o_idx, s_idx))
+                if z_var is not None: chosen += (z_var,)
+                o_idx = s_idx
+        return paths
+
+    def path_events(self, cut: cuts.OptimalityCut) -> List[Dict]:
+        """Events eines bewerteten Cuts, beschränkt auf die gewählten Wege und geordnet wie eine
+        DISPLIB-Lösung (siehe verifier.order_events)."""
+        on_path = self.chosen_paths(dict.fromkeys(cut.active_vars, 1.0))
+        return verifier.order_events(self.problem, [e for e in cut.events if (e['train'], e['operation']) in on_path])
+
     def get_solution(self) -> Dict[gp.Var, float]:
         solution = {}
         for var in self.model.getVars():
@@ -1,43 +1,156 @@
 import json
 import os
-from typing import List, Dict, Any
+from types import MappingProxyType
+from typing import List, Dict, Any, FrozenSet, Iterable, Iterator, Mapping, NamedTuple, Optional, Tuple
+import numpy as np
+import instance_cache
+import instrumentation
+import deadlock_cycles
+
+class InstanceArrays:
+    """Spaltenorientierte Ablage aller Operationen einer Instanz.
+
+    Operationen sind global durchnummeriert (gid = train_offsets[t] + o). Nachfolger und
+    Ressourcenbelegungen liegen im CSR-Format (ptr/idx), Ressourcennamen sind auf
+    ganzzahlige Ids interniert. Alle Arrays sind schreibgeschützt.
+    """
+    __slots__ = ("train_offsets", "start_lb", "start_ub", "min_duration", "succ_ptr", "succ_idx",
+                 "res_ptr", "res_id", "res_release", "resource_names")
+
+    def __init__(self, train_offsets: np.ndarray, start_lb: np.ndarray, start_ub: np.ndarray,
+                 min_duration: np.ndarray, succ_ptr: np.ndarray, succ_idx: np.ndarray, res_ptr: np.ndarray,
+                 res_id: np.ndarray, res_release: np.ndarray, resource_names: List[str]):
+        self.train_offsets = train_offsets
+        self.start_lb = start_lb          # int64, Default 0
+        self.start_ub = start_ub          # float64, inf = keine obere Schranke
+        self.min_duration = min_duration  # int64
+        self.succ_ptr = succ_ptr          # int64 [N+1]
+        self.succ_idx = succ_idx          # int32, zugeinterne Operationsindizes
+        self.res_ptr = res_ptr            # int64 [N+1]
+        self.res_id = res_id              # int32, Index in resource_names
+        self.res_release = res_release    # int64
+        self.resource_names = resource_names
+        for name in self.__slots__[:-1]:
+            getattr(self, name).flags.writeable = False
+
+    @classmethod
+    def from_trains_data(cls, trains_data: List[List[Dict[str, Any]]]) -> "InstanceArrays":
+        train_offsets, start_lb, start_ub, min_duration = [0], [], [], []
+        succ_ptr, succ_idx, res_ptr, res_id, res_release = [0], [], [0], [], []
+        resource_ids: Dict[str, int] = {}
+        for train_ops_data in trains_data:
+            for op_data in train_ops_data:
+                start_lb.append(op_data.get("start_lb", 0))
+                start_ub.append(op_data.get("start_ub", float('inf')))
+                min_duration.append(op_data["min_duration"])
+                succ_idx.extend(op_data.get("successors", []))
+                succ_ptr.append(len(succ_idx))
+                for res in op_data.get("resources", []):
+                    res_name = res.get("resource")
+                    if not res_name: continue
+                    res_id.append(resource_ids.setdefault(res_name, len(resource_ids)))
+                    res_release.append(res.get("release_time", 0))
+                res_ptr.append(len(res_id))
+            train_offsets.append(len(start_lb))
+        return cls(
+            np.array(train_offsets, dtype=np.int64), np.array(start_lb, dtype=np.int64),
+            np.array(start_ub, dtype=np.float64), np.array(min_duration, dtype=np.int64),
+            np.array(succ_ptr, dtype=np.int64), np.array(succ_idx, dtype=np.int32),
+            np.array(res_ptr, dtype=np.int64), np.array(res_id, dtype=np.int32),
+            np.array(res_release, dtype=np.int64), list(resource_ids),
+        )
+
+    @property
+    def num_operations(self) -> int:
+        return len(self.start_lb)
+
+    def gid(self, t_idx: int, o_idx: int) -> int:
+        return int(self.train_offsets[t_idx]) + o_idx
+
+    def replace_bounds(self, start_lb: Dict[int, int], start_ub: Dict[int, float]):
+        """Ersetzt start_lb/start_ub durch Kopien mit den geänderten Werten (je globaler Operation).
+
+        Die Arrays bleiben schreibgeschützt; Sichten (Operation) lesen danach die neuen Werte.
+        """
+        for name, changes in (("start_lb", start_lb), ("start_ub", start_ub)):
+            if not changes: continue
+            arr = getattr(self, name).copy()
+            arr[list(changes)] = list(changes.values())
+            arr.flags.writeable = False
+            setattr(self, name, arr)
+
+    def operation_owners(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Zug- und zugeinterner Operationsindex je globaler Operation."""
+        train_of = np.repeat(np.arange(len(self.train_offsets) - 1), np.diff(self.train_offsets))
+        return train_of, np.arange(self.num_operations) - self.train_offsets[train_of]
 
 class Operation:
-    """Stellt eine einzelne Operation innerhalb des Graphen eines Zuges dar."""
-    def __init__(self, train_idx: int, op_idx: int, op_data: Dict[str, Any]):
+    """Sicht auf eine einzelne Operation innerhalb des Graphen eines Zuges (Daten in InstanceArrays)."""
+    __slots__ = ("train_idx", "op_idx", "_arrays", "_gid")
+
+    def __init__(self, train_idx: int, op_idx: int, arrays: InstanceArrays):
         self.train_idx = train_idx
         self.op_idx = op_idx
-        self.start_lb: int = op_data.get("start_lb", 0)
-        self.start_ub: int = op_data.get("start_ub", float('inf'))
-        self.min_duration: int = op_data["min_duration"]
-        self.successors: List[int] = op_data.get("successors", [])
-        self.resources: List[Dict] = op_data.get("resources", [])
+        self._arrays = arrays
+        self._gid = arrays.gid(train_idx, op_idx)
+
+    @property
+    def start_lb(self) -> int:
+        return int(self._arrays.start_lb[self._gid])
+
+    @property
+    def start_ub(self):
+        ub = self._arrays.start_ub[self._gid]
+        return float('inf') if ub == np.inf else int(ub)
+
+    @property
+    def min_duration(self) -> int:
+        return int(self._arrays.min_duration[self._gid])
+
+    @property
+    def successors(self) -> List[int]:
+        ptr = self._arrays.succ_ptr
+        return self._arrays.succ_idx[ptr[self._gid]:ptr[self._gid + 1]].tolist()
+
+    @property
+    def resources(self) -> List[Dict]:
+        a = self._arrays
+        lo, hi = a.res_ptr[self._gid], a.res_ptr[self._gid + 1]
+        return [{"resource": a.resource_names[r], "release_time": rel}
+                for r, rel in zip(a.res_id[lo:hi].tolist(), a.res_release[lo:hi].tolist())]
+
+    def to_data(self) -> Dict[str, Any]:
+        """Die Operation im DISPLIB-Format (start_ub nur, falls endlich)."""
+        data = {"start_lb": self.start_lb, "min_duration": self.min_duration, "resources": self.resources,
+                "successors": self.successors}
+        if self.start_ub < float('inf'): data["start_ub"] = self.start_ub
+        return data
 
 class Train:
     """Stellt einen einzelnen Zug mit all seinen Operationen dar."""
-    def __init__(self, train_idx: int, operations_data: List[Dict[str, Any]]):
+    def __init__(self, train_idx: int, arrays: InstanceArrays):
         self.train_idx = train_idx
-        self.operations: List[Operation] = [
-            Operation(train_idx, op_idx, op_data)
-            for op_idx, op_data in enumerate(operations_data)
-        ]
+        self._arrays = arrays
+        num_ops = int(arrays.train_offsets[train_idx + 1] - arrays.train_offsets[train_idx])
+        self.operations: List[Operation] = [Operation(train_idx, op_idx, arrays) for op_idx in range(num_ops)]
 
     def get_shortest_paths_to_exit(self) -> dict:
         """Berechnet für jede Operation die kürzeste verbleibende Dauer bis zum Ende des Zuges."""
+        a = self._arrays
+        base = int(a.train_offsets[self.train_idx])
         num_ops = len(self.operations)
-        dist = {i: float('inf') for i in range(num_ops)}
+        durations = a.min_duration[base:base + num_ops].tolist()
+        succ_ptr = (a.succ_ptr[base:base + num_ops + 1] - a.succ_ptr[base]).tolist()
+        succ_idx = a.succ_idx[a.succ_ptr[base]:a.succ_ptr[base + num_ops]].tolist()
+        dist = [float('inf')] * num_ops
         exit_op_idx = num_ops - 1
         if exit_op_idx >= 0:
             dist[exit_op_idx] = 0
         for i in range(exit_op_idx - 1, -1, -1):
-            op = self.operations[i]
-            if not op.successors: continue
-            min_succ_dist = float('inf')
-            for s_idx in op.successors:
-                path_dist = op.min_duration + dist.get(s_idx, float('inf'))
-                min_succ_dist = min(min_succ_dist, path_dist)
-            dist[i] = min_succ_dist
-        return dist
+            succs = succ_idx[succ_ptr[i]:succ_ptr[i + 1]]
+            if not succs: continue
+            dist[i] = durations[i] + min(dist[s_idx] for s_idx in succs)
+        return dict(enumerate(dist))
 
 class ObjectiveComponent:
     """Stellt eine Komponente der Zielfunktion dar."""
@@ -49,90 +162,342 @@ class ObjectiveComponent:
         self.increment: int = data.get("increment", 0)
         self.coeff: int = data.get("coeff", 0)
 
+    def cost(self, time: int) -> float:
+        """Beitrag zur Zielfunktion bei Startzeit 'time' (Sprunganteil ab t >= threshold)."""
+        return self.coeff * max(0, time - self.threshold) + (self.increment if time >= self.threshold else 0)
+
+class Conflict(NamedTuple):
+    """Ein Ressourcenkonflikt zwischen zwei Operationen verschiedener Züge."""
+    t1: int
+    o1: int
+    t2: int
+    o2: int
+    shared_resources: FrozenSet[str]
+    release1: int  # Maximale Release-Zeit von (t1, o1) über die gemeinsamen Ressourcen
+    release2: int  # Maximale Release-Zeit von (t2, o2) über die gemeinsamen Ressourcen
+
+class ConflictIndex:
+    """Unveränderlicher Index aller Ressourcenkonflikte über der flachen Konflikttabelle.
+
+    Die Tabelle (beim Laden aus dem Cache per mmap) ist die Grundlage; Conflict-Tupel, usage_map und
+    die Sichten je Zug bzw. Operation entstehen erst beim ersten Zugriff darauf.
+    """
+    __slots__ = ("_arrays", "_table", "_usage_map", "_conflicts", "_by_op", "_by_train")
+
+    def __init__(self, arrays: InstanceArrays, table: Optional[Dict[str, np.ndarray]] = None):
+        """Index über der Konflikttabelle (wird bei Bedarf berechnet, siehe build_table)."""
+        if table is None: table = self.build_table(arrays)
+        self._arrays = arrays
+        self._table = table
+        self._usage_map = self._conflicts = self._by_op = self._by_train = None
+
+    def _materialize(self) -> Tuple[Conflict, ...]:
+        """Baut die Conflict-Tupel und ihre Blöcke je Zug aus der Tabelle."""
+        table, names = self._table, self._arrays.resource_names
+        train_of, op_of = self._arrays.operation_owners()
+        first, second = table["first"], table["second"]
+        shared_ptr, shared_res = table["shared_ptr"], table["shared_res"]
+        # Meist teilen sich zwei Operationen genau eine Ressource; gleiche Mengen werden wiederverwendet
+        single = [frozenset((name,)) for name in names]
+        shared = [single[r] for r in shared_res[shared_ptr[:-1]].tolist()] if len(first) else []
+        shared_ptr_list, shared_res_list, memo = shared_ptr.tolist(), shared_res.tolist(), {}
+        for k in np.flatnonzero(np.diff(shared_ptr) > 1).tolist():
+            key = tuple(shared_res_list[shared_ptr_list[k]:shared_ptr_list[k + 1]])
+            shared[k] = memo.get(key) or memo.setdefault(key, frozenset(names[r] for r in key))
+        conflicts = tuple(map(Conflict._make, zip(
+            train_of[first].tolist(), op_of[first].tolist(), train_of[second].tolist(), op_of[second].tolist(),
+            shared, table["release1"].tolist(), table["release2"].tolist())))
+
+        # Konflikte sind nach (t1, o1) sortiert, die Konflikte eines Zuges bilden also einen Block
+        num_trains = len(self._arrays.train_offsets) - 1
+        train_bounds = np.searchsorted(train_of[first], np.arange(num_trains + 1)).tolist()
+        self._by_train = MappingProxyType({t: conflicts[lo:hi] for t, (lo, hi) in
+                                           enumerate(zip(train_bounds[:-1], train_bounds[1:])) if hi > lo})
+        self._conflicts = conflicts
+        return conflicts
+
+    def restrict(self, keep: np.ndarray) -> "ConflictIndex":
+        """Teilindex mit den Konflikten, für die keep (bool je Konflikt, Reihenfolge des Index) gilt."""
+        keep = np.asarray(keep, dtype=bool)
+        counts = np.diff(self._table["shared_ptr"])
+        table = {name: (arr[keep] if name in ("first", "second", "release1", "release2") else arr)
+                 for name, arr in self._table.items()}
+        table["shared_ptr"] = np.concatenate(([0], np.cumsum(counts[keep]))).astype(np.int64)
+        table["shared_res"] = self._table["shared_res"][np.repeat(keep, counts)]
+
+        sub = ConflictIndex(self._arrays, table)
+        sub._usage_map = self._usage_map
+        return sub
+
+    @staticmethod
+    def build_table(arrays: InstanceArrays) -> Dict[str, np.ndarray]:
+        """Berechnet alle Konflikte vektorisiert als flache Arrays.
+
+        usage_ptr/usage_gid: Belegungen je Ressourcen-Id (CSR, globale Operationsindizes).
+        first/second/release1/release2: ein Eintrag je Konflikt, sortiert nach (first, second).
+        shared_ptr/shared_res: gemeinsame Ressourcen-Ids je Konflikt (CSR).
+        """
+        n_ops, n_res = arrays.num_operations, len(arrays.resource_names)
+        train_of, _ = arrays.operation_owners()
+        owner = np.repeat(np.arange(n_ops, dtype=np.int64), np.diff(arrays.res_ptr))
+        res_id, res_release = arrays.res_id.astype(np.int64), arrays.res_release
+        # Nennt eine Operation dieselbe Ressource mehrfach, gilt wie bisher der letzte Eintrag
+        _, last = np.unique((owner * n_res + res_id)[::-1], return_index=True)
+        keep = np.sort(len(owner) - 1 - last)
+        owner, res_id, res_release = owner[keep], res_id[keep], res_release[keep]
+
+        # Nutzungen nach Ressource gruppieren (innerhalb einer Ressource aufsteigend nach Operation)
+        order = np.lexsort((owner, res_id))
+        owner, res_id, res_release = owner[order], res_id[order], res_release[order]
+        usage_ptr = np.searchsorted(res_id, np.arange(n_res + 1)).astype(np.int64)
+
+        pair_parts = []
+        for lo, hi in zip(usage_ptr[:-1].tolist(), usage_ptr[1:].tolist()):
+            if hi - lo < 2: continue
+            gids = owner[lo:hi]
+            i, j = np.triu_indices(hi - lo, 1)
+            mask = train_of[gids[i]] != train_of[gids[j]]
+            if mask.any(): pair_parts.append((i[mask] + lo, j[mask] + lo))
+
+        empty = np.zeros(0, dtype=np.int64)
+        table = {"usage_ptr": usage_ptr, "usage_gid": owner, "first": empty, "second": empty,
+                 "release1": empty, "release2": empty, "shared_ptr": np.zeros(1, dtype=np.int64),
+                 "shared_res": np.zeros(0, dtype=np.int32)}
+        if not pair_parts: return table
+
+        first = np.concatenate([p[0] for p in pair_parts])
+        second = np.concatenate([p[1] for p in pair_parts])
+        keys = owner[first] * n_ops + owner[second]
+        order = np.argsort(keys, kind="stable")
+        first, second, keys = first[order], second[order], keys[order]
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+        table.update({
+            "first": owner[first[bounds]], "second": owner[second[bounds]],
+            "release1": np.maximum.reduceat(res_release[first], bounds),
+            "release2": np.maximum.reduceat(res_release[second], bounds),
+            "shared_ptr": np.append(bounds, len(keys)).astype(np.int64),
+            "shared_res": res_id[first].astype(np.int32),
+        })
+        return table
+
+    @property
+    def table(self) -> Mapping[str, np.ndarray]:
+        """Die flache Konflikttabelle, aus der der Index aufgebaut wurde."""
+        return MappingProxyType(self._table)
+
+    @property
+    def usage_map(self) -> Mapping[str, Tuple[Tuple[int, int], ...]]:
+        """Ressource -> alle (Zug, Operation), die sie belegen."""
+        if self._usage_map is None:
+            train_of, op_of = self._arrays.operation_owners()
+            train_list, op_list = train_of.tolist(), op_of.tolist()
+            usage: Dict[str, tuple] = {}
+            usage_ptr, usage_gid = self._table["usage_ptr"].tolist(), self._table["usage_gid"].tolist()
+            for r_id, name in enumerate(self._arrays.resource_names):
+                lo, hi = usage_ptr[r_id], usage_ptr[r_id + 1]
+                if hi > lo: usage[name] = tuple((train_list[g], op_list[g]) for g in usage_gid[lo:hi])
+            self._usage_map = MappingProxyType(usage)
+        return self._usage_map
+
+    @property
+    def conflicts(self) -> Tuple[Conflict, ...]:
+        return self._conflicts if self._conflicts is not None else self._materialize()
+
+    def get_conflicts_of(self, t_idx: int, o_idx: int) -> Tuple[Conflict, ...]:
+        """Alle Konflikte, an denen die Operation (t_idx, o_idx) beteiligt ist."""
+        if self._by_op is None:
+            by_op: Dict[Tuple[int, int], list] = {}
+            for c in self.conflicts:
+                by_op.setdefault((c.t1, c.o1), []).append(c)
+                by_op.setdefault((c.t2, c.o2), []).append(c)
+            self._by_op = MappingProxyType({key: tuple(cs) for key, cs in by_op.items()})
+        return self._by_op.get((t_idx, o_idx), ())
+
+    def conflicts_among(self, trains: Optional[Iterable[int]] = None) -> Iterator[Conflict]:
+        """Alle Konflikte, deren beide Züge in 'trains' liegen (jeder genau einmal); None = alle."""
+        conflicts = self.conflicts
+        if trains is None:
+            yield from conflicts
+            return
+        train_set = set(trains)
+        for t_idx in sorted(train_set):
+            for c in self._by_train.get(t_idx, ()):
+                if c.t2 in train_set: yield c
+
+    def __iter__(self):
+        return iter(self.conflicts)
+
+    def __len__(self) -> int:
+        return len(self._table["first"])
+
 class ProblemInstance:
     """Lädt und speichert eine vollständige DISPLIB-Probleminstanz."""
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, use_cache: bool = False):
+        """Mit use_cache=True werden Arrays und abgeleitete Strukturen in einer Binärdatei neben
+        der JSON-Datei abgelegt und bei späteren Läufen per mmap geladen (siehe instance_cache)."""
         self.filepath = filepath
         self.trains: List[Train] = []
         self.objective_components: List[ObjectiveComponent] = []
-        self._load_from_json()
+        self._swap_constraints: Optional[list] = None
+        self._cycle_constraints: Dict[Tuple[int, int], list] = {}
+        stats = instrumentation.current()
+        if use_cache:
+            with stats.timer("load.cache"):
+                if self._load_from_cache(): return
+        with stats.timer("load.json"):
+            self._load_from_json()
+        with stats.timer("load.conflict_index"):
+            self.conflict_index = ConflictIndex(self.arrays)
+        if use_cache:
+            with stats.timer("load.cache_write"):
+                self._write_cache()
+
+    @classmethod
+    def from_data(cls, data: Dict[str, Any], name: str = "<data>") -> "ProblemInstance":
+        """Baut eine Instanz aus bereits geladenen DISPLIB-Daten ({"trains": ..., "objective": ...}),
+        z.B. für Teilinstanzen; ohne Datei und ohne Cache."""
+        problem = object.__new__(cls)
+        problem.filepath = name
+        problem.trains, problem.objective_components = [], []
+        problem._swap_constraints, problem._cycle_constraints = None, {}
+        problem._load_data(dict(data))
+        problem.conflict_index = ConflictIndex(problem.arrays)
+        return problem
+
+    def to_data(self) -> Dict[str, Any]:
+        """Die Instanz im DISPLIB-Format, z.B. um sie verändert per from_data neu aufzubauen."""
+        return {"trains": [[op.to_data() for op in train.operations] for train in self.trains],
+                "objective": [dict(vars(obj)) for obj in self.objective_components]}
+
+    def update_bounds(self, start_lb: Optional[Dict[Tuple[int, int], int]] = None,
+                      start_ub: Optional[Dict[Tuple[int, int], float]] = None) -> bool:
+        """Setzt neue Zeitfenster-Grenzen je (Zug, Operation), z.B. nach einer Verspätungsmeldung.
+
+        Konfliktindex, Swaps und Deadlock-Zyklen hängen nicht von den Zeitfenstern ab und bleiben.
+        Gibt True zurück, wenn die Zeitfenster nur enger werden (start_lb steigt, start_ub sinkt).
+        """
+        a = self.arrays
+        lb = {a.gid(t, o): value for (t, o), value in (start_lb or {}).items()}
+        ub = {a.gid(t, o): value for (t, o), value in (start_ub or {}).items()}
+        tightening = all(value >= a.start_lb[g] for g, value in lb.items()) and \
+                     all(value <= a.start_ub[g] for g, value in ub.items())
+        a.replace_bounds(lb, ub)
+        return tightening
 
     def _load_from_json(self):
         print(f"Lade Probleminstanz von: {self.filepath}")
         with open(self.filepath, 'r') as f: data = json.load(f)
-        for train_idx, train_ops_data in enumerate(data.get("trains", [])):
-            self.trains.append(Train(train_idx, train_ops_data))
+        self._load_data(data)
+
+    def _load_data(self, data: Dict[str, Any]):
+        self.arrays = InstanceArrays.from_trains_data(data.get("trains", []))
+        data["trains"] = None  # Die Operations-Dicts werden nicht mehr gebraucht
+        self.trains = [Train(train_idx, self.arrays) for train_idx in range(len(self.arrays.train_offsets) - 1)]
         for obj_data in data.get("objective", []):
             self.objective_components.append(ObjectiveComponent(obj_data))
         print(f"Laden erfolgreich: {len(self.trains)} Züge und {len(self.objective_components)} Zielfunktions-Komponenten gefunden.")
 
-    def get_resource_usage_map(self) -> Dict[str, list]:
-        usage_map = {}
-        for t_idx, train in enumerate(self.trains):
-            for o_idx, op in enumerate(train.operations):
-                for res in op.resources:
-                    res_name = res.get("resource")
-                    if res_name:
-                        usage_map.setdefault(res_name, []).append((t_idx, o_idx))
-        return usage_map
+    def _load_from_cache(self) -> bool:
+        self._source_hash = instance_cache.file_sha256(self.filepath)
+        cached = instance_cache.read_cache(instance_cache.cache_path_for(self.filepath), self._source_hash)
+        if cached is None: return False
+        meta, arrays = cached
+        print(f"Lade Probleminstanz aus Cache: {instance_cache.cache_path_for(self.filepath)}")
+        self.arrays = InstanceArrays(*(arrays[name] for name in InstanceArrays.__slots__[:-1]), meta["resource_names"])
+        self.trains = [Train(train_idx, self.arrays) for train_idx in range(len(self.arrays.train_offsets) - 1)]
+        self.objective_components = [ObjectiveComponent(obj_data) for obj_data in meta["objective"]]
+        self.conflict_index = ConflictIndex(self.arrays, {name[len("conflict_"):]: arr for name, arr in arrays.items()
+                                                          if name.startswith("conflict_")})
+        self._swap_constraints = [tuple(map(tuple, pair)) for pair in arrays["swaps"].tolist()]
+        self._cycle_constraints[3, deadlock_cycles.DEFAULT_MAX_CYCLES] = [tuple(map(tuple, cycle)) for cycle in arrays["cycles"].tolist()]
+        return True
+
+    def _write_cache(self):
+        """Legt die Cache-Datei an; ein Fehler beim Schreiben ist für den Lauf nicht kritisch."""
+        arrays = {name: getattr(self.arrays, name) for name in InstanceArrays.__slots__[:-1]}
+        arrays.update({f"conflict_{name}": arr for name, arr in self.conflict_index.table.items()})
+        arrays["swaps"] = np.array(self.get_2_train_swap_constraints(), dtype=np.int64).reshape(-1, 2, 4)
+        arrays["cycles"] = np.array(self.get_3_train_cycle_constraints(), dtype=np.int64).reshape(-1, 3, 4)
+        meta = {"resource_names": self.arrays.resource_names,
+                "objective": [vars(obj) for obj in self.objective_components]}
+        try:
+            instance_cache.write_cache(instance_cache.cache_path_for(self.filepath), self._source_hash, meta, arrays)
+        except OSError as e:
+            print(f"Warnung: Cache-Datei konnte nicht geschrieben werden: {e}")
+
+    def get_resource_usage_map(self) -> Mapping[str, tuple]:
+        return self.conflict_index.usage_map
 
     def get_conflicts(self) -> set:
         """Erstellt eine Menge aller eindeutigen Ressourcenkonflikte."""
-        usage = self.get_resource_usage_map()
-        conflicts = set()
-        for res, ops in usage.items():
-            for i in range(len(ops)):
-                for j in range(i + 1, len(ops)):
-                    t1, o1 = ops[i]
-                    t2, o2 = ops[j]
-                    if t1 != t2:
-                        conflicts.add(tuple(sorted(((t1, o1), (t2, o2)))))
-        return conflicts
+        return {((c.t1, c.o1), (c.t2, c.o2)) for c in self.conflict_index}
+
+    def calculate_objective(self, times: Dict[Tuple[int, int], int]) -> float:
+        """Berechnet den DISPLIB-Zielfunktionswert (op_delay) für gegebene Startzeiten.
+
+        Komponenten, deren Operation keine Startzeit hat, tragen nichts bei. Der Sprunganteil
+        (increment) fällt gemäß Heaviside-Funktion ab t >= threshold an. Für eine Lösung sind nur die
+        Operationen der gewählten Wege zu übergeben (siehe MasterModel.chosen_paths), da die Subprobleme
+        auch Operationen abseits davon einplanen.
+        """
+        cost = 0.0
+        for obj in self.objective_components:
+            time = times.get((obj.train, obj.operation))
+            if time is None: continue
+            cost += obj.cost(time)
+        return cost
 
     def get_2_train_swap_constraints(self) -> list:
-        """Findet Paare von Konflikten, die zu 2-Zug-Deadlocks führen können."""
-        train_res = {
-            train.train_idx: {
-                r.get("resource"): op.op_idx
-                for op in train.operations
-                for r in op.resources if r.get("resource")
-            }
-            for train in self.trains
-        }
-        pairs = []
-        trains_list = sorted(list(train_res.keys()))
-        for i in range(len(trains_list)):
-            for j in range(i + 1, len(trains_list)):
-                t1, t2 = trains_list[i], trains_list[j]
-                m1, m2 = train_res[t1], train_res[t2]
-                shared = sorted(list(set(m1.keys()) & set(m2.keys())))
-                for a in range(len(shared)):
-                    for b in range(a + 1, len(shared)):
-                        rA, rB = shared[a], shared[b]
-                        o1A, o1B = m1[rA], m1[rB]
-                        o2A, o2B = m2[rA], m2[rB]
-                        if (o1A < o1B and o2A > o2B) or (o1A > o1B and o2A < o2B):
-                            pairs.append(((t1, o1A, t2, o2A), (t1, o1B, t2, o2B)))
-        return pairs
+        """Findet Paare von Konflikten, die zu 2-Zug-Deadlocks führen können.
+
+        Ein Paar ((t1, o1A, t2, o2A), (t1, o1B, t2, o2B)) beschreibt einen Gegenverkehr über zwei
+        benachbarte Ressourcen: t1 fährt von A (o1A) direkt nach B (o1B), t2 von B (o2B) direkt nach A
+        (o2A). Haben o1B und o2A Nachfolger, muss die Reihenfolge auf A und B gleich sein (sonst warten
+        beide aufeinander). Das gilt auch ohne Release-Zeiten: Ein Tausch im selben Zeitpunkt ist
+        unzulässig, da das Ende-Event des freigebenden Zuges vor dem Start-Event des nächsten liegen muss.
+        Nicht benachbarte Ressourcenpaare (z.B. Kreuzungen in Überholgleisen) erzeugen kein Paar.
+
+        Die Suche läuft über einen Index (Ressource vorher, Ressource nachher) -> Übergänge und
+        berücksichtigt jedes Vorkommen einer Ressource im Zuggraphen.
+        """
+        if self._swap_constraints is not None: return self._swap_constraints
+        a = self.arrays
+        offsets = a.train_offsets.tolist()
+        succ_ptr, succ_idx = a.succ_ptr.tolist(), a.succ_idx.tolist()
+        res_ptr, res_id = a.res_ptr.tolist(), a.res_id.tolist()
+        # Übergänge g -> s (s einziger Nachfolger) je Ressourcenpaar: (rA, rB) -> [(t, o_g, o_s)]
+        steps: Dict[Tuple[int, int], List[tuple]] = {}
+        for t in range(len(offsets) - 1):
+            base = offsets[t]
+            for g in range(base, offsets[t + 1]):
+                if succ_ptr[g + 1] - succ_ptr[g] != 1: continue
+                s = base + succ_idx[succ_ptr[g]]
+                # Ohne Nachfolger von s entsteht nie eine Reihenfolge-Constraint auf B
+                if succ_ptr[s + 1] == succ_ptr[s]: continue
+                for i in range(res_ptr[g], res_ptr[g + 1]):
+                    for j in range(res_ptr[s], res_ptr[s + 1]):
+                        if res_id[i] != res_id[j]:
+                            steps.setdefault((res_id[i], res_id[j]), []).append((t, g - base, s - base))
+        pairs = set()
+        for (r_a, r_b), forward in steps.items():
+            backward = steps.get((r_b, r_a))
+            if not backward or r_a > r_b: continue
+            for t1, o1A, o1B in forward:
+                for t2, o2B, o2A in backward:
+                    if t1 == t2: continue
+                    if t1 < t2: pairs.add(((t1, o1A, t2, o2A), (t1, o1B, t2, o2B)))
+                    else: pairs.add(((t2, o2B, t1, o1B), (t2, o2A, t1, o1A)))
+        self._swap_constraints = sorted(pairs)
+        return self._swap_constraints
+
+    def get_deadlock_cycle_constraints(self, max_length: int = 3, max_cycles: int = deadlock_cycles.DEFAULT_MAX_CYCLES) -> list:
+        """Findet Deadlock-Zyklen über 3 bis max_length Züge als Tupel von y-Schlüsseln (siehe deadlock_cycles)."""
+        key = (max_length, max_cycles)
+        if key not in self._cycle_constraints:
+            self._cycle_constraints[key] = deadlock_cycles.find_deadlock_cycles(
+                self.arrays, self.conflict_index, max_length, max_cycles)
+        return self._cycle_constraints[key]
 
     def get_3_train_cycle_constraints(self) -> list:
         """Findet Tripletts von Konflikten, die 3-Zug-Deadlock-Zyklen bilden."""
-        cycles = []
-        conflicts = self.get_conflicts()
-        conflict_map = {}
-        for c in conflicts:
-            (t1, o1), (t2, o2) = c
-            conflict_map[(t1, t2)] = (o1, o2)
-            conflict_map[(t2, t1)] = (o2, o1)
-        trains_list = sorted(list(set(t for c in conflicts for pair in c for t in pair)))
-        for i in range(len(trains_list)):
-            for j in range(i + 1, len(trains_list)):
-                for k in range(j + 1, len(trains_list)):
-                    t1, t2, t3 = trains_list[i], trains_list[j], trains_list[k]
-                    c12, c23, c31 = conflict_map.get((t1, t2)), conflict_map.get((t2, t3)), conflict_map.get((t3, t1))
-                    if c12 and c23 and c31:
-                        cycles.append(((t1, c12[0], t2, c12[1]), (t2, c23[0], t3, c23[1]), (t3, c31[0], t1, c31[1])))
-                    c13, c32, c21 = conflict_map.get((t1, t3)), conflict_map.get((t3, t2)), conflict_map.get((t2, t1))
-                    if c13 and c32 and c21:
-                        cycles.append(((t1, c13[0], t3, c13[1]), (t3, c32[0], t2, c32[1]), (t2, c21[0], t1, c21[1])))
-        return cycles
\ No newline at end of file
+        return self.get_deadlock_cycle_constraints(max_length=3)
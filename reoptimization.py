@@ -0,0 +1,128 @@
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import cuts
+import lbbd_main
+import model
+from cut_pool import CutPool, renumber_literal, variable_literals
+from master_model import MasterModel
+from subproblem_decomposition import DecomposedSubproblem
+
+class SolverSession:
+    """Laufende Solver-Sitzung für die Neudisposition nach Verspätungsmeldungen.
+
+    Master-Modell, Subproblem und die bisher gefundenen Feasibility-Cuts (als CutPool) bleiben
+    zwischen den Läufen erhalten. Werden die Zeitfenster nur enger (start_lb steigt, start_ub
+    sinkt), bleiben Master-Constraints und Cuts gültig: Die Instanz wird in place geändert, die
+    Zeitfenster-Propagation im Master nachgezogen und die Cuts früherer Läufe werden fest
+    übernommen. Andere Änderungen (gelockerte Zeitfenster, entfallende oder neue Züge) bauen
+    Instanz und Modelle neu auf; übernommen werden dann nur die Cuts unveränderter Züge.
+
+    Die bisherige Lösung wird nach jeder Änderung mit dem Subproblem neu bewertet und dient,
+    falls sie zulässig bleibt, als MIP-Start und erster Incumbent.
+    """
+    def __init__(self, problem: model.ProblemInstance, engine: str = "longest_path", workers: int = 1,
+                 threads: Optional[int] = None, max_cycle_length: int = 3, heuristic: Optional[str] = "fifo",
+                 cache_size: int = 1024):
+        self.problem = problem
+        self.engine = engine
+        self.workers = workers
+        self.max_cycle_length = max_cycle_length
+        self.options = dict(engine=engine, workers=workers, threads=threads, max_cycle_length=max_cycle_length,
+                            heuristic=heuristic, cache_size=cache_size)
+        self.pool = CutPool()
+        self.result: Optional[dict] = None
+        self.rebuilds = 0
+        self._build()
+
+    def solve(self, time_limit: float, start: Optional[cuts.OptimalityCut] = None) -> dict:
+        """Löst die aktuelle Instanz mit den bestehenden Modellen (Ergebnis wie lbbd_main.optimize)."""
+        self.result = lbbd_main.optimize(self.problem, time_limit, cut_pool=self.pool, master=self.master,
+                                         subproblem=self.subproblem, start=start, **self.options)
+        return self.result
+
+    def update(self, time_limit: float, start_lb: Optional[Dict[Tuple[int, int], int]] = None,
+               start_ub: Optional[Dict[Tuple[int, int], float]] = None, remove_trains: Sequence[int] = (),
+               add_trains: Sequence[List[dict]] = (), objective: Sequence[dict] = ()) -> dict:
+        """Übernimmt eine Änderung und löst neu.
+
+        start_lb/start_ub setzen Grenzen je (Zug, Operation) in der bisherigen Nummerierung.
+        remove_trains entfernt Züge (die übrigen rücken auf), add_trains hängt Züge im DISPLIB-Format
+        an; objective enthält deren Zielfunktions-Komponenten mit "train" als Position in add_trains.
+        Das Ergebnis enthält zusätzlich "update_time" (Zeit bis zum Start des Masters) und "rebuilt".
+        """
+        started = time.perf_counter()
+        previous = self._previous_solution()
+        tightening = self.problem.update_bounds(start_lb, start_ub)
+        if tightening and not remove_trains and not add_trains:
+            fixed = self.master.tighten_time_windows()
+            applied = self.pool.apply(self.master, check_trains=False)
+            if hasattr(self.subproblem, "refresh_bounds"): self.subproblem.refresh_bounds()
+            else: self._replace_subproblem()
+            print(f"  -> Modelle aktualisiert: {fixed} Variablen fixiert, {applied} Cuts übernommen.")
+            rebuilt = False
+        else:
+            trains = self._rebuild(remove_trains, add_trains, objective)
+            previous = {renumber_literal(literal, trains): value for literal, value in previous.items()}
+            rebuilt = True
+        start = self._evaluate(previous)
+        if start is not None: print(f"  -> Bisherige Lösung bleibt zulässig: {start.objective_value:.2f}")
+        update_time = time.perf_counter() - started
+        result = self.solve(time_limit, start)
+        result.update(update_time=update_time, rebuilt=rebuilt)
+        return result
+
+    def close(self):
+        if hasattr(self.subproblem, "close"): self.subproblem.close()
+
+    def _build(self):
+        self.master = MasterModel(self.problem, max_cycle_length=self.max_cycle_length, cut_pool=self.pool)
+        self.subproblem = self._create_subproblem()
+
+    def _create_subproblem(self):
+        if self.workers > 1:
+            return DecomposedSubproblem(self.problem, self.master,
+                                        lambda: lbbd_main.create_subproblem(self.engine, self.problem, self.master),
+                                        self.workers)
+        return lbbd_main.create_subproblem(self.engine, self.problem, self.master)
+
+    def _replace_subproblem(self):
+        self.close()
+        self.subproblem = self._create_subproblem()
+
+    def _rebuild(self, remove_trains: Sequence[int], add_trains: Sequence[List[dict]],
+                 objective: Sequence[dict]) -> Dict[int, int]:
+        """Baut Instanz und Modelle neu auf; gibt die Umnummerierung der Züge (alt -> neu) zurück."""
+        data = self.problem.to_data()
+        removed = set(remove_trains)
+        kept = [t for t in range(len(data["trains"])) if t not in removed]
+        trains = {t: i for i, t in enumerate(kept)}
+        data["trains"] = [data["trains"][t] for t in kept] + list(add_trains)
+        data["objective"] = [dict(obj, train=trains[obj["train"]]) for obj in data["objective"] if obj["train"] in trains]
+        data["objective"] += [dict(obj, train=len(kept) + obj["train"]) for obj in objective]
+        self.close()
+        self.problem = model.ProblemInstance.from_data(data, self.problem.filepath)
+        self.pool.renumber(trains)
+        self._build()
+        self.rebuilds += 1
+        return trains
+
+    def _previous_solution(self) -> Dict[tuple, float]:
+        """y/z-Belegung der bisher besten Lösung als Literal -> Wert (leer, falls keine vorliegt)."""
+        cut = self.result["cut"] if self.result else None
+        if cut is None: return {}
+        literals = variable_literals(self.master)
+        solution = {literals[var]: 1.0 for var in cut.active_vars}
+        solution.update({literals[var]: 0.0 for var in cut.inactive_vars})
+        return solution
+
+    def _evaluate(self, previous: Dict[tuple, float]) -> Optional[cuts.OptimalityCut]:
+        """Bewertet die bisherige Belegung im aktuellen Modell; None, wenn sie unvollständig,
+        durch Fixierungen ausgeschlossen oder nicht mehr zulässig ist."""
+        if not previous: return None
+        solution = {}
+        for var, literal in variable_literals(self.master).items():
+            value = previous.get(literal)
+            if value is None or value < var.LB or value > var.UB: return None
+            solution[var] = value
+        cut = self.subproblem.solve(solution)
+        return cut if isinstance(cut, cuts.OptimalityCut) else None
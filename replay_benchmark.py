@@ -0,0 +1,78 @@
+import argparse
+import csv
+import random
+import time
+from typing import List, Optional
+
+REPLAY_FIELDS = ["step", "train", "operation", "delay", "start_lb", "latency", "update_time", "rebuilt",
+                 "objective", "cold_latency", "cold_objective"]
+
+def replay(instance_path: str, updates: int = 10, max_delay: int = 300, time_limit: float = 10.0,
+           engine: str = "longest_path", seed: int = 0, cold: bool = False) -> List[dict]:
+    """Spielt zufällige Verspätungsmeldungen gegen eine SolverSession ab und misst die Latenz je Meldung.
+
+    Jede Meldung verspätet einen Zug: Die erste noch nicht abgefahrene Operation hinter seiner
+    Startoperation darf erst delay Zeiteinheiten nach ihrer bisherigen Startzeit beginnen. latency
+    ist die Zeit von der Meldung bis zur neuen Lösung. Mit cold wird jede geänderte Instanz
+    zusätzlich von Grund auf (neue Instanz, neues Master-Modell) gelöst.
+    """
+    import lbbd_main
+    from model import ProblemInstance
+    from reoptimization import SolverSession
+
+    rng = random.Random(seed)
+    session = SolverSession(ProblemInstance(instance_path), engine=engine)
+    started = time.perf_counter()
+    result = session.solve(time_limit)
+    rows = [{"step": 0, "latency": time.perf_counter() - started, "objective": result["objective"]}]
+    for step in range(1, updates + 1):
+        if not result["events"]: break
+        times = {(e['train'], e['operation']): e['time'] for e in result["events"]}
+        t = rng.randrange(len(session.problem.trains))
+        o = next(iter(session.problem.trains[t].operations[0].successors), None)
+        if o is None: continue
+        delay = rng.randint(1, max_delay)
+        start_lb = int(times[t, o]) + delay
+        started = time.perf_counter()
+        result = session.update(time_limit, start_lb={(t, o): start_lb})
+        row = {"step": step, "train": t, "operation": o, "delay": delay, "start_lb": start_lb,
+               "latency": time.perf_counter() - started, "update_time": result["update_time"],
+               "rebuilt": result["rebuilt"], "objective": result["objective"]}
+        if cold:
+            started = time.perf_counter()
+            problem = ProblemInstance.from_data(session.problem.to_data(), instance_path)
+            row["cold_objective"] = lbbd_main.optimize(problem, time_limit, engine=engine)["objective"]
+            row["cold_latency"] = time.perf_counter() - started
+        rows.append(row)
+        print(f"  [{step}/{updates}] Zug {t} +{delay}: Ziel {row['objective']}, Latenz {row['latency']:.2f}s"
+              + (f" (kalt {row['cold_latency']:.2f}s, Ziel {row['cold_objective']})" if cold else ""))
+    session.close()
+    return rows
+
+def write_rows(rows: List[dict], csv_path: Optional[str]):
+    latencies = [row["latency"] for row in rows[1:]]
+    if latencies:
+        latencies.sort()
+        print(f"Latenz je Meldung: Mittel {sum(latencies) / len(latencies):.2f}s, "
+              f"Median {latencies[len(latencies) // 2]:.2f}s, Maximum {latencies[-1]:.2f}s")
+    if csv_path:
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=REPLAY_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for row in rows: writer.writerow(row)
+        print(f"✓ Ergebnisse in '{csv_path}' gespeichert.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay-Benchmark der Neudisposition nach Verspätungsmeldungen.")
+    parser.add_argument("instance", nargs="?", default="data/displib_instances_phase1/line1_critical_4.json")
+    parser.add_argument("--updates", type=int, default=10, help="Anzahl der Verspätungsmeldungen")
+    parser.add_argument("--max-delay", type=int, default=300, help="Größte Verspätung je Meldung")
+    parser.add_argument("--time-limit", type=float, default=10, help="Zeitlimit je Neudisposition in Sekunden")
+    parser.add_argument("--engine", choices=["longest_path", "gurobi", "z3", "portfolio"], default="longest_path")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--cold", action="store_true", help="Zum Vergleich jede Änderung auch kalt lösen")
+    parser.add_argument("--csv", default=None, help="Pfad der CSV-Ausgabe")
+    args = parser.parse_args()
+
+    rows = replay(args.instance, args.updates, args.max_delay, args.time_limit, args.engine, args.seed, args.cold)
+    write_rows(rows, args.csv)
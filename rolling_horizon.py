@@ -0,0 +1,203 @@
+import math
+import time
+from typing import Dict, List, Set, Tuple
+
+import instrumentation
+import lbbd_main
+import model
+import time_windows
+import verifier
+
+INF = float('inf')
+
+class RollingHorizon:
+    """Löst sehr große Instanzen Fenster für Fenster mit dem bestehenden LBBD.
+
+    Ein Fenster [start, start + window_length) enthält alle Züge, die vor seinem Ende abfahren
+    können (früheste Abfahrt aus der Zeitfenster-Propagation), und von jedem Zug nur die
+    Operationen, deren frühester Start (verschoben um die aktuelle Verspätung des Zuges) vor dem
+    Fensterende liegt. Nach dem Lösen werden die Operationen auf den gewählten Pfaden fixiert,
+    die vor start + window_length - overlap beginnen; dort beginnt das nächste Fenster. So bleibt
+    der Master je Fenster klein.
+
+    In das nächste Fenster werden von jedem Zug die Operationen ab der aktuellen (zuletzt
+    fixierten) übernommen, außerdem fixierte Operationen, deren Belegung über die Fixierungsgrenze
+    hinausreicht oder die mit der Startoperation eines noch nicht abgefahrenen Zuges in Konflikt
+    stehen. Züge, deren Startoperation Ressourcen belegt, sind vor ihrem Fenster als Platzhalter
+    (Startoperation bis zur frühesten Abfahrt) enthalten. Die Lösung ist zulässig, aber ohne
+    Optimalitätsgarantie; eine Schranke gibt es nicht.
+    """
+    def __init__(self, problem: model.ProblemInstance, window_length: int, overlap: int = 0):
+        if window_length <= 0 or not 0 <= overlap < window_length:
+            raise ValueError("Die Fensterlänge muss positiv und größer als die Überlappung sein.")
+        self.problem = problem
+        self.window_length = window_length
+        self.step = window_length - overlap
+        windows = time_windows.TimeWindows(problem)
+        a = problem.arrays
+        self._offsets = a.train_offsets.tolist()
+        self._earliest = windows.earliest.tolist()
+        self._release = [max(a.res_release[a.res_ptr[g]:a.res_ptr[g + 1]].tolist(), default=0) for g in range(a.num_operations)]
+        # Früheste Abfahrt je Zug: frühester Start eines Nachfolgers der Startoperation
+        self.departure = []
+        for t in range(len(problem.trains)):
+            departure = min((self._earliest[s] for s in windows.allowed[self._offsets[t]]), default=INF)
+            self.departure.append(int(departure if departure < INF else self._earliest[self._offsets[t]]))
+        self._finish = max((e for e in self._earliest if e < INF), default=0)
+        # Operationen, die mit der Startoperation eines anderen Zuges in Konflikt stehen -> dessen Züge
+        self._origin_conflicts: Dict[Tuple[int, int], List[int]] = {}
+        for c in problem.conflict_index:
+            if c.o1 == 0: self._origin_conflicts.setdefault((c.t2, c.o2), []).append(c.t1)
+            if c.o2 == 0: self._origin_conflicts.setdefault((c.t1, c.o1), []).append(c.t2)
+        self._origin_trains = {t for trains in self._origin_conflicts.values() for t in trains}
+        # Fixierter Pfad je Zug als [(Operation, Startzeit)]; alle Pfad-Operationen vor frozen_until sind fixiert
+        self.frozen: List[List[Tuple[int, int]]] = [[] for _ in problem.trains]
+        self.frozen_until = 0
+
+    def solve(self, time_limit: float, **options) -> dict:
+        """Löst alle Fenster nacheinander; options werden an lbbd_main.optimize durchgereicht.
+
+        Das Zeitlimit wird gleichmäßig auf die voraussichtlich verbleibenden Fenster verteilt. Das
+        Ergebnis hat dieselben Schlüssel wie lbbd_main.optimize (ohne "cut" und "master").
+        """
+        started = time.perf_counter()
+        result = {"objective": None, "events": None, "bound": None, "time_to_first_solution": None,
+                  "runtime": 0.0, "cache_hits": 0, "cache_misses": 0}
+        start = min(self.departure, default=0)
+        while not all(self._finished(t) for t in range(len(self.frozen))):
+            end = start + self.window_length
+            pending = [d for t, d in enumerate(self.departure) if not self.frozen[t] and d >= end]
+            if not any(self._active(t) or (not self.frozen[t] and self.departure[t] < end) for t in range(len(self.frozen))):
+                start = min(pending)
+                continue
+
+            with instrumentation.current().timer("rolling_horizon.build"):
+                window, mapping, complete = self._build_window(start, end)
+            boundary = INF if complete and not pending else start + self.step
+            windows_left = 1 if boundary == INF else max(1, math.ceil((self._finish - start) / self.step))
+            budget = max(1.0, (time_limit - (time.perf_counter() - started)) / windows_left)
+            print(f"--- Fenster [{start}, {end}): {len(mapping)} Züge, {window.arrays.num_operations} Operationen, "
+                  f"Zeitlimit {budget:.1f} s ---")
+            solution = lbbd_main.optimize(window, budget, **options)
+            result["cache_hits"] += solution["cache_hits"]
+            result["cache_misses"] += solution["cache_misses"]
+            if solution["cut"] is None:
+                print(f"Keine zulässige Lösung im Fenster [{start}, {end}), rollierender Horizont abgebrochen.")
+                result["runtime"] = time.perf_counter() - started
+                return result
+            self.frozen_until = self._freeze(solution, mapping, boundary)
+            start = boundary
+
+        times = {(t, o): x for t, path in enumerate(self.frozen) for o, x in path}
+        result["runtime"] = result["time_to_first_solution"] = time.perf_counter() - started
+        result["objective"] = self.problem.calculate_objective(times)
+        result["events"] = verifier.order_events(self.problem, [{'train': t, 'operation': o, 'time': x} for (t, o), x in times.items()])
+        return result
+
+    def _active(self, t: int) -> bool:
+        """Zug t hat fixierte Operationen, aber sein Ende ist noch offen."""
+        return bool(self.frozen[t]) and bool(self.problem.trains[t].operations[self.frozen[t][-1][0]].successors)
+
+    def _finished(self, t: int) -> bool:
+        return bool(self.frozen[t]) and not self._active(t)
+
+    def _build_window(self, start: int, end: int) -> Tuple[model.ProblemInstance, list, bool]:
+        """Teilinstanz des Fensters, die Zuordnung je Fensterzug und ob alle Züge vollständig enthalten sind.
+
+        Die Zuordnung ist (Zug, übernommene Operationen, Fenster-Indizes ohne Nachfolger im Fenster);
+        bei Platzhaltern (Zug, None, None). Fixierte Operationen erhalten start_lb = start_ub = ihre
+        Startzeit und nur den fixierten Nachfolger, alle übrigen (außer der Startoperation eines neuen
+        Zuges) beginnen frühestens zu frozen_until.
+        """
+        trains_data, mapping, position, complete = [], [], {}, True
+        for t, train in enumerate(self.problem.trains):
+            ops = train.operations
+            if not self.frozen[t] and self.departure[t] >= end:
+                if t not in self._origin_trains: continue
+                origin = ops[0].to_data()
+                origin["successors"] = [1]
+                departure = max(self.departure[t], self.frozen_until)
+                trains_data.append([origin, {"start_lb": departure, "min_duration": 0, "successors": []}])
+                mapping.append((t, None, None))
+                continue
+            kept = self._kept_operations(t, end)
+            if not kept: continue
+            index = {o: i for i, o in enumerate(kept)}
+            fixed = dict(self.frozen[t])
+            frozen_successor = {o: s for (o, _), (s, _) in zip(self.frozen[t], self.frozen[t][1:])}
+            train_data, open_ops = [], set()
+            for i, o in enumerate(kept):
+                op_data = ops[o].to_data()
+                if o in fixed: op_data["start_lb"] = op_data["start_ub"] = fixed[o]
+                elif o != 0 or self.frozen[t]: op_data["start_lb"] = max(op_data["start_lb"], self.frozen_until)
+                successors = [frozen_successor[o]] if o in frozen_successor else ops[o].successors
+                op_data["successors"] = [index[s] for s in successors if s in index]
+                if len(op_data["successors"]) < len(successors): complete = False
+                if successors and not op_data["successors"]: open_ops.add(i)
+                train_data.append(op_data)
+            position.update({(t, o): (len(trains_data), i) for o, i in index.items()})
+            trains_data.append(train_data)
+            mapping.append((t, kept, open_ops))
+
+        objective = []
+        for obj in self.problem.objective_components:
+            if (obj.train, obj.operation) not in position: continue
+            w, i = position[obj.train, obj.operation]
+            objective.append(dict(vars(obj), train=w, operation=i))
+        window = model.ProblemInstance.from_data({"trains": trains_data, "objective": objective}, f"Fenster [{start}, {end})")
+        return window, mapping, complete
+
+    def _kept_operations(self, t: int, end: int) -> List[int]:
+        """Operationen von Zug t im Fenster bis 'end' (aufsteigend nach Index, leer = Zug entfällt).
+
+        Von der aktuellen Operation aus werden die Nachfolger übernommen, deren frühester Start
+        zuzüglich der aktuellen Verspätung vor 'end' liegt, die unmittelbaren Nachfolger immer.
+        Abgeschlossene Operationen bleiben, solange ihre Belegung über frozen_until hinausreicht.
+        """
+        frozen, ops, base = self.frozen[t], self.problem.trains[t].operations, self._offsets[t]
+        if not frozen:
+            current, delay, kept = 0, 0, {0}
+        else:
+            first = len(frozen) - 1 if self._active(t) else len(frozen)
+            for i in range(len(frozen) - 1):
+                (o, _), (_, leave) = frozen[i], frozen[i + 1]
+                if leave + self._release[base + o] > self.frozen_until or any(len(self.frozen[u]) < 2 for u in self._origin_conflicts.get((t, o), ())):
+                    first = i
+                    break
+            kept = {o for o, _ in frozen[first:]}
+            if not self._active(t): return sorted(kept)
+            current, x = frozen[-1]
+            delay = max(0, x - self._earliest[base + current])
+        stack = list(ops[current].successors)
+        while stack:
+            o = stack.pop()
+            if o in kept: continue
+            kept.add(o)
+            stack.extend(s for s in ops[o].successors if self._earliest[base + s] + delay < end)
+        return sorted(kept)
+
+    def _freeze(self, solution: dict, mapping: list, boundary: float) -> float:
+        """Übernimmt die Pfad-Operationen der Fensterlösung, die vor 'boundary' beginnen.
+
+        Operationen ohne Nachfolger im Fenster unterliegen keiner Reihenfolge und bleiben offen.
+        Fixiert wird daher nur vor der frühesten solchen Operation auf einem Pfad: Jede fixierte
+        Reihenfolge bezieht sich dann auf fixierte Zeiten. Gibt die tatsächliche Grenze zurück.
+        """
+        master = solution["master"]
+        chosen = dict.fromkeys(solution["cut"].active_vars, 1.0)
+        times = {(e['train'], e['operation']): e['time'] for e in solution["events"]}
+        paths: Dict[int, List[int]] = {}
+        for w, (t, kept, open_ops) in enumerate(mapping):
+            if kept is None: continue
+            o, paths[w] = 0, []
+            while o != -1:
+                paths[w].append(o)
+                if o in open_ops: boundary = min(boundary, times[w, o])
+                o = master.get_chosen_successor(chosen, w, o)
+        for w, path in paths.items():
+            t, kept, _ = mapping[w]
+            fixed: Set[int] = {o for o, _ in self.frozen[t]}
+            for o in path:
+                if times[w, o] >= boundary: break
+                if kept[o] not in fixed: self.frozen[t].append((kept[o], int(times[w, o])))
+        return boundary
@@ -0,0 +1,44 @@
+import os
+import tempfile
+from typing import Dict, List
+import numpy as np
+
+CHUNK_SIZE = 4096  # Events je geschriebenem Block
+
+def solution_path(instance_path: str, output_dir: str = "solutions") -> str:
+    return os.path.join(output_dir, f"solution_{os.path.basename(instance_path)}")
+
+def write_solution(path: str, objective_value: float, events: List[Dict]) -> str:
+    """Schreibt eine DISPLIB-Lösung kompakt und atomar nach path.
+
+    Die Events (nur die der gewählten Wege, siehe MasterModel.path_events) werden stabil nach Zeit
+    sortiert; bei gleicher Zeit bleibt die übergebene Reihenfolge, da sie die Übergaben der Ressourcen
+    festlegt (siehe verifier.order_events). Sie werden blockweise in eine temporäre Datei
+    im Zielverzeichnis geschrieben, die anschließend per os.replace umbenannt wird. Leser sehen
+    so immer eine vollständige Lösung, auch wenn während des Laufs jeder Incumbent geschrieben
+    wird. Zeiten und Zielwert werden auf ganze Zahlen gerundet.
+    """
+    n = len(events)
+    train = np.fromiter((e["train"] for e in events), dtype=np.int64, count=n)
+    op = np.fromiter((e["operation"] for e in events), dtype=np.int64, count=n)
+    times = np.rint(np.fromiter((e["time"] for e in events), dtype=np.float64, count=n)).astype(np.int64)
+    order = np.argsort(times, kind="stable")
+    train, op, times = train[order].tolist(), op[order].tolist(), times[order].tolist()
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".solution_", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(f'{{"objective_value":{int(round(objective_value))},"events":[')
+            for lo in range(0, n, CHUNK_SIZE):
+                if lo: f.write(",")
+                f.write(",".join(f'{{"train":{t},"operation":{o},"time":{x}}}'
+                                 for t, o, x in zip(train[lo:lo + CHUNK_SIZE], op[lo:lo + CHUNK_SIZE], times[lo:lo + CHUNK_SIZE])))
+            f.write("]}\n")
+        os.chmod(tmp_path, 0o644)  # mkstemp legt die Datei nur für den Besitzer lesbar an
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
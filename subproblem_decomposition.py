@@ -0,0 +1,91 @@
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+import model
+import cuts
+import instrumentation
+import master_model as master_module
+
+class DecomposedSubproblem:
+    """Zerlegt das Subproblem in unabhängige Zug-Komponenten und löst sie parallel.
+
+    Zwei Züge liegen in derselben Komponente, wenn zwischen ihnen eine aktive
+    Reihenfolge-Constraint besteht. Jede Komponente wird von einer eigenen Engine-Instanz
+    des Worker-Threads gelöst (Gurobi und Z3 geben den GIL während der Lösung frei; die
+    Master-Variablen sind nicht picklebar, daher Threads statt Prozesse). Die reine
+    Python-Engine longest_path profitiert daher nicht von mehreren Workern.
+
+    Die Komponenten werden nach Operationszahl auf höchstens workers Aufgaben verteilt, damit
+    viele kleine Komponenten (etwa einzelne Züge) nicht je eine eigene Aufgabe erzeugen.
+    """
+    def __init__(self, problem: model.ProblemInstance, master_model: master_module.MasterModel,
+                 engine_factory: Callable[[], object], workers: int):
+        self.problem = problem
+        self.master_model = master_model
+        self.engine_factory = engine_factory
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="subproblem")
+        self._local = threading.local()
+        self._engines: list = []  # Alle Engine-Instanzen der Worker-Threads, für close
+        self._engines_lock = threading.Lock()
+
+    def find_components(self, master_solution: dict, trains: Optional[List[int]] = None) -> List[List[int]]:
+        """Union-Find über die Züge, verbunden durch aktive Reihenfolge-Constraints."""
+        if trains is None: trains = list(range(len(self.problem.trains)))
+        parent = {t: t for t in trains}
+
+        def find(t: int) -> int:
+            while parent[t] != t:
+                parent[t] = parent[parent[t]]
+                t = parent[t]
+            return t
+
+        for t1, o1, t2, o2, *_ in self.master_model.conflict_index.conflicts_among(trains):
+            if (t1, o1, t2, o2) not in self.master_model.y: continue
+            if self.master_model.get_chosen_successor(master_solution, t1, o1) == -1: continue
+            if self.master_model.get_chosen_successor(master_solution, t2, o2) == -1: continue
+            r1, r2 = find(t1), find(t2)
+            if r1 != r2: parent[max(r1, r2)] = min(r1, r2)
+
+        components = {}
+        for t in trains:
+            components.setdefault(find(t), []).append(t)
+        return list(components.values())
+
+    def solve(self, master_solution: dict, trains: Optional[List[int]] = None) -> cuts.Cut:
+        stats = instrumentation.current()
+        with stats.timer("subproblem.decompose"):
+            components = self.find_components(master_solution, trains)
+        stats.count("subproblem.components", len(components))
+        futures = [self.executor.submit(self._solve_batch, master_solution, batch) for batch in self._batches(components)]
+        results = [cut for f in futures for cut in f.result()]
+
+        infeasible = [cut for cut in results if not isinstance(cut, cuts.OptimalityCut)]
+        if infeasible:
+            print(f"    -> {len(infeasible)} von {len(components)} Komponenten unzulässig.")
+            return infeasible[0] if len(infeasible) == 1 else cuts.CombinedCut(infeasible)
+
+        return cuts.OptimalityCut.combine(results, master_solution)
+
+    def _batches(self, components: List[List[int]]) -> List[List[List[int]]]:
+        """Verteilt die Komponenten (größte zuerst) jeweils auf die Aufgabe mit den wenigsten Operationen."""
+        size = lambda comp: sum(len(self.problem.trains[t].operations) for t in comp)
+        batches = [(0, i, []) for i in range(min(self.workers, len(components)))]
+        for comp in sorted(components, key=size, reverse=True):
+            load, i, batch = heapq.heappop(batches)
+            batch.append(comp)
+            heapq.heappush(batches, (load + size(comp), i, batch))
+        return [batch for _, _, batch in sorted(batches, key=lambda b: b[1])]
+
+    def _solve_batch(self, master_solution: dict, batch: List[List[int]]) -> List[cuts.Cut]:
+        engine = getattr(self._local, "engine", None)
+        if engine is None:
+            engine = self._local.engine = self.engine_factory()
+            with self._engines_lock: self._engines.append(engine)
+        return [engine.solve(master_solution, trains) for trains in batch]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for engine in self._engines:
+            if hasattr(engine, "close"): engine.close()
@@ -1,90 +1,213 @@
 import gurobipy as gp
 from gurobipy import GRB
+from typing import Dict, List, Optional, Tuple
 import model
 import cuts
+import instrumentation
 import master_model as master_module
+from conflict_extraction import DEFAULT_MAX_CHECKS, extract_conflict
+from subproblem_longest_path import TimingNetwork, critical_path_coefficients
 
 class SubproblemGurobi:
-    def __init__(self, problem: model.ProblemInstance, master_solution: dict, master_model: master_module.MasterModel):
+    """Persistentes Zeitplanungs-Subproblem.
+
+    Das Modell wird einmal aufgebaut. Pro Master-Lösung werden nur die Pfad- und
+    Reihenfolge-Constraints über ihre rechte Seite ein- bzw. ausgeschaltet und das LP
+    mit der Basis der vorherigen Lösung neu gestartet. Ist das LP unzulässig, wird der Konflikt
+    auf dem Zeitplanungsnetz der aktiven Constraints bestimmt (siehe conflict_extraction, höchstens
+    conflict_checks Prüfungen im Deletion-Filter); computeIIS dient nur als Rückfall.
+    """
+    def __init__(self, problem: model.ProblemInstance, master_model: master_module.MasterModel,
+                 conflict_checks: int = DEFAULT_MAX_CHECKS):
         self.problem = problem
-        self.master_solution = master_solution
         self.master_model = master_model
-        self.model = gp.Model("Subproblem-Gurobi")
-        self.model.Params.OutputFlag = 0
+        self.conflict_checks = conflict_checks
+        self.master_solution: dict = {}
+        # Eigenes Environment, damit mehrere Instanzen parallel in Worker-Threads laufen können
+        self.env = gp.Env(empty=True)
+        self.env.setParam("OutputFlag", 0)
+        self.env.start()
+        self.model = gp.Model("Subproblem-Gurobi", env=self.env)
+        self.model.Params.Method = 1  # Dual-Simplex: Warmstart nach RHS-Änderungen
         self.x = {}
-
-    def solve(self) -> cuts.Cut:
+        # Schaltbare Constraints: Schlüssel -> (Constraint, RHS im aktiven Zustand, verantwortliche Master-Variablen,
+        # (Zug, Operation) der späteren und der früheren Operation)
+        self._switchable: Dict[tuple, tuple] = {}
+        self._active: set = set()
         self._build_model()
-        self.model.optimize()
-
-        if self.model.Status == GRB.OPTIMAL:
-            events = [{'train': t, 'operation': o, 'time': int(round(v.X))} for (t, o), v in self.x.items()]
-            return cuts.OptimalityCut(self.model.ObjVal, events, self.master_solution)
-        
-        elif self.model.Status == GRB.INFEASIBLE:
-            print("  -> Unzulässiges Subproblem. Finde minimalen Konflikt (IIS)...")
-            self.model.computeIIS()
-            
-            conflict_vars = []
-            for c in self.model.getConstrs():
-                if c.IISConstr:
-                    constr_name = c.ConstrName
-                    if constr_name.startswith("res_y_"):
-                        parts = constr_name.split('_')
-                        t1, o1, t2, o2 = map(int, parts[2:])
-                        # Finde die verantwortliche y-Variable
-                        y_var1 = self.master_model.y.get((t1, o1, t2, o2))
-                        y_var2 = self.master_model.y.get((t2, o2, t1, o1))
-                        if y_var1 and self.master_solution.get(y_var1, 0.0) > 0.5:
-                             conflict_vars.append(y_var1)
-                        elif y_var2:
-                             conflict_vars.append(y_var2)
-                    elif constr_name.startswith("path_z_"):
-                        parts = constr_name.split('_')
-                        t, o, s = map(int, parts[2:])
-                        z_var = self.master_model.z.get((t,o,s))
-                        if z_var: conflict_vars.append(z_var)
-
-            if not conflict_vars:
-                print("    -> Warnung: IIS-Analyse ohne Ergebnis, verwende allgemeinen No-Good-Cut.")
-                conflict_vars = [var for var, val in self.master_solution.items() if val > 0.5]
-
-            print(f"    -> IIS Cut generiert mit {len(conflict_vars)} Variablen.")
-            return cuts.FeasibilityCut(conflict_vars)
-        else:
-            raise RuntimeError(f"Gurobi Subproblem endete mit Status: {self.model.Status}")
+
+    def refresh_bounds(self):
+        """Übernimmt geänderte Zeitfenster der Instanz als Variablenschranken."""
+        for (t_idx, o_idx), x in self.x.items():
+            op = self.problem.trains[t_idx].operations[o_idx]
+            x.lb, x.ub = op.start_lb, op.start_ub if op.start_ub != float('inf') else GRB.INFINITY
+
+    def interrupt(self):
+        """Bricht eine laufende Lösung aus einem anderen Thread ab (siehe subproblem_portfolio)."""
+        self.model.terminate()
+
+    def close(self):
+        """Gibt Modell und eigenes Environment frei (sonst bleiben beide bis zum Prozessende belegt)."""
+        self.model.dispose()
+        self.env.dispose()
+
+    def solve(self, master_solution: dict, trains: Optional[List[int]] = None) -> cuts.Cut:
+        """Löst das Subproblem für alle Züge oder nur für die übergebene Teilmenge."""
+        self.master_solution = master_solution
+        if trains is None: trains = list(range(len(self.problem.trains)))
+        stats = instrumentation.current()
+        with stats.timer("subproblem.build"):
+            self._update_constraints(trains)
+        with stats.timer("subproblem.solve"):
+            self.model.optimize()
+
+        status = self.model.Status
+        if status == GRB.OPTIMAL:
+            with stats.timer("subproblem.critical_paths"):
+                network, offsets, cycle = self._schedule_network(trains)
+            if cycle is None:
+                times = {(t, o): int(round(self.x[t, o].X)) for t in trains for o in range(len(self.problem.trains[t].operations))}
+                events = [{'train': t, 'operation': o, 'time': time} for (t, o), time in times.items()]
+                paths = self.master_model.chosen_paths(self.master_solution, trains)
+                objective = self.problem.calculate_objective({op: times[op] for op in paths})
+                with stats.timer("subproblem.critical_paths"):
+                    coefficients = critical_path_coefficients(self.problem, network, offsets, paths, objective)
+                return cuts.OptimalityCut(objective, events, self.master_solution, coefficients)
+            # Das LP lässt gleichzeitige Events zu; ein Zyklus mit Gewicht 0 hat aber keine gültige Eventliste
+        elif status not in (GRB.INFEASIBLE, GRB.INF_OR_UNBD):
+            raise RuntimeError(f"Gurobi Subproblem endete mit Status: {status}")
+
+        with stats.timer("subproblem.iis"):
+            conflict = self._extract_conflict(trains)
+            if not conflict and status != GRB.OPTIMAL:
+                print("    -> Konflikt nicht im Zeitplanungsnetz gefunden, berechne IIS...")
+                self.model.computeIIS()
+                conflict = [key for key in self._active if self._switchable[key][0].IISConstr]
+
+        conflict_vars = {}
+        for key in conflict:
+            conflict_vars.update(dict.fromkeys(self._switchable[key][2]))
+        conflict_vars = list(conflict_vars)
+
+        if not conflict_vars:
+            print("    -> Warnung: Konfliktanalyse ohne Ergebnis, verwende allgemeinen No-Good-Cut.")
+            conflict_vars = [var for var, val in self.master_solution.items() if val > 0.5]
+        return cuts.FeasibilityCut(conflict_vars)
 
     def _build_model(self):
-        self.x = self.model.addVars(
-            ((t, o) for t, tr in enumerate(self.problem.trains) for o, op in enumerate(tr.operations)),
-            vtype=GRB.INTEGER, lb=0, name="x"
-        )
-        
+        """Baut Variablen, Zeitfenster und alle festen Vorgänger-Constraints einmalig auf."""
+        self.x = {}
         for t_idx, train in enumerate(self.problem.trains):
             for o_idx, op in enumerate(train.operations):
-                if op.start_ub != float('inf'): self.model.addConstr(self.x[t_idx, o_idx] <= op.start_ub)
-                s_idx = self._get_chosen_successor(t_idx, o_idx)
-                if s_idx != -1:
-                    constr_name = f"path_z_{t_idx}_{o_idx}_{s_idx}" if len(op.successors) > 1 else ""
-                    self.model.addConstr(self.x[t_idx, s_idx] >= self.x[t_idx, o_idx] + op.min_duration, name=constr_name)
-        
-        for (t1, o1), (t2, o2) in self.problem.get_conflicts():
+                ub = op.start_ub if op.start_ub != float('inf') else GRB.INFINITY
+                self.x[t_idx, o_idx] = self.model.addVar(lb=op.start_lb, ub=ub, vtype=GRB.CONTINUOUS, name=f"x_{t_idx}_{o_idx}")
+        # Die frühesten Startzeiten minimieren jede monotone Zielfunktion zugleich; die Summe genügt als LP-Ziel
+        self.model.setObjective(gp.quicksum(self.x.values()), GRB.MINIMIZE)
+
+        for t_idx, train in enumerate(self.problem.trains):
+            for o_idx, op in enumerate(train.operations):
+                if len(op.successors) == 1:
+                    self.model.addConstr(self.x[t_idx, op.successors[0]] >= self.x[t_idx, o_idx] + op.min_duration)
+                elif len(op.successors) > 1:
+                    for s_idx in op.successors:
+                        self._add_switchable(
+                            ("path", t_idx, o_idx, s_idx), (t_idx, s_idx), (t_idx, o_idx), op.min_duration,
+                            [self.master_model.z[t_idx, o_idx, s_idx]], f"path_z_{t_idx}_{o_idx}_{s_idx}")
+        self.model.update()
+
+    def _add_switchable(self, key: tuple, later: Tuple[int, int], earlier: Tuple[int, int], gap: float,
+                        responsible: List[gp.Var], name: str):
+        """Legt 'x[later] - x[earlier] >= gap' inaktiv (RHS = -inf) an."""
+        constr = self.model.addConstr(self.x[later] - self.x[earlier] >= -GRB.INFINITY, name=name)
+        self._switchable[key] = (constr, gap, responsible, later, earlier)
+
+    def _schedule_network(self, trains: List[int]) -> Tuple[TimingNetwork, Dict[int, int], Optional[List[int]]]:
+        """Gelöstes Netz der festen und aktiven Constraints mit den verantwortlichen Master-Variablen als Tags.
+
+        Das LP minimiert die Summe der Startzeiten und liefert damit die frühesten Startzeiten; das
+        Netz bildet dieselben nach, um daraus die kritischen Pfade für die Cut-Koeffizienten zu lesen.
+        Drittes Element ist das Ergebnis von TimingNetwork.solve (None oder die Kanten eines Zyklus).
+        """
+        offsets, lb, ub = {}, [], []
+        for t_idx in trains:
+            offsets[t_idx] = len(lb)
+            lb.extend(op.start_lb for op in self.problem.trains[t_idx].operations)
+            ub.extend(op.start_ub for op in self.problem.trains[t_idx].operations)
+        network = TimingNetwork(lb, ub)
+        for t_idx in trains:
+            for o_idx, op in enumerate(self.problem.trains[t_idx].operations):
+                if len(op.successors) == 1:
+                    network.add_edge(offsets[t_idx] + o_idx, offsets[t_idx] + op.successors[0], op.min_duration)
+        for key in self._active:
+            _, gap, responsible, (t_later, o_later), (t_earlier, o_earlier) = self._switchable[key]
+            network.add_edge(offsets[t_earlier] + o_earlier, offsets[t_later] + o_later, gap, responsible)
+        cycle = network.solve()
+        return network, offsets, cycle
+
+    def _extract_conflict(self, trains: List[int]) -> Optional[List[tuple]]:
+        """Konflikt (Schlüssel aktiver Constraints) aus dem Zeitplanungsnetz der übergebenen Züge."""
+        index, lb, ub, fixed = {}, [], [], []
+        for t_idx in trains:
+            for o_idx, op in enumerate(self.problem.trains[t_idx].operations):
+                index[t_idx, o_idx] = len(lb)
+                lb.append(op.start_lb)
+                ub.append(op.start_ub)
+        for t_idx in trains:
+            for o_idx, op in enumerate(self.problem.trains[t_idx].operations):
+                if len(op.successors) == 1:
+                    fixed.append((index[t_idx, o_idx], index[t_idx, op.successors[0]], op.min_duration))
+        switchable = []
+        for key in self._active:
+            _, gap, _, later, earlier = self._switchable[key]
+            switchable.append((index[earlier], index[later], gap, key))
+        return extract_conflict(lb, ub, fixed, switchable, self.conflict_checks)
+
+    def _wanted_constraints(self, trains: List[int]) -> set:
+        """Bestimmt die Schlüssel aller Constraints, die für die aktuelle Master-Lösung aktiv sein müssen."""
+        wanted = set()
+        for t_idx in trains:
+            for o_idx, op in enumerate(self.problem.trains[t_idx].operations):
+                if len(op.successors) > 1:
+                    s_idx = self._get_chosen_successor(t_idx, o_idx)
+                    if s_idx != -1: wanted.add(("path", t_idx, o_idx, s_idx))
+
+        for t1, o1, t2, o2, _, max_rel1, max_rel2 in self.master_model.conflict_index.conflicts_among(trains):
             y_var = self.master_model.y.get((t1, o1, t2, o2))
             if y_var is None: continue
-            op1, op2 = self.problem.trains[t1].operations[o1], self.problem.trains[t2].operations[o2]
             s1_idx, s2_idx = self._get_chosen_successor(t1, o1), self._get_chosen_successor(t2, o2)
             if s1_idx == -1 or s2_idx == -1: continue
-            res_map1 = {r['resource']: r.get('release_time', 0) for r in op1.resources}
-            res_map2 = {r['resource']: r.get('release_time', 0) for r in op2.resources}
-            shared = set(res_map1.keys()) & set(res_map2.keys())
-            if not shared: continue
-            max_rel1, max_rel2 = max(res_map1[r] for r in shared), max(res_map2[r] for r in shared)
 
             if self.master_solution.get(y_var, 0.0) > 0.5:
-                self.model.addConstr(self.x[t2, o2] >= self.x[t1, s1_idx] + max_rel1, name=f"res_y_{t1}_{o1}_{t2}_{o2}")
+                key = ("res", t1, o1, t2, o2, s1_idx)
+                if key not in self._switchable:
+                    self._add_switchable(key, (t2, o2), (t1, s1_idx), max_rel1,
+                                         self._responsible_vars(t1, o1, t2, o2, s1_idx), f"res_y_{t1}_{o1}_{t2}_{o2}")
             else:
-                self.model.addConstr(self.x[t1, o1] >= self.x[t2, s2_idx] + max_rel2, name=f"res_y_{t2}_{o2}_{t1}_{o1}")
-                
+                key = ("res", t2, o2, t1, o1, s2_idx)
+                if key not in self._switchable:
+                    self._add_switchable(key, (t1, o1), (t2, s2_idx), max_rel2,
+                                         self._responsible_vars(t2, o2, t1, o1, s2_idx), f"res_y_{t2}_{o2}_{t1}_{o1}")
+            wanted.add(key)
+        return wanted
+
+    def _responsible_vars(self, t1: int, o1: int, t2: int, o2: int, s1_idx: int) -> List[gp.Var]:
+        """Master-Variablen, die 'x[t2, o2] >= x[t1, s1] + release' aktivieren."""
+        responsible = [self.master_model.y[t1, o1, t2, o2]]
+        z_var = self.master_model.z.get((t1, o1, s1_idx))
+        if z_var is not None: responsible.append(z_var)
+        return responsible
+
+    def _update_constraints(self, trains: List[int]):
+        """Schaltet nur die Constraints um, deren Zustand sich gegenüber dem letzten Aufruf geändert hat."""
+        wanted = self._wanted_constraints(trains)
+        self.model.update()
+        for key in self._active - wanted:
+            self._switchable[key][0].RHS = -GRB.INFINITY
+        for key in wanted - self._active:
+            constr, gap, *_ = self._switchable[key]
+            constr.RHS = gap
+        self._active = wanted
+
     def _get_chosen_successor(self, t_idx: int, o_idx: int) -> int:
         op = self.problem.trains[t_idx].operations[o_idx]
         if not op.successors: return -1
@@ -93,4 +216,4 @@ class SubproblemGurobi:
             z_var = self.master_model.z.get((t_idx, o_idx, s_idx))
             if z_var and self.master_solution.get(z_var, 0.0) > 0.5:
                 return s_idx
-        return -1 # Wichtig: Wenn kein Pfad gewählt wurde, gibt es keinen Nachfolger
\ No newline at end of file
+        return -1 # Wichtig: Wenn kein Pfad gewählt wurde, gibt es keinen Nachfolger
@@ -0,0 +1,323 @@
+from typing import Dict, List, Optional, Tuple
+import model
+import cuts
+import instrumentation
+import master_model as master_module
+
+class TimingNetwork:
+    """Differenz-Constraint-System x[dst] >= x[src] + weight mit Zeitfenstern [lb, ub] je Knoten.
+
+    Die Kanten liegen in parallelen Listen und werden für die Lösung in ein CSR-Format
+    (Offsets + Kantenindizes, sortiert nach Quellknoten) überführt.
+    """
+    def __init__(self, lb: List[int], ub: List[float]):
+        self.lb, self.ub = lb, ub
+        self.src: List[int] = []
+        self.dst: List[int] = []
+        self.weight: List[int] = []
+        self.tags: List[Optional[list]] = []  # Verantwortliche Master-Variablen je Kante (None = immer aktiv)
+        self.dist: List[int] = []
+        self.pred: List[int] = []  # Kante, über die dist[v] zuletzt erhöht wurde (-1 = start_lb)
+
+    def add_edge(self, src: int, dst: int, weight: int, tag: Optional[list] = None) -> int:
+        self.src.append(src)
+        self.dst.append(dst)
+        self.weight.append(weight)
+        self.tags.append(tag)
+        return len(self.src) - 1
+
+    def solve(self) -> Optional[List[int]]:
+        """Berechnet die frühesten Startzeiten (längste Wege ab den start_lb).
+
+        Gibt None zurück, wenn das System zulässig ist (Ergebnis in self.dist), sonst die
+        Kanten eines Zyklus mit Gewicht >= 0 bzw. einer Kette, die ein start_ub verletzt. Auch Zyklen
+        mit Gewicht 0 sind unzulässig: Jede Kante verlangt, dass ihr Quell-Event in der
+        DISPLIB-Eventliste vor dem Ziel-Event steht, bei gleichen Zeiten also ebenfalls eine Reihenfolge.
+        """
+        n = len(self.lb)
+        ptr, adj = self._csr(n)
+        components, comp_of = self._strongly_connected_components(n, ptr, adj)
+        dist, pred = list(self.lb), [-1] * n
+        self.dist, self.pred = dist, pred
+        dst, weight = self.dst, self.weight
+
+        for c_idx, comp in enumerate(components):
+            if len(comp) > 1:
+                cycle = self._bellman_ford(comp, c_idx, comp_of, ptr, adj)
+                if cycle is None: cycle = self._tight_cycle(comp, c_idx, comp_of, ptr, adj)
+                if cycle is not None: return cycle
+            for u in comp:
+                du = dist[u]
+                for k in range(ptr[u], ptr[u + 1]):
+                    e = adj[k]
+                    v = dst[e]
+                    if comp_of[v] == c_idx:
+                        if v == u and weight[e] >= 0: return [e]
+                        continue
+                    if du + weight[e] > dist[v]:
+                        dist[v], pred[v] = du + weight[e], e
+
+        ub = self.ub
+        for v in range(n):
+            if dist[v] > ub[v]:
+                return self.chain_to(v)
+        return None
+
+    def _csr(self, n: int) -> Tuple[List[int], List[int]]:
+        ptr = [0] * (n + 1)
+        for u in self.src: ptr[u + 1] += 1
+        for i in range(n): ptr[i + 1] += ptr[i]
+        fill, adj = ptr[:-1], [0] * len(self.src)
+        for e, u in enumerate(self.src):
+            adj[fill[u]] = e
+            fill[u] += 1
+        return ptr, adj
+
+    def _strongly_connected_components(self, n: int, ptr: List[int], adj: List[int]) -> Tuple[List[List[int]], List[int]]:
+        """Iterativer Tarjan; liefert die Komponenten in topologischer Reihenfolge."""
+        dst = self.dst
+        index, low, comp_of = [-1] * n, [0] * n, [-1] * n
+        on_stack, stack, components = [False] * n, [], []
+        counter = 0
+        for root in range(n):
+            if index[root] != -1: continue
+            work = [(root, ptr[root])]
+            index[root] = low[root] = counter; counter += 1
+            stack.append(root); on_stack[root] = True
+            while work:
+                u, k = work[-1]
+                if k < ptr[u + 1]:
+                    work[-1] = (u, k + 1)
+                    v = dst[adj[k]]
+                    if index[v] == -1:
+                        index[v] = low[v] = counter; counter += 1
+                        stack.append(v); on_stack[v] = True
+                        work.append((v, ptr[v]))
+                    elif on_stack[v] and index[v] < low[u]:
+                        low[u] = index[v]
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    if low[u] < low[parent]: low[parent] = low[u]
+                if low[u] == index[u]:
+                    comp = []
+                    while True:
+                        v = stack.pop(); on_stack[v] = False
+                        comp_of[v] = len(components)
+                        comp.append(v)
+                        if v == u: break
+                    components.append(comp)
+        # Tarjan liefert die Komponenten in umgekehrter topologischer Reihenfolge
+        components.reverse()
+        last = len(components) - 1
+        comp_of = [last - c for c in comp_of]
+        return components, comp_of
+
+    def _bellman_ford(self, comp: List[int], c_idx: int, comp_of: List[int], ptr: List[int], adj: List[int]) -> Optional[List[int]]:
+        """Bellman-Ford auf den internen Kanten einer Komponente; gibt ggf. einen positiven Zyklus zurück."""
+        dist, pred, dst, weight = self.dist, self.pred, self.dst, self.weight
+        last_updated = -1
+        for _ in range(len(comp)):
+            last_updated = -1
+            for u in comp:
+                du = dist[u]
+                for k in range(ptr[u], ptr[u + 1]):
+                    e = adj[k]
+                    v = dst[e]
+                    if comp_of[v] == c_idx and du + weight[e] > dist[v]:
+                        dist[v], pred[v] = du + weight[e], e
+                        last_updated = v
+            if last_updated == -1: return None
+        return self._find_cycle(comp, last_updated)
+
+    def _find_cycle(self, comp: List[int], start: int) -> List[int]:
+        """Sucht einen Zyklus im Vorgänger-Graphen, bevorzugt ausgehend vom zuletzt verbesserten Knoten."""
+        pred, src = self.pred, self.src
+        for node in [start] + comp:
+            seen, v = {}, node
+            while v not in seen and pred[v] != -1:
+                seen[v] = len(seen)
+                v = src[pred[v]]
+            if v in seen:
+                cycle, u = [], v
+                while True:
+                    e = pred[u]
+                    cycle.append(e)
+                    u = src[e]
+                    if u == v: return cycle
+        return []
+
+    def _tight_cycle(self, comp: List[int], c_idx: int, comp_of: List[int], ptr: List[int], adj: List[int]) -> Optional[List[int]]:
+        """Zyklus aus straffen Kanten (dist[u] + weight == dist[v]) einer Komponente nach Bellman-Ford.
+
+        Ohne positiven Zyklus hat jeder Zyklus höchstens Gewicht 0, und genau die Zyklen mit Gewicht 0
+        bestehen nur aus straffen Kanten. Tiefensuche mit Kantenstapel; None, wenn es keinen gibt.
+        """
+        dist, dst, weight = self.dist, self.dst, self.weight
+        state = {u: 0 for u in comp}  # 0 = neu, 1 = auf dem Pfad, 2 = fertig
+        for root in comp:
+            if state[root]: continue
+            state[root] = 1
+            work, path = [(root, ptr[root])], []
+            while work:
+                u, k = work[-1]
+                if k == ptr[u + 1]:
+                    state[u] = 2
+                    work.pop()
+                    if path: path.pop()
+                    continue
+                work[-1] = (u, k + 1)
+                e = adj[k]
+                v = dst[e]
+                if comp_of[v] != c_idx or dist[u] + weight[e] != dist[v] or state[v] == 2: continue
+                if state[v] == 1:
+                    # Rückwärtskante: Zyklus von v über den Pfad bis u und zurück nach v
+                    cycle = [e]
+                    for edge in reversed(path):
+                        cycle.append(edge)
+                        if self.src[edge] == v: break
+                    return cycle
+                state[v] = 1
+                path.append(e)
+                work.append((v, ptr[v]))
+        return None
+
+    def chain_to(self, v: int) -> List[int]:
+        """Kette der Vorgängerkanten von einem start_lb bis zum Knoten v."""
+        chain, seen = [], set()
+        while self.pred[v] != -1 and v not in seen:
+            seen.add(v)
+            e = self.pred[v]
+            chain.append(e)
+            v = self.src[e]
+        return chain
+
+def critical_path_coefficients(problem: model.ProblemInstance, network: TimingNetwork, offsets: Dict[int, int],
+                               paths: Dict[tuple, tuple], objective: float) -> Dict:
+    """Koeffizienten des Optimalitäts-Cuts aus den kritischen Pfaden der verspäteten Komponenten.
+
+    network ist das gelöste Netz der aktiven Constraints mit den verantwortlichen Master-Variablen
+    als Kanten-Tags, offsets der erste Knoten je Zug. Die Startzeit einer Operation ist die Länge
+    ihres kritischen Pfades (pred-Kette bis zu einem start_lb). Solange dessen Master-Variablen und
+    die z-Variablen, über die der gewählte Weg die Operation erreicht (paths, siehe
+    MasterModel.chosen_paths), ihren Wert behalten, bleibt die Startzeit und damit die Kosten der
+    Komponente mindestens gleich. Jede Variable erhält daher die Summe der Kosten der Komponenten,
+    für die sie so verantwortlich ist (höchstens den Zielwert).
+    """
+    coefficients: Dict = {}
+    dist = network.dist
+    for obj in problem.objective_components:
+        if (obj.train, obj.operation) not in paths: continue
+        v = offsets[obj.train] + obj.operation
+        cost = obj.cost(dist[v])
+        if cost <= 0: continue
+        chain = {var for e in network.chain_to(v) for var in (network.tags[e] or ())}
+        for var in chain.union(paths[obj.train, obj.operation]):
+            coefficients[var] = min(coefficients.get(var, 0.0) + cost, objective)
+    return coefficients
+
+class SubproblemLongestPath:
+    """Kombinatorische Subproblem-Engine für feste Pfade und Reihenfolgen.
+
+    Sind alle z- und y-Werte fixiert, besteht das Subproblem nur aus Differenz-Constraints.
+    Die frühesten Startzeiten ergeben sich als längste Wege, Unzulässigkeit direkt als
+    Zyklus oder verletzte Zeitfenster-Kette, ohne LP und ohne IIS-Berechnung.
+    """
+    def __init__(self, problem: model.ProblemInstance, master_model: master_module.MasterModel):
+        self.problem = problem
+        self.master_model = master_model
+        self.master_solution: dict = {}
+        self.network: Optional[TimingNetwork] = None
+        self.nodes: List[Tuple[int, int]] = []
+        self.offsets: Dict[int, int] = {}
+        # Zeitfenster und Vorgänger-Kanten mit eindeutigem Nachfolger sind von der Master-Lösung unabhängig
+        self._lb = [[op.start_lb for op in train.operations] for train in problem.trains]
+        self._ub = [[op.start_ub for op in train.operations] for train in problem.trains]
+        self._static_edges = [
+            [(o_idx, op.successors[0], op.min_duration) for o_idx, op in enumerate(train.operations) if len(op.successors) == 1]
+            for train in problem.trains
+        ]
+
+    def refresh_bounds(self):
+        """Übernimmt geänderte Zeitfenster der Instanz (siehe ProblemInstance.update_bounds)."""
+        self._lb = [[op.start_lb for op in train.operations] for train in self.problem.trains]
+        self._ub = [[op.start_ub for op in train.operations] for train in self.problem.trains]
+
+    def solve(self, master_solution: dict, trains: Optional[List[int]] = None) -> cuts.Cut:
+        """Löst das Subproblem für alle Züge oder nur für die übergebene Teilmenge."""
+        self.master_solution = master_solution
+        if trains is None: trains = list(range(len(self.problem.trains)))
+        stats = instrumentation.current()
+        with stats.timer("subproblem.build"):
+            self.network = self._build_network(trains)
+        with stats.timer("subproblem.solve"):
+            conflict_edges = self.network.solve()
+
+        if conflict_edges is None:
+            times = {node: self.network.dist[v] for v, node in enumerate(self.nodes)}
+            events = [{'train': t, 'operation': o, 'time': time} for (t, o), time in times.items()]
+            paths = self.master_model.chosen_paths(self.master_solution, trains)
+            objective = self.problem.calculate_objective({node: times[node] for node in paths})
+            with stats.timer("subproblem.critical_paths"):
+                coefficients = critical_path_coefficients(self.problem, self.network, self.offsets, paths, objective)
+            return cuts.OptimalityCut(objective, events, self.master_solution, coefficients)
+
+        conflict_vars = {}
+        for e in conflict_edges:
+            if self.network.tags[e]: conflict_vars.update(dict.fromkeys(self.network.tags[e]))
+        conflict_vars = list(conflict_vars)
+        if not conflict_vars:
+            print("    -> Warnung: Konflikt ohne Master-Variablen, verwende allgemeinen No-Good-Cut.")
+            conflict_vars = [var for var, val in self.master_solution.items() if val > 0.5]
+        return cuts.FeasibilityCut(conflict_vars)
+
+    def _build_network(self, trains: List[int]) -> TimingNetwork:
+        self.offsets, self.nodes, lb, ub = {}, [], [], []
+        for t_idx in trains:
+            self.offsets[t_idx] = len(self.nodes)
+            self.nodes.extend((t_idx, o_idx) for o_idx in range(len(self._lb[t_idx])))
+            lb.extend(self._lb[t_idx])
+            ub.extend(self._ub[t_idx])
+        network = TimingNetwork(lb, ub)
+
+        for t_idx in trains:
+            base = self.offsets[t_idx]
+            for o_idx, s_idx, duration in self._static_edges[t_idx]:
+                network.add_edge(base + o_idx, base + s_idx, duration)
+            for o_idx, op in enumerate(self.problem.trains[t_idx].operations):
+                if len(op.successors) > 1:
+                    s_idx = self._get_chosen_successor(t_idx, o_idx)
+                    if s_idx != -1:
+                        network.add_edge(base + o_idx, base + s_idx, op.min_duration, [self.master_model.z[t_idx, o_idx, s_idx]])
+
+        for t1, o1, t2, o2, _, max_rel1, max_rel2 in self.master_model.conflict_index.conflicts_among(trains):
+            y_var = self.master_model.y.get((t1, o1, t2, o2))
+            if y_var is None: continue
+            s1_idx, s2_idx = self._get_chosen_successor(t1, o1), self._get_chosen_successor(t2, o2)
+            if s1_idx == -1 or s2_idx == -1: continue
+
+            if self.master_solution.get(y_var, 0.0) > 0.5:
+                network.add_edge(self.offsets[t1] + s1_idx, self.offsets[t2] + o2, max_rel1,
+                                 self._responsible_vars(t1, o1, t2, o2, s1_idx))
+            else:
+                network.add_edge(self.offsets[t2] + s2_idx, self.offsets[t1] + o1, max_rel2,
+                                 self._responsible_vars(t2, o2, t1, o1, s2_idx))
+        return network
+
+    def _responsible_vars(self, t1: int, o1: int, t2: int, o2: int, s1_idx: int) -> list:
+        """Master-Variablen, die 'x[t2, o2] >= x[t1, s1] + release' aktivieren."""
+        responsible = [self.master_model.y[t1, o1, t2, o2]]
+        z_var = self.master_model.z.get((t1, o1, s1_idx))
+        if z_var is not None: responsible.append(z_var)
+        return responsible
+
+    def _get_chosen_successor(self, t_idx: int, o_idx: int) -> int:
+        op = self.problem.trains[t_idx].operations[o_idx]
+        if not op.successors: return -1
+        if len(op.successors) == 1: return op.successors[0]
+        for s_idx in op.successors:
+            z_var = self.master_model.z.get((t_idx, o_idx, s_idx))
+            if z_var is not None and self.master_solution.get(z_var, 0.0) > 0.5:
+                return s_idx
+        return -1
@@ -0,0 +1,80 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+import model
+import cuts
+import instrumentation
+import master_model as master_module
+
+PORTFOLIO_ENGINES = ("gurobi", "z3")
+
+class PortfolioSubproblem:
+    """Lässt mehrere Subproblem-Engines je Master-Lösung gegeneinander antreten.
+
+    Alle Engines lösen dieselbe Master-Lösung parallel in Worker-Threads (Gurobi und Z3 geben den
+    GIL während der Lösung frei); das erste Ergebnis gewinnt, die übrigen werden per interrupt
+    abgebrochen. Vor dem nächsten Aufruf wird auf die abgebrochenen Engines gewartet, da sie nicht
+    gleichzeitig zweimal rechnen dürfen.
+
+    Nach 'warmup' Rennen wird die Engine mit den meisten Siegen allein verwendet, sofern sie
+    mindestens den Anteil 'dominance' der Rennen gewonnen hat. Jeder 'probe_interval'-te Aufruf
+    bleibt ein Rennen, sodass die Wahl sich im Laufe der Lösung ändern kann.
+    """
+    def __init__(self, problem: model.ProblemInstance, master_model: master_module.MasterModel,
+                 engines: Dict[str, object], warmup: int = 50, dominance: float = 0.8, probe_interval: int = 100):
+        self.problem = problem
+        self.master_model = master_model
+        self.engines = engines
+        self.warmup, self.dominance, self.probe_interval = warmup, dominance, probe_interval
+        self.executor = ThreadPoolExecutor(max_workers=len(engines), thread_name_prefix="portfolio")
+        self.wins: Dict[str, int] = dict.fromkeys(engines, 0)
+        self.races = 0
+        self.calls = 0
+        self.choice: Optional[str] = None
+        self._cancelled: List[Future] = []
+
+    def solve(self, master_solution: dict, trains: Optional[List[int]] = None) -> cuts.Cut:
+        wait(self._cancelled)
+        self._cancelled = []
+        self.calls += 1
+        if self.choice is not None and self.calls % self.probe_interval != 0:
+            return self.engines[self.choice].solve(master_solution, trains)
+        return self._race(master_solution, trains)
+
+    def _race(self, master_solution: dict, trains: Optional[List[int]]) -> cuts.Cut:
+        futures = {self.executor.submit(engine.solve, master_solution, trains): name for name, engine in self.engines.items()}
+        pending, winner, result, errors = set(futures), None, None, []
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None: errors.append(future.exception())
+                elif winner is None: winner, result = futures[future], future.result()
+        for future in pending:
+            engine = self.engines[futures[future]]
+            if hasattr(engine, "interrupt"): engine.interrupt()
+        self._cancelled = list(pending)
+        if winner is None: raise errors[0]
+
+        self.races += 1
+        self.wins[winner] += 1
+        instrumentation.current().count(f"portfolio.wins.{winner}")
+        self._update_choice()
+        return result
+
+    def _update_choice(self):
+        if self.races < self.warmup: return
+        leader = max(self.wins, key=self.wins.get)
+        choice = leader if self.wins[leader] >= self.dominance * self.races else None
+        if choice != self.choice:
+            print(f"  -> Portfolio: {'verwende ' + choice if choice else 'wieder Rennen aller Engines'} "
+                  f"(Siege {self._wins_text()})")
+        self.choice = choice
+
+    def _wins_text(self) -> str:
+        return ", ".join(f"{name} {wins}/{self.races}" for name, wins in self.wins.items())
+
+    def close(self):
+        wait(self._cancelled)
+        self.executor.shutdown(wait=True)
+        for engine in self.engines.values():
+            if hasattr(engine, "close"): engine.close()
+        print(f"Portfolio: Siege {self._wins_text()}, zuletzt {self.choice or 'Rennen'}.")
@@ -1,19 +1,88 @@
+import threading
 import z3
 import gurobipy as gp
+from typing import Dict, List, Optional, Tuple
 import model
 import cuts
+import instrumentation
 import master_model as master_module
+from subproblem_longest_path import TimingNetwork, critical_path_coefficients
 
 class SubproblemZ3:
-    def __init__(self, problem: model.ProblemInstance, master_solution: dict, master_model: master_module.MasterModel):
-        self.problem, self.master_solution, self.master_model = problem, master_solution, master_model
-        self.solver = z3.Solver()
-        self.solver.set(unsat_core=True)
-        self.tracker_map, self.assumptions = {}, []
-        self._create_z3_variables()
+    """Persistentes Zeitplanungs-Subproblem in Z3 (Differenzlogik, QF_IDL).
 
-    def _create_z3_variables(self):
-        self.x = {(t, o): z3.Int(f"x_{t}_{o}") for t, tr in enumerate(self.problem.trains) for o, op in enumerate(tr.operations)}
+    Kontext, Variablen, Solver und die festen Vorgänger-Constraints werden einmal angelegt. Jede
+    schaltbare Constraint (gewählter Pfad, Reihenfolge) wird einmal als Implikation eines
+    Booleschen Literals hinzugefügt, Reihenfolgen erst, wenn sie zum ersten Mal gebraucht werden.
+    Je Master-Lösung gehen nur die Literale der aktiven Constraints als Annahmen in check ein; der
+    Unsat-Core besteht direkt aus diesen Literalen. Die Zeitfenster eines Zuges hängen an einem
+    eigenen Literal, damit Teilmengen von Zügen (Zerlegung) unabhängig gelöst werden können.
+
+    Z3 liefert irgendeine zulässige Belegung; für einen gültigen Optimalitäts-Cut werden die
+    frühesten Startzeiten über die aktiven Constraints berechnet (siehe TimingNetwork).
+    """
+    def __init__(self, problem: model.ProblemInstance, master_model: master_module.MasterModel):
+        self.problem, self.master_model = problem, master_model
+        self.master_solution = {}
+        # Eigener Kontext, damit mehrere Instanzen parallel in Worker-Threads laufen können
+        self.ctx = z3.Context()
+        self.solver = z3.SolverFor("QF_IDL", ctx=self.ctx)
+        # Schaltbare Constraints: Schlüssel -> (Literal, später (t, o), früher (t, o), Abstand, verantwortliche Master-Variablen)
+        self._switchable: Dict[tuple, tuple] = {}
+        self._train_literals: List[z3.BoolRef] = []
+        self._generation = 0
+        # Abbruch von außen (interrupt) nur während check, siehe dort
+        self._check_lock = threading.Lock()
+        self._checking = self._interrupted = False
+        with instrumentation.current().timer("subproblem.build"):
+            self._build_model()
+
+    def _build_model(self):
+        self.x = {(t, o): z3.Int(f"x_{t}_{o}", self.ctx) for t, tr in enumerate(self.problem.trains) for o, op in enumerate(tr.operations)}
+        for t_idx, train in enumerate(self.problem.trains):
+            for o_idx, op in enumerate(train.operations):
+                if len(op.successors) == 1:
+                    self.solver.add(self.x[t_idx, op.successors[0]] >= self.x[t_idx, o_idx] + op.min_duration)
+                elif len(op.successors) > 1:
+                    for s_idx in op.successors:
+                        self._add_switchable(("path", t_idx, o_idx, s_idx), (t_idx, s_idx), (t_idx, o_idx), op.min_duration,
+                                             [self.master_model.z[t_idx, o_idx, s_idx]], f"z_{t_idx}_{o_idx}_{s_idx}")
+        self._add_time_windows()
+
+    def _add_time_windows(self):
+        """Zeitfenster je Zug unter einem frischen Literal (ältere Literale werden nicht mehr angenommen)."""
+        self._train_literals = []
+        for t_idx, train in enumerate(self.problem.trains):
+            literal = z3.Bool(f"train_{t_idx}_{self._generation}", self.ctx)
+            bounds = []
+            for o_idx, op in enumerate(train.operations):
+                bounds.append(self.x[t_idx, o_idx] >= op.start_lb)
+                if op.start_ub != float('inf'): bounds.append(self.x[t_idx, o_idx] <= op.start_ub)
+            self.solver.add(z3.Implies(literal, z3.And(bounds)))
+            self._train_literals.append(literal)
+        self._generation += 1
+
+    def refresh_bounds(self):
+        """Übernimmt geänderte Zeitfenster der Instanz (siehe ProblemInstance.update_bounds)."""
+        self._add_time_windows()
+
+    def interrupt(self):
+        """Bricht eine laufende Prüfung aus einem anderen Thread ab (siehe subproblem_portfolio).
+
+        Außerhalb von check wird nichts unterbrochen: Ein anstehender Abbruch lässt Z3 sonst die als
+        Nächstes hinzugefügten Constraints stillschweigend verwerfen.
+        """
+        with self._check_lock:
+            if not self._checking: return
+            self.ctx.interrupt()
+            self._interrupted = True
+
+    def _add_switchable(self, key: tuple, later: Tuple[int, int], earlier: Tuple[int, int], gap: int,
+                        responsible: List[gp.Var], name: str):
+        """Fügt 'literal -> x[later] >= x[earlier] + gap' hinzu."""
+        literal = z3.Bool(name, self.ctx)
+        self.solver.add(z3.Implies(literal, self.x[later] >= self.x[earlier] + gap))
+        self._switchable[key] = (literal, later, earlier, gap, responsible)
 
     def _get_chosen_successor(self, t_idx: int, o_idx: int) -> int:
         op = self.problem.trains[t_idx].operations[o_idx]
@@ -23,64 +92,105 @@ class SubproblemZ3:
             if self.master_solution.get(self.master_model.z[t_idx, o_idx, s_idx], 0.0) > 0.5: return s_idx
         return -1
 
-    def solve(self) -> cuts.Cut:
-        self._add_constraints()
-        result = self.solver.check(self.assumptions)
-        if result == z3.sat: return self._handle_sat()
-        if result == z3.unsat: return self._handle_unsat()
+    def solve(self, master_solution: dict, trains: Optional[List[int]] = None) -> cuts.Cut:
+        """Löst das Subproblem für alle Züge oder nur für die übergebene Teilmenge."""
+        self.master_solution = master_solution
+        self.trains = list(range(len(self.problem.trains))) if trains is None else trains
+        stats = instrumentation.current()
+        with stats.timer("subproblem.build"):
+            active = self._active_constraints()
+            assumptions = [self._train_literals[t] for t in self.trains] + [self._switchable[key][0] for key in active]
+        with stats.timer("subproblem.solve"):
+            with self._check_lock: self._checking = True
+            result = self.solver.check(assumptions)
+            with self._check_lock:
+                self._checking = False
+                # Kam der Abbruch erst nach dem Ende von check, steht er noch an; eine leere Prüfung setzt ihn zurück
+                if self._interrupted: z3.Solver(ctx=self.ctx).check()
+                self._interrupted = False
+        if result == z3.sat: return self._handle_sat(active)
+        if result == z3.unsat: return self._handle_unsat(active)
         raise RuntimeError(f"Z3 Solver Status: {result}")
 
-    def _add_constraints(self):
-        for t_idx, train in enumerate(self.problem.trains):
-            for o_idx, op in enumerate(train.operations):
-                if op.start_lb is not None: self.solver.add(self.x[t_idx, o_idx] >= op.start_lb)
-                if op.start_ub != float('inf'): self.solver.add(self.x[t_idx, o_idx] <= op.start_ub)
-                s_idx = self._get_chosen_successor(t_idx, o_idx)
-                if s_idx != -1:
-                    self.solver.add(self.x[t_idx, s_idx] >= self.x[t_idx, o_idx] + op.min_duration)
-                    if len(op.successors) > 1:
-                        z_var = self.master_model.z[t_idx, o_idx, s_idx]
-                        tracker = z3.Bool(f"z_{t_idx}_{o_idx}_{s_idx}")
-                        self.tracker_map[tracker] = z_var
-                        self.assumptions.append(tracker)
-                        self.solver.assert_and_track(self.x[t_idx, o_idx] >= 0, tracker)
-        
-        for (t1, o1), (t2, o2) in self.problem.get_conflicts():
-            op1, op2 = self.problem.trains[t1].operations[o1], self.problem.trains[t2].operations[o2]
+    def _active_constraints(self) -> List[tuple]:
+        """Schlüssel aller Constraints, die für die aktuelle Master-Lösung gelten (fehlende werden angelegt)."""
+        active = []
+        for t_idx in self.trains:
+            for o_idx, op in enumerate(self.problem.trains[t_idx].operations):
+                if len(op.successors) > 1:
+                    s_idx = self._get_chosen_successor(t_idx, o_idx)
+                    if s_idx != -1: active.append(("path", t_idx, o_idx, s_idx))
+
+        for t1, o1, t2, o2, _, max_rel1, max_rel2 in self.master_model.conflict_index.conflicts_among(self.trains):
+            y12 = self.master_model.y.get((t1, o1, t2, o2))
+            if y12 is None: continue
             s1_idx, s2_idx = self._get_chosen_successor(t1, o1), self._get_chosen_successor(t2, o2)
             if s1_idx == -1 or s2_idx == -1: continue
-            
-            res_map1 = {r['resource']: r.get('release_time', 0) for r in op1.resources}
-            res_map2 = {r['resource']: r.get('release_time', 0) for r in op2.resources}
-            shared = set(res_map1.keys()) & set(res_map2.keys())
-            if not shared: continue
-            
-            max_rel1, max_rel2 = max(res_map1[r] for r in shared), max(res_map2[r] for r in shared)
-            y12 = self.master_model.y[t1, o1, t2, o2]
-            y21 = self.master_model.y[t2, o2, t1, o1]
-
             if self.master_solution.get(y12, 0.0) > 0.5:
-                tracker = z3.Bool(f"y_{t1}_{o1}_{t2}_{o2}")
-                self.tracker_map[tracker] = y12
-                self.assumptions.append(tracker)
-                self.solver.assert_and_track(self.x[t2, o2] >= self.x[t1, s1_idx] + max_rel1, tracker)
+                first, s_idx, second, rel = (t1, o1), s1_idx, (t2, o2), max_rel1
             else:
-                tracker = z3.Bool(f"y_{t2}_{o2}_{t1}_{o1}")
-                self.tracker_map[tracker] = y21
-                self.assumptions.append(tracker)
-                self.solver.assert_and_track(self.x[t1, o1] >= self.x[t2, s2_idx] + max_rel2, tracker)
-
-    def _handle_sat(self) -> cuts.OptimalityCut:
-        m = self.solver.model()
-        events = [{'train': t, 'operation': o, 'time': m.eval(x).as_long()} for (t, o), x in self.x.items()]
-        return cuts.OptimalityCut(self._calculate_objective(m), events, self.master_solution)
-
-    def _calculate_objective(self, model: z3.ModelRef) -> float:
-        cost = 0.0
-        for obj in self.problem.objective_components:
-            delay = max(0, model.eval(self.x[obj.train, obj.operation]).as_long() - obj.threshold)
-            cost += obj.coeff * delay + (obj.increment if delay > 0 else 0)
-        return cost
-
-    def _handle_unsat(self) -> cuts.FeasibilityCut:
-        return cuts.FeasibilityCut([self.tracker_map[t] for t in self.solver.unsat_core()])
\ No newline at end of file
+                first, s_idx, second, rel = (t2, o2), s2_idx, (t1, o1), max_rel2
+            key = ("res",) + first + second + (s_idx,)
+            if key not in self._switchable:
+                self._add_switchable(key, second, (first[0], s_idx), rel, self._responsible_vars(*first, *second, s_idx),
+                                     f"y_{first[0]}_{first[1]}_{second[0]}_{second[1]}_{s_idx}")
+            active.append(key)
+        return active
+
+    def _responsible_vars(self, t1: int, o1: int, t2: int, o2: int, s1_idx: int) -> List[gp.Var]:
+        """Master-Variablen, die 'x[t2, o2] >= x[t1, s1] + release' aktivieren."""
+        responsible = [self.master_model.y[t1, o1, t2, o2]]
+        z_var = self.master_model.z.get((t1, o1, s1_idx))
+        if z_var is not None: responsible.append(z_var)
+        return responsible
+
+    def _handle_sat(self, active: List[tuple]) -> cuts.Cut:
+        """Früheste Startzeiten über die festen und die aktiven Constraints (längste Wege ab start_lb).
+
+        Die Kanten tragen ihre verantwortlichen Master-Variablen; die Koeffizienten des Cuts ergeben
+        sich daraus wie bei der Longest-Path-Engine aus den kritischen Pfaden. Z3 lässt gleichzeitige
+        Events zu; schließen die aktiven Kanten einen Zyklus mit Gewicht 0, gibt es keine gültige
+        Eventliste, und dessen Master-Variablen bilden einen Feasibility-Cut.
+        """
+        offsets, lb, ub = {}, [], []
+        for t in self.trains:
+            offsets[t] = len(lb)
+            lb.extend(op.start_lb for op in self.problem.trains[t].operations)
+            ub.extend(op.start_ub for op in self.problem.trains[t].operations)
+        network = TimingNetwork(lb, ub)
+        for t in self.trains:
+            for o, op in enumerate(self.problem.trains[t].operations):
+                if len(op.successors) == 1: network.add_edge(offsets[t] + o, offsets[t] + op.successors[0], op.min_duration)
+        for key in active:
+            _, (t_later, o_later), (t_earlier, o_earlier), gap, responsible = self._switchable[key]
+            network.add_edge(offsets[t_earlier] + o_earlier, offsets[t_later] + o_later, gap, responsible)
+        cycle = network.solve()
+        if cycle is not None:
+            conflict_vars = {}
+            for e in cycle:
+                if network.tags[e]: conflict_vars.update(dict.fromkeys(network.tags[e]))
+            conflict_vars = list(conflict_vars)
+            if not conflict_vars:
+                print("    -> Warnung: Zyklus ohne Master-Variablen, verwende allgemeinen No-Good-Cut.")
+                conflict_vars = [var for var, val in self.master_solution.items() if val > 0.5]
+            return cuts.FeasibilityCut(conflict_vars)
+        times = {(t, o): network.dist[offsets[t] + o] for t in self.trains for o in range(len(self.problem.trains[t].operations))}
+        events = [{'train': t, 'operation': o, 'time': time} for (t, o), time in times.items()]
+        paths = self.master_model.chosen_paths(self.master_solution, self.trains)
+        objective = self.problem.calculate_objective({op: times[op] for op in paths})
+        with instrumentation.current().timer("subproblem.critical_paths"):
+            coefficients = critical_path_coefficients(self.problem, network, offsets, paths, objective)
+        return cuts.OptimalityCut(objective, events, self.master_solution, coefficients)
+
+    def _handle_unsat(self, active: List[tuple]) -> cuts.FeasibilityCut:
+        with instrumentation.current().timer("subproblem.iis"):
+            core = {literal.get_id() for literal in self.solver.unsat_core()}
+        conflict_vars = {}
+        for key in active:
+            literal, *_, responsible = self._switchable[key]
+            if literal.get_id() in core: conflict_vars.update(dict.fromkeys(responsible))
+        conflict_vars = list(conflict_vars)
+        if not conflict_vars:
+            print("    -> Warnung: Unsat-Core ohne Master-Variablen, verwende allgemeinen No-Good-Cut.")
+            conflict_vars = [var for var, val in self.master_solution.items() if val > 0.5]
+        return cuts.FeasibilityCut(conflict_vars)
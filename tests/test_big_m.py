@@ -0,0 +1,65 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import bounds
+from cuts import OptimalityCut
+from master_model import MasterModel
+from model import ProblemInstance
+
+
+def _problem(objective=()):
+    """Zug 0 verzweigt nach Op 0 auf 1 oder 2 (Op 0 hat keine Obergrenze), Zug 1 teilt Ressource r."""
+    trains = [[{"start_lb": 5, "min_duration": 10, "successors": [1, 2]},
+               {"min_duration": 4, "successors": [3], "resources": [{"resource": "r", "release_time": 3}]},
+               {"min_duration": 6, "successors": [3]},
+               {"min_duration": 0, "successors": []}],
+              [{"start_lb": 0, "start_ub": 50, "min_duration": 2, "successors": [1]},
+               {"min_duration": 7, "successors": [2], "resources": [{"resource": "r", "release_time": 1}]},
+               {"min_duration": 0, "successors": []}]]
+    return ProblemInstance.from_data({"trains": trains, "objective": list(objective)})
+
+
+def test_planning_horizon_covers_durations_and_releases():
+    assert bounds.planning_horizon(_problem()) == 5 + (10 + 4 + 6) + (2 + 7) + (3 + 1)
+
+
+def test_big_m_from_time_windows():
+    objective = [{"type": "op_delay", "train": 1, "operation": 1, "threshold": 30, "increment": 5}]
+    problem = _problem(objective)
+    master = MasterModel(problem)
+    big_m = master.big_m
+    horizon = bounds.planning_horizon(problem)
+    # Ohne start_ub bleibt latest unendlich und wird durch den Horizont (38) ersetzt
+    assert horizon == 38
+    assert big_m.window(0, 0) == (5, 38)
+    assert big_m.window(1, 0) == (0, 38)
+    # Op 0 endet spätestens 38 + 10, Op 1 beginnt frühestens 0 (Verzweigung, daher nicht propagiert)
+    assert big_m.precedence(0, 0, 1) == 38 + 10 - 0
+    assert big_m.precedence(1, 0, 1) == 38 + 2 - 2
+    assert big_m.conflict(1, 2, 1, 0, 1) == 38 + 1 - 0
+    assert big_m.late(problem.objective_components[0]) == 38 - 30 + 1
+    assert max(big_m.precedence(0, 0, 1), big_m.conflict(1, 2, 1, 0, 1)) < 200000
+
+
+def test_cut_coefficients_capped_by_objective_floor():
+    objective = [{"type": "op_delay", "train": 1, "operation": 2, "threshold": 0, "coeff": 1}]
+    master = MasterModel(_problem(objective))
+    assert master.big_m.objective_floor == 9
+    solution = {var: 1.0 if i % 2 == 0 else 0.0 for i, var in enumerate(list(master.y.values()) + list(master.z.values()))}
+    cut = OptimalityCut(40, [], solution)
+    master.add_cut(cut)
+    master.model.update()
+    row = master.model.getRow(master.model.getConstrs()[-1])
+    coefficients = {abs(row.getCoeff(i)) for i in range(row.size()) if row.getVar(i) is not master.theta}
+    assert coefficients == {40 - 9}
+
+
+def test_objective_floor_skips_optional_operations():
+    # Op 1 von Zug 0 liegt nur auf einem der beiden Wege und kostet dort schon zum frühesten Start 5
+    objective = [{"type": "op_delay", "train": 0, "operation": 1, "threshold": 0, "increment": 5},
+                 {"type": "op_delay", "train": 1, "operation": 2, "threshold": 0, "coeff": 1}]
+    problem = _problem(objective)
+    master = MasterModel(problem)
+    assert bounds.objective_floor(problem, master.time_windows) == 9
@@ -4,9 +4,10 @@ import pytest
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from utils import parse_displib_instance, instance_to_data
+from master_model import MasterModel
+from utils import parse_displib_instance
 pytest.importorskip('z3')
-from subproblem_z3 import check_feasibility
+from subproblem_z3 import SubproblemZ3
 
 
 def test_start_lb_enforced(tmp_path):
@@ -16,8 +17,6 @@ def test_start_lb_enforced(tmp_path):
         '{"min_duration": 1, "successors": []}]], "objective": []}'
     )
     instance = parse_displib_instance(str(fixture))
-    data = instance_to_data(instance)
-    solution = {"z": {(0, 0): 1}, "x": {}}
-    feasible, _, times = check_feasibility(data, solution)
-    assert feasible
+    cut = SubproblemZ3(instance, MasterModel(instance)).solve({})
+    times = {(e['train'], e['operation']): e['time'] for e in cut.events}
     assert times[(0, 0)] >= 5
@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from conflict_extraction import extract_conflict
+from cuts import FeasibilityCut
+from master_model import MasterModel
+from model import ProblemInstance
+from subproblem_gurobi import SubproblemGurobi
+from subproblem_longest_path import SubproblemLongestPath
+
+INF = float('inf')
+
+
+def test_feasible_and_fixed_only_networks():
+    assert extract_conflict([0, 0], [INF, INF], [(0, 1, 2)], [(1, 0, -5, "a")]) is None
+    # Das Zeitfenster von Knoten 1 wird schon durch die feste Kante verletzt
+    assert extract_conflict([0, 0], [INF, 1], [(0, 1, 2)], [(1, 0, -5, "a")]) == []
+
+
+def test_deletion_filter_keeps_only_necessary_keys():
+    # Zwei positive Zyklen über Knoten 0 und 1: a-b und a-c-d; jeder allein ist ein Konflikt
+    lb, ub = [0, 0, 0], [INF, INF, INF]
+    switchable = [(0, 1, 1, "a"), (1, 0, 0, "b"), (1, 2, 1, "c"), (2, 0, 0, "d")]
+    conflict = extract_conflict(lb, ub, [], switchable)
+    assert set(conflict) in ({"a", "b"}, {"a", "c", "d"})
+    for key in conflict:
+        rest = [edge for edge in switchable if edge[3] in conflict and edge[3] != key]
+        assert extract_conflict(lb, ub, [], rest) is None
+
+
+def test_gurobi_engine_returns_the_crossing_conflict():
+    def route(first, second):
+        return [{"start_ub": 0, "min_duration": 0, "successors": [1]},
+                {"min_duration": 5, "resources": [{"resource": first, "release_time": 1}], "successors": [2]},
+                {"min_duration": 5, "resources": [{"resource": second, "release_time": 1}], "successors": [3]},
+                {"min_duration": 0, "successors": []}]
+    problem = ProblemInstance.from_data({"trains": [route("A", "B"), route("B", "A")], "objective": []})
+    master = MasterModel(problem)
+    # Zug 0 zuerst auf A, Zug 1 zuerst auf B: Verklemmung
+    solution = {var: 0.0 for var in master.y.values()}
+    solution[master.y[0, 1, 1, 2]] = solution[master.y[1, 1, 0, 2]] = 1.0
+    cut = SubproblemGurobi(problem, master).solve(solution)
+    assert isinstance(cut, FeasibilityCut)
+    assert set(cut.conflict_vars) == {master.y[0, 1, 1, 2], master.y[1, 1, 0, 2]}
+    assert set(cut.conflict_vars) == set(SubproblemLongestPath(problem, master).solve(solution).conflict_vars)
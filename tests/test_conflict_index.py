@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model import ProblemInstance
+
+
+def test_conflict_index_release_times():
+    fixture = os.path.join(os.path.dirname(__file__), '..', 'data',
+                           'displib_testinstances_headway1.json')
+    problem = ProblemInstance(fixture)
+    index = problem.conflict_index
+
+    assert [(c.t1, c.o1, c.t2, c.o2) for c in index] == [(0, 1, 1, 1), (0, 2, 1, 2)]
+    first = index.conflicts[0]
+    assert first.shared_resources == frozenset({"r0"})
+    assert (first.release1, first.release2) == (9, 9)
+    assert index.get_conflicts_of(1, 2) == (index.conflicts[1],)
+    assert index.get_conflicts_of(0, 0) == ()
+    assert index.usage_map["r1"] == ((0, 2), (1, 2))
+    assert problem.get_conflicts() == {((0, 1), (1, 1)), ((0, 2), (1, 2))}
+
+
+def test_operation_views_read_from_arrays():
+    fixture = os.path.join(os.path.dirname(__file__), '..', 'data',
+                           'displib_testinstances_headway1.json')
+    problem = ProblemInstance(fixture)
+    arrays = problem.arrays
+
+    assert arrays.num_operations == 8
+    assert arrays.gid(1, 2) == 6
+    op = problem.trains[1].operations[1]
+    assert (op.start_lb, op.start_ub, op.min_duration) == (0, float('inf'), 5)
+    assert op.successors == [2]
+    assert op.resources == [{"resource": "r0", "release_time": 9}]
+    assert problem.trains[0].operations[0].start_ub == 0
+    assert not arrays.start_lb.flags.writeable
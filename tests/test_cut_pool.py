@@ -0,0 +1,47 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from cut_pool import CutPool
+from cuts import CombinedCut, FeasibilityCut
+from master_model import MasterModel
+from model import ProblemInstance
+
+
+def _single_track(duration=5):
+    """Zwei Züge über dieselbe Ressource r, Zug 0 mit Fahrzeit 'duration'."""
+    def route(d):
+        return [{"start_ub": 0, "min_duration": 0, "successors": [1]},
+                {"min_duration": d, "resources": [{"resource": "r"}], "successors": [2]},
+                {"min_duration": 0, "successors": []}]
+    return ProblemInstance.from_data({"trains": [route(duration), route(5)], "objective": []})
+
+
+def test_cuts_are_deduplicated_and_survive_save_and_load(tmp_path):
+    problem = _single_track()
+    master = MasterModel(problem)
+    pool = CutPool()
+    first = master.y[0, 1, 1, 1]
+    assert pool.add(FeasibilityCut([first]), master)
+    assert not pool.add(CombinedCut([FeasibilityCut([first])]), master)
+    assert len(pool) == 1 and pool.added == 1
+
+    path = str(tmp_path / "pool.json")
+    pool.save(path)
+    loaded = CutPool.load(path)
+    assert loaded.cuts == pool.cuts
+
+    # Neues Master-Modell derselben Instanz: der Cut verbietet "Zug 0 zuerst"
+    master = MasterModel(problem, cut_pool=loaded)
+    master.model.optimize()
+    assert master.y[0, 1, 1, 1].X < 0.5
+
+
+def test_cuts_of_changed_trains_are_dropped(tmp_path):
+    master = MasterModel(_single_track())
+    pool = CutPool(lazy=True)
+    pool.add(FeasibilityCut([master.y[0, 1, 1, 1]]), master)
+    assert pool.apply(MasterModel(_single_track())) == 1
+    assert pool.apply(MasterModel(_single_track(duration=7))) == 0
+    assert CutPool.load(str(tmp_path / "missing.json")).cuts == {}
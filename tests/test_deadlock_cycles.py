@@ -0,0 +1,52 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model import ProblemInstance
+
+
+def _write_ring(path, num_trains, release_time):
+    """Zug i hält r_i und will nach r_(i+1): ein Ring aus num_trains Zügen."""
+    trains = []
+    for i in range(num_trains):
+        trains.append([
+            {"start_ub": 0, "min_duration": 0, "successors": [1],
+             "resources": [{"resource": f"r{i}", "release_time": release_time}]},
+            {"min_duration": 5, "successors": [2],
+             "resources": [{"resource": f"r{(i + 1) % num_trains}", "release_time": release_time}]},
+            {"min_duration": 5, "successors": []},
+        ])
+    objective = [{"type": "op_delay", "train": 0, "operation": 2, "threshold": 0, "coeff": 1}]
+    with open(path, 'w') as f:
+        json.dump({"trains": trains, "objective": objective}, f)
+    return ProblemInstance(str(path))
+
+
+def test_ring_of_four_trains(tmp_path):
+    instance = _write_ring(tmp_path / 'ring.json', 4, release_time=1)
+    assert instance.get_deadlock_cycle_constraints(max_length=3) == []
+    cycles = instance.get_deadlock_cycle_constraints(max_length=4)
+    assert len(cycles) == 1
+    cycle = cycles[0]
+    assert sorted(key[0] for key in cycle) == [0, 1, 2, 3]
+    # Jede Kante zeigt vom haltenden Zug auf den wartenden, der Ring schließt sich
+    assert all(cycle[i][2] == cycle[(i + 1) % 4][0] for i in range(4))
+
+
+def test_triple_cycle_with_and_without_release_times(tmp_path):
+    source = os.path.join(os.path.dirname(__file__), 'fixtures', 'triple_cycle.json')
+    # Auch ohne Release-Zeiten ist die Rotation im selben Zeitpunkt unzulässig (Ende- vor Start-Event)
+    assert ProblemInstance(source).get_3_train_cycle_constraints() == [((0, 1, 1, 1), (1, 0, 2, 1), (2, 0, 0, 2))]
+
+    with open(source) as f:
+        data = json.load(f)
+    for train in data["trains"]:
+        for op in train:
+            for res in op.get("resources", []): res["release_time"] = 1
+    path = tmp_path / 'instance.json'
+    with open(path, 'w') as f:
+        json.dump(data, f)
+    assert ProblemInstance(str(path)).get_3_train_cycle_constraints() == \
+        [((0, 1, 1, 1), (1, 0, 2, 1), (2, 0, 0, 2))]
@@ -0,0 +1,69 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model import ProblemInstance
+from master_model import MasterModel
+from subproblem_longest_path import SubproblemLongestPath
+from subproblem_decomposition import DecomposedSubproblem
+
+
+def _rotation_free_orders(master):
+    # Zug 1 zuerst über r0; die übrigen Reihenfolgen schließen keinen Kreis über r0, r1 und r2
+    first = {(1, 1, 0, 1), (2, 0, 0, 2), (1, 0, 2, 1)}
+    return {var: float(key in first) for key, var in master.y.items()}
+
+
+def test_components_merge_to_global_schedule():
+    fixture = os.path.join(os.path.dirname(__file__), 'fixtures', 'triple_cycle.json')
+    problem = ProblemInstance(fixture)
+    master = MasterModel(problem)
+    solution = _rotation_free_orders(master)
+
+    decomposed = DecomposedSubproblem(problem, master, lambda: SubproblemLongestPath(problem, master), workers=2)
+    try:
+        assert decomposed.find_components(solution) == [[0, 1, 2]]
+        assert decomposed.find_components(solution, trains=[0, 2]) == [[0, 2]]
+        cut = decomposed.solve(solution)
+    finally:
+        decomposed.close()
+
+    reference = SubproblemLongestPath(problem, master).solve(solution)
+    assert cut.objective_value == reference.objective_value
+    assert cut.coefficients == reference.coefficients
+    assert sorted(cut.events, key=lambda e: (e['train'], e['operation'])) == \
+        sorted(reference.events, key=lambda e: (e['train'], e['operation']))
+
+
+def test_independent_trains_form_separate_components(tmp_path):
+    fixture = tmp_path / "independent.json"
+    fixture.write_text(
+        '{"trains": [[{"min_duration": 1, "resources": [{"resource": "a"}], "successors": [1]},'
+        '{"min_duration": 1, "successors": []}],'
+        '[{"min_duration": 1, "resources": [{"resource": "b"}], "successors": [1]},'
+        '{"min_duration": 1, "successors": []}]], "objective": []}'
+    )
+    problem = ProblemInstance(str(fixture))
+    master = MasterModel(problem)
+    decomposed = DecomposedSubproblem(problem, master, lambda: SubproblemLongestPath(problem, master), workers=2)
+    try:
+        assert decomposed.find_components({}) == [[0], [1]]
+    finally:
+        decomposed.close()
+
+
+def test_small_components_are_batched_per_worker(tmp_path):
+    # Fünf unabhängige Züge, einer davon länger: höchstens zwei Aufgaben, nach Operationen ausgeglichen
+    short = [{"min_duration": 1, "successors": [1]}, {"min_duration": 1, "successors": []}]
+    long = [{"min_duration": 1, "successors": [o + 1]} for o in range(7)] + [{"min_duration": 1, "successors": []}]
+    problem = ProblemInstance.from_data({"trains": [long, short, short, short, short], "objective": []})
+    master = MasterModel(problem)
+    decomposed = DecomposedSubproblem(problem, master, lambda: SubproblemLongestPath(problem, master), workers=2)
+    try:
+        components = decomposed.find_components({})
+        assert len(components) == 5
+        assert decomposed._batches(components) == [[[0]], [[1], [2], [3], [4]]]
+        assert len(decomposed.solve({}).events) == 8 + 4 * 2
+    finally:
+        decomposed.close()
@@ -0,0 +1,70 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import cuts
+import lbbd_main
+from heuristic import GreedyDispatcher
+from master_model import MasterModel
+from model import ProblemInstance
+
+
+def _crossing(tmp_path):
+    """Zwei Gegenzüge über A - Ausweiche (L1 oder L2) - B, beide starten zur Zeit 0."""
+    def route(first, last):
+        return [
+            {"start_ub": 0, "min_duration": 0, "successors": [1]},
+            {"min_duration": 5, "resources": [{"resource": first, "release_time": 1}], "successors": [2, 3]},
+            {"min_duration": 5, "resources": [{"resource": "L1", "release_time": 1}], "successors": [4]},
+            {"min_duration": 5, "resources": [{"resource": "L2", "release_time": 1}], "successors": [4]},
+            {"min_duration": 5, "resources": [{"resource": last, "release_time": 1}], "successors": [5]},
+            {"min_duration": 0, "successors": []},
+        ]
+    objective = [{"type": "op_delay", "train": t, "operation": 5, "threshold": 0, "coeff": 1} for t in (0, 1)]
+    path = tmp_path / "crossing.json"
+    path.write_text(json.dumps({"trains": [route("A", "B"), route("B", "A")], "objective": objective}))
+    return ProblemInstance(str(path))
+
+
+def test_trains_cross_in_the_loop(tmp_path):
+    problem = _crossing(tmp_path)
+    master = MasterModel(problem)
+    dispatcher = GreedyDispatcher(problem, master)
+    start = dispatcher.run()
+    assert isinstance(start, cuts.OptimalityCut)
+    # Auch das nicht befahrene Gleis der Ausweiche wird im Modell eingeplant und belegt; ein Zug
+    # wartet deshalb 16 Zeiteinheiten (optimal, vom Master bestätigt)
+    assert start.objective_value == 46
+    events = {(e['train'], e['operation']): e['time'] for e in start.events}
+    assert sorted([events[0, 5], events[1, 5]]) == [15, 31]
+
+    master.set_start(start)
+    master.model.update()
+    assert master.theta.Start == 46
+    assert all(var.Start == value for var, value in dispatcher.master_solution.items())
+
+
+def test_single_operation_train(tmp_path):
+    # Ohne Nachfolger wird die Startoperation nicht vorab reserviert
+    trains = [[{"min_duration": 5, "resources": [{"resource": "A"}], "successors": []}],
+              [{"min_duration": 0, "successors": [1]},
+               {"min_duration": 5, "resources": [{"resource": "A"}], "successors": [2]},
+               {"min_duration": 0, "successors": []}]]
+    objective = [{"type": "op_delay", "train": 1, "operation": 2, "threshold": 0, "coeff": 1}]
+    path = tmp_path / "single.json"
+    path.write_text(json.dumps({"trains": trains, "objective": objective}))
+    problem = ProblemInstance(str(path))
+    start = GreedyDispatcher(problem, MasterModel(problem)).run()
+    assert isinstance(start, cuts.OptimalityCut)
+    assert start.objective_value == 5
+    assert lbbd_main.optimize(problem, 10, heuristic="fifo")["objective"] == 5
+
+
+def test_start_respects_swap_constraints():
+    # Der gleichzeitige Tausch bei t=5 wäre 20; nach der Event-Reihenfolge sind mindestens 30 nötig
+    fixture = os.path.join(os.path.dirname(__file__), '..', 'data', 'displib_testinstances_swapping1.json')
+    problem = ProblemInstance(fixture)
+    start = GreedyDispatcher(problem, MasterModel(problem)).run()
+    assert start.objective_value == 30
@@ -0,0 +1,58 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import instance_cache
+from model import ProblemInstance
+
+
+def test_cache_roundtrip_and_invalidation(tmp_path):
+    source = os.path.join(os.path.dirname(__file__), 'fixtures', 'triple_cycle.json')
+    path = str(tmp_path / 'instance.json')
+    with open(source) as f:
+        data = json.load(f)
+    # Mit Release-Zeiten bildet die Instanz einen echten Deadlock-Zyklus
+    for train in data["trains"]:
+        for op in train:
+            for res in op.get("resources", []): res["release_time"] = 1
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+    plain = ProblemInstance(path)
+    cold = ProblemInstance(path, use_cache=True)
+    assert os.path.exists(instance_cache.cache_path_for(path))
+    warm = ProblemInstance(path, use_cache=True)
+
+    assert tuple(warm.conflict_index) == tuple(plain.conflict_index)
+    assert dict(warm.conflict_index.usage_map) == dict(plain.conflict_index.usage_map)
+    assert warm.get_2_train_swap_constraints() == plain.get_2_train_swap_constraints()
+    assert warm.get_3_train_cycle_constraints() == cold.get_3_train_cycle_constraints()
+    assert len(warm.get_3_train_cycle_constraints()) > 0
+    assert [vars(o) for o in warm.objective_components] == [vars(o) for o in plain.objective_components]
+    assert [op.resources for t in warm.trains for op in t.operations] == \
+        [op.resources for t in plain.trains for op in t.operations]
+    assert not warm.arrays.start_lb.flags.writeable
+
+    # Eine geänderte Quelldatei macht den Cache ungültig
+    with open(path, 'a') as f:
+        f.write('\n')
+    assert instance_cache.read_cache(instance_cache.cache_path_for(path), instance_cache.file_sha256(path)) is None
+
+
+def test_cached_conflict_index_builds_tuples_on_first_use(tmp_path):
+    source = os.path.join(os.path.dirname(__file__), '..', 'data', 'displib_testinstances_headway1.json')
+    path = str(tmp_path / 'instance.json')
+    with open(source) as f, open(path, 'w') as g:
+        g.write(f.read())
+    ProblemInstance(path, use_cache=True)
+    index = ProblemInstance(path, use_cache=True).conflict_index
+
+    # Aus dem Cache kommt nur die Tabelle; Länge und Teilindex brauchen keine Conflict-Tupel
+    assert len(index) == 2
+    sub = index.restrict([False, True])
+    assert index._conflicts is None and sub._conflicts is None and index._usage_map is None
+    assert [(c.t1, c.o1, c.t2, c.o2) for c in sub] == [(0, 2, 1, 2)]
+    assert list(sub.conflicts_among([0, 1])) == [index.conflicts[1]]
+    assert index.usage_map["r1"] == ((0, 2), (1, 2))
@@ -0,0 +1,36 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import instrumentation
+
+
+def test_timers_counters_and_trace(tmp_path):
+    trace_path = tmp_path / 'trace.jsonl'
+    stats = instrumentation.Instrumentation(str(trace_path))
+    for _ in range(3):
+        with stats.timer("subproblem.solve"):
+            pass
+    stats.count("cuts.FeasibilityCut", 2)
+    stats.trace({"cut": "FeasibilityCut", "cut_size": 4})
+    stats.close()
+
+    summary = stats.summary()
+    assert summary["timers"]["subproblem.solve"]["count"] == 3
+    assert summary["counters"] == {"cuts.FeasibilityCut": 2}
+    assert [json.loads(line) for line in trace_path.read_text().splitlines()] == [{"cut": "FeasibilityCut", "cut_size": 4}]
+
+
+def test_null_instrumentation_is_default_and_restorable():
+    assert not instrumentation.current().enabled
+    stats = instrumentation.Instrumentation()
+    previous = instrumentation.activate(stats)
+    try:
+        assert instrumentation.current() is stats
+    finally:
+        instrumentation.activate(previous)
+    with instrumentation.current().timer("ignored"):
+        pass
+    assert instrumentation.current().summary() == {"timers": {}, "counters": {}}
@@ -0,0 +1,93 @@
+import json
+import os
+import sys
+import gurobipy as gp
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from master_model import MasterModel
+from model import ProblemInstance
+from subproblem_gurobi import SubproblemGurobi
+from subproblem_longest_path import SubproblemLongestPath, TimingNetwork
+
+INF = float('inf')
+
+
+def test_earliest_start_times():
+    network = TimingNetwork([0, 5, 0], [INF, INF, INF])
+    network.add_edge(0, 1, 3)
+    network.add_edge(1, 2, 4)
+    network.add_edge(0, 2, 2)
+    assert network.solve() is None
+    assert network.dist == [0, 5, 9]
+
+
+def test_positive_cycle_is_returned():
+    network = TimingNetwork([0, 0, 0], [INF, INF, INF])
+    network.add_edge(0, 1, 1)
+    e12 = network.add_edge(1, 2, 1, ["y12"])
+    e21 = network.add_edge(2, 1, 0, ["y21"])
+    assert sorted(network.solve()) == sorted([e12, e21])
+
+
+def test_zero_weight_cycle_is_returned():
+    # Gleichzeitige Events können sich in der Eventliste nicht gegenseitig vorausgehen
+    network = TimingNetwork([0, 0, 0], [INF, INF, INF])
+    network.add_edge(0, 1, 0)
+    e12 = network.add_edge(1, 2, 0, ["y12"])
+    e21 = network.add_edge(2, 1, 0, ["y21"])
+    assert sorted(network.solve()) == sorted([e12, e21])
+
+
+def test_violated_upper_bound_chain():
+    network = TimingNetwork([4, 0, 0], [INF, INF, 6])
+    e01 = network.add_edge(0, 1, 2, ["z01"])
+    e12 = network.add_edge(1, 2, 1, ["y12"])
+    network.add_edge(0, 2, 0)
+    assert network.solve() == [e12, e01]
+
+
+def _single_track(tmp_path):
+    """Zwei Züge über dieselbe Ressource r; nur die Ankunft von Zug 1 kostet (ab 0)."""
+    route = [{"start_ub": 0, "min_duration": 0, "successors": [1]},
+             {"min_duration": 5, "resources": [{"resource": "r"}], "successors": [2]},
+             {"min_duration": 0, "successors": []}]
+    path = tmp_path / "single_track.json"
+    path.write_text(json.dumps({"trains": [route, route], "objective": [
+        {"type": "op_delay", "train": 1, "operation": 2, "threshold": 0, "coeff": 1}]}))
+    return ProblemInstance(str(path))
+
+
+def test_optimality_cut_covers_only_the_critical_path(tmp_path):
+    problem = _single_track(tmp_path)
+    master = MasterModel(problem)
+    first, second = master.y[0, 1, 1, 1], master.y[1, 1, 0, 1]
+    cut = SubproblemLongestPath(problem, master).solve({first: 1.0, second: 0.0})
+    # Zug 1 wartet auf Zug 0: nur diese Reihenfolge bestimmt die Kosten von 10
+    assert cut.objective_value == 10
+    assert cut.coefficients == {first: 10}
+
+    cut = SubproblemLongestPath(problem, master).solve({first: 0.0, second: 1.0})
+    assert cut.objective_value == 5
+    assert cut.coefficients == {}
+
+
+def test_gurobi_engine_reports_the_delay_objective(tmp_path):
+    problem = _single_track(tmp_path)
+    master = MasterModel(problem)
+    first, second = master.y[0, 1, 1, 1], master.y[1, 1, 0, 1]
+    cut = SubproblemGurobi(problem, master).solve({first: 1.0, second: 0.0})
+    assert cut.objective_value == SubproblemLongestPath(problem, master).solve({first: 1.0, second: 0.0}).objective_value == 10
+    # Dieselben kritischen Pfade wie die Longest-Path-Engine statt des No-Goods über alle Variablen
+    assert cut.coefficients == {first: 10}
+    assert SubproblemGurobi(problem, master).solve({first: 0.0, second: 1.0}).coefficients == {}
+
+
+def test_gurobi_engine_close_frees_model_and_environment(tmp_path):
+    problem = _single_track(tmp_path)
+    master = MasterModel(problem)
+    subproblem = SubproblemGurobi(problem, master)
+    subproblem.close()
+    with pytest.raises(gp.GurobiError):
+        subproblem.model.optimize()
@@ -0,0 +1,40 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from gurobipy import GRB
+import lbbd_main
+import utils
+from model import ProblemInstance
+from verifier import verify_solution
+
+DATA = os.path.join(os.path.dirname(__file__), '..', 'data')
+
+
+def test_monolithic_matches_lbbd():
+    for name in ("displib_testinstances_headway1.json", "displib_testinstances_swapping2.json"):
+        problem = ProblemInstance(os.path.join(DATA, name))
+        result = utils.solve_monolithic(problem, 30, heuristic=None)
+        reference = lbbd_main.optimize(problem, 30, heuristic=None)
+        assert result["objective"] == reference["objective"]
+        assert result["bound"] == result["objective"]
+        events = result["master"].path_events(result["cut"])
+        assert verify_solution(problem, events, result["objective"]).feasible
+
+
+def test_choose_method_by_size(monkeypatch):
+    problem = ProblemInstance(os.path.join(DATA, "displib_testinstances_headway1.json"))
+    assert utils.choose_method(problem) == "monolithic"
+    monkeypatch.setattr(utils, "MONOLITHIC_MAX_CONFLICTS", len(problem.conflict_index) - 1)
+    assert utils.choose_method(problem) == "lbbd"
+
+
+def test_start_times_are_integer():
+    # Op 1 beginnt frühestens bei 9, also vor threshold 10: kein increment
+    train = [{"start_ub": 0, "min_duration": 9, "successors": [1]}, {"min_duration": 0, "successors": []}]
+    objective = [{"type": "op_delay", "train": 0, "operation": 1, "threshold": 10, "increment": 5}]
+    problem = ProblemInstance.from_data({"trains": [train], "objective": objective})
+    mono_model, x = utils.build_monolithic_model(problem)
+    assert all(var.VType == GRB.INTEGER for var in x.values())
+    assert utils.solve_monolithic(problem, 10, heuristic=None)["objective"] == 0
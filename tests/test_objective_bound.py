@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from master_model import MasterModel
+from model import ProblemInstance
+from subproblem_longest_path import SubproblemLongestPath
+
+
+def _branching_train():
+    """Op 1 (Dauer 20, ab 3) verzweigt auf 2 oder 3, beide führen in 5 Zeiteinheiten zu Op 4."""
+    return [{"start_ub": 0, "min_duration": 0, "successors": [1]},
+            {"start_lb": 3, "min_duration": 20, "successors": [2, 3]},
+            {"min_duration": 5, "successors": [4]},
+            {"min_duration": 5, "successors": [4]},
+            {"min_duration": 0, "successors": []}]
+
+
+def test_theta_bound_from_path_dependent_earliest_starts():
+    objective = [{"type": "op_delay", "train": 0, "operation": 1, "threshold": 0, "coeff": 2},
+                 {"type": "op_delay", "train": 0, "operation": 4, "threshold": 10, "coeff": 1}]
+    problem = ProblemInstance.from_data({"trains": [_branching_train()], "objective": objective})
+    master = MasterModel(problem)
+    # Konstanter Anteil 2 * 3, pfadabhängig erreicht Op 4 frühestens 3 + 20 + 5 = 28
+    master.model.optimize()
+    assert master.model.ObjVal == 6 + 18
+
+    solution = master.get_solution()
+    assert SubproblemLongestPath(problem, master).solve(solution).objective_value == master.model.ObjVal
+
+
+def test_theta_bound_without_branches_is_a_constant_lower_bound():
+    objective = [{"type": "op_delay", "train": 0, "operation": 1, "threshold": 0, "coeff": 2, "increment": 4}]
+    problem = ProblemInstance.from_data({"trains": [_branching_train()], "objective": objective})
+    master = MasterModel(problem)
+    assert master.theta.lb == 10
+    assert not [v for v in master.model.getVars() if v.VarName.startswith("delay")]
+
+
+def test_components_off_the_chosen_path_do_not_bound_theta():
+    # Die Komponente liegt auf Op 2, die nur der Weg über z[0, 1, 2] besucht
+    objective = [{"type": "op_delay", "train": 0, "operation": 2, "threshold": 0, "coeff": 1}]
+    problem = ProblemInstance.from_data({"trains": [_branching_train()], "objective": objective})
+    master = MasterModel(problem)
+    assert list(master.on_path) == [(0, 2), (0, 3)]
+    master.model.optimize()
+    assert master.model.ObjVal == 0
+    assert master.z[0, 1, 3].X > 0.5
+
+    master.z[0, 1, 2].lb = 1
+    master.model.optimize()
+    assert master.model.ObjVal == 3 + 20
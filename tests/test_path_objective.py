@@ -0,0 +1,57 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import lbbd_main
+import utils
+from master_model import MasterModel
+from model import ProblemInstance
+from verifier import verify_solution
+
+
+def _optional_operation_problem():
+    """Zug 0 fährt über Op 1 oder über die langsame Alternative Op 2; nur Op 2 hat eine Zielkomponente."""
+    train = [{"start_ub": 0, "min_duration": 5, "successors": [1, 2]},
+             {"min_duration": 5, "successors": [3]},
+             {"start_lb": 50, "min_duration": 5, "successors": [3]},
+             {"min_duration": 0, "successors": []}]
+    objective = [{"type": "op_delay", "train": 0, "operation": 2, "threshold": 10, "coeff": 1, "increment": 7}]
+    return ProblemInstance.from_data({"trains": [train], "objective": objective})
+
+
+def test_components_on_unchosen_alternatives_cost_nothing():
+    problem = _optional_operation_problem()
+    master = MasterModel(problem)
+    via_1 = {master.z[0, 0, 1]: 1.0, master.z[0, 0, 2]: 0.0}
+    via_2 = {master.z[0, 0, 1]: 0.0, master.z[0, 0, 2]: 1.0}
+    for engine in ("longest_path", "gurobi", "z3"):
+        subproblem = lbbd_main.create_subproblem(engine, problem, master)
+        assert subproblem.solve(via_1).objective_value == 0
+        assert subproblem.solve(via_2).objective_value == 40 + 7
+        if hasattr(subproblem, "close"): subproblem.close()
+
+
+def test_cut_keeps_path_choice_responsible():
+    problem = _optional_operation_problem()
+    master = MasterModel(problem)
+    for engine in ("longest_path", "gurobi", "z3"):
+        cut = lbbd_main.create_subproblem(engine, problem, master).solve({master.z[0, 0, 1]: 0.0, master.z[0, 0, 2]: 1.0})
+        # Der Weg über Op 2 ist die einzige Ursache der Kosten
+        assert cut.coefficients == {master.z[0, 0, 2]: cut.objective_value}
+
+
+def test_optimize_reports_verified_objective():
+    problem = _optional_operation_problem()
+    result = lbbd_main.optimize(problem, 10, heuristic=None, verify=True)
+    assert result["objective"] == 0
+    assert verify_solution(problem, result["master"].path_events(result["cut"]), result["objective"]).feasible
+
+
+def test_monolithic_charges_only_the_chosen_path():
+    problem = _optional_operation_problem()
+    assert utils.solve_monolithic(problem, 10, heuristic=None)["objective"] == 0
+    # Ist Op 1 unerreichbar, führt der einzige Weg über Op 2
+    problem.update_bounds(start_ub={(0, 1): 0})
+    result = utils.solve_monolithic(problem, 10, heuristic=None)
+    assert result["objective"] == result["bound"] == 40 + 7
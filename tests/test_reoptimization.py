@@ -0,0 +1,58 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import lbbd_main
+from model import ProblemInstance
+from reoptimization import SolverSession
+
+
+def _route(departure, resources):
+    """Zug über die Blöcke 'resources' (je 10 Zeiteinheiten), Abfahrt frühestens zu 'departure'."""
+    ops = [{"start_ub": 0, "min_duration": 0, "successors": [1]}]
+    for i, res in enumerate(resources):
+        op = {"min_duration": 10, "resources": [{"resource": res, "release_time": 2}], "successors": [i + 2]}
+        if i == 0: op["start_lb"] = departure
+        ops.append(op)
+    ops.append({"min_duration": 0, "successors": []})
+    return ops
+
+
+def _data():
+    trains = [_route(d, ["A", "B", "C"]) for d in (0, 5, 8)]
+    objective = [{"type": "op_delay", "train": t, "operation": 4, "threshold": d + 30, "coeff": 1}
+                 for t, d in enumerate((0, 5, 8))]
+    return {"trains": trains, "objective": objective}
+
+
+def _cold(data):
+    return lbbd_main.optimize(ProblemInstance.from_data(data), 30)["objective"]
+
+
+def test_delay_is_applied_in_place_and_warm_started():
+    session = SolverSession(ProblemInstance.from_data(_data()))
+    first = session.solve(30)
+    assert first["objective"] == _cold(_data())
+
+    master = session.master
+    result = session.update(30, start_lb={(0, 1): 20})
+    data = _data()
+    data["trains"][0][1]["start_lb"] = 20
+    assert not result["rebuilt"] and session.master is master
+    assert result["objective"] == _cold(data)
+    assert session.problem.trains[0].operations[1].start_lb == 20
+
+
+def test_removed_and_added_trains_rebuild_the_models():
+    session = SolverSession(ProblemInstance.from_data(_data()))
+    session.solve(30)
+    result = session.update(30, remove_trains=[1], add_trains=[_route(3, ["C", "B", "A"])],
+                            objective=[{"type": "op_delay", "train": 0, "operation": 4, "threshold": 20, "coeff": 2}])
+    data = _data()
+    data["trains"] = [data["trains"][0], data["trains"][2], _route(3, ["C", "B", "A"])]
+    data["objective"] = [dict(data["objective"][0]), dict(data["objective"][2], train=1),
+                         {"type": "op_delay", "train": 2, "operation": 4, "threshold": 20, "coeff": 2}]
+    assert result["rebuilt"] and session.rebuilds == 1
+    assert len(session.problem.trains) == 3
+    assert result["objective"] == _cold(data)
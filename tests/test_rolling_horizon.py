@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model import ProblemInstance
+from rolling_horizon import RollingHorizon
+
+
+def _route(departure, resources, origin=None):
+    """Zug über die Blöcke 'resources' (je 10 Zeiteinheiten), Abfahrt frühestens zu 'departure'."""
+    ops = [{"start_ub": 0, "min_duration": 0, "successors": [1]}]
+    if origin: ops[0]["resources"] = [{"resource": origin, "release_time": 0}]
+    for i, res in enumerate(resources):
+        op = {"min_duration": 10, "resources": [{"resource": res, "release_time": 2}], "successors": [i + 2]}
+        if i == 0: op["start_lb"] = departure
+        ops.append(op)
+    ops.append({"min_duration": 0, "successors": []})
+    return ops
+
+
+def _events(result):
+    return {(e['train'], e['operation']): e['time'] for e in result["events"]}
+
+
+def test_following_trains_over_several_windows():
+    trains = [_route(d, ["A", "B", "C"]) for d in (0, 5, 40)]
+    objective = [{"type": "op_delay", "train": t, "operation": 4, "threshold": d + 30, "coeff": 1}
+                 for t, d in enumerate((0, 5, 40))]
+    problem = ProblemInstance.from_data({"trains": trains, "objective": objective})
+    horizon = RollingHorizon(problem, window_length=25, overlap=5)
+    result = horizon.solve(30)
+    events = _events(result)
+    # Zug 1 folgt Zug 0 mit Release-Zeit 2 durch jeden Block, Zug 2 fährt unbehindert
+    assert [events[1, o] for o in range(1, 5)] == [12, 22, 32, 42]
+    assert [events[2, o] for o in range(1, 5)] == [40, 50, 60, 70]
+    assert result["objective"] == 7
+    assert result["bound"] is None
+    assert all(horizon._finished(t) for t in range(3))
+
+
+def test_origin_occupancy_of_later_train_is_respected():
+    # Zug 1 steht ab 0 in D und fährt frühestens zu 60 über E ab; Zug 0 muss D vorher durchfahren
+    trains = [_route(0, ["A", "D", "B"]), _route(60, ["E"], origin="D")]
+    problem = ProblemInstance.from_data({"trains": trains, "objective": []})
+    horizon = RollingHorizon(problem, window_length=20)
+    window, mapping, complete = horizon._build_window(0, 20)
+    assert [(t, kept) for t, kept, _ in mapping] == [(0, [0, 1, 2]), (1, None)]
+    assert not complete
+
+    events = _events(horizon.solve(30))
+    assert events[0, 2] >= events[1, 1]
+    assert events[1, 1] == 60
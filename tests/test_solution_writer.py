@@ -0,0 +1,37 @@
+import json
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from solution_writer import solution_path, write_solution
+
+
+def test_events_are_sorted_by_time_and_rounded(tmp_path):
+    path = str(tmp_path / "out" / "solution.json")
+    events = [{"train": 1, "operation": 1, "time": 5.0000001}, {"train": 0, "operation": 2, "time": 5},
+              {"train": 1, "operation": 0, "time": 0}, {"train": 0, "operation": 0, "time": 0}]
+    assert write_solution(path, 16.9999, events) == path
+    with open(path) as f: solution = json.load(f)
+    assert solution["objective_value"] == 17
+    # Bei gleicher Zeit bleibt die übergebene Reihenfolge (Übergaben der Ressourcen)
+    assert [(e["time"], e["train"], e["operation"]) for e in solution["events"]] == [(0, 1, 0), (0, 0, 0), (5, 1, 1), (5, 0, 2)]
+    assert all(isinstance(e["time"], int) for e in solution["events"])
+    assert os.listdir(tmp_path / "out") == ["solution.json"]
+
+
+def test_failed_write_keeps_previous_solution(tmp_path, monkeypatch):
+    path = str(tmp_path / "solution.json")
+    write_solution(path, 3, [{"train": 0, "operation": 0, "time": 0}])
+
+    def fail(src, dst): raise OSError("disk full")
+    monkeypatch.setattr(os, "replace", fail)
+    with pytest.raises(OSError):
+        write_solution(path, 1, [{"train": 0, "operation": 0, "time": 0}])
+    with open(path) as f: assert json.load(f)["objective_value"] == 3
+    assert os.listdir(tmp_path) == ["solution.json"]
+
+
+def test_solution_path():
+    assert solution_path("data/x/line1.json") == os.path.join("solutions", "solution_line1.json")
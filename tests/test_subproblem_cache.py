@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lbbd_main import SubproblemCache
+
+
+def test_lru_eviction_and_counters():
+    cache = SubproblemCache(["a", "b"], maxsize=2)
+    k1 = cache.key({"a": 1.0, "b": 0.0})
+    k2 = cache.key({"a": 0.0, "b": 1.0})
+    k3 = cache.key({"a": 1.0, "b": 1.0})
+    assert len({k1, k2, k3}) == 3
+    assert cache.key({"a": 0.9999, "b": 0.0001}) == k1
+
+    cache.put(k1, "cut1")
+    cache.put(k2, "cut2")
+    assert cache.get(k1) == "cut1"  # k1 wird zuletzt benutzt, k2 fliegt raus
+    cache.put(k3, "cut3")
+    assert cache.get(k2) is None
+    assert cache.get(k3) == "cut3"
+    assert (cache.hits, cache.misses) == (2, 1)
@@ -0,0 +1,47 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip('z3')
+from cuts import OptimalityCut
+from master_model import MasterModel
+from subproblem_gurobi import SubproblemGurobi
+from subproblem_longest_path import SubproblemLongestPath
+from subproblem_portfolio import PortfolioSubproblem
+from subproblem_z3 import SubproblemZ3
+from test_subproblem_z3 import _assignments, _crossing
+
+
+def _portfolio(problem, master, **options):
+    engines = {"gurobi": SubproblemGurobi(problem, master), "z3": SubproblemZ3(problem, master)}
+    return PortfolioSubproblem(problem, master, engines, **options)
+
+
+def test_portfolio_agrees_with_longest_path():
+    problem = _crossing()
+    master = MasterModel(problem)
+    portfolio, reference = _portfolio(problem, master), SubproblemLongestPath(problem, master)
+    for _ in range(3):
+        for solution in _assignments(master):
+            cut, expected = portfolio.solve(solution), reference.solve(solution)
+            assert type(cut) is type(expected)
+            if isinstance(cut, OptimalityCut): assert cut.objective_value == expected.objective_value
+    portfolio.close()
+    assert portfolio.races == 12
+    assert sum(portfolio.wins.values()) == portfolio.races
+
+
+def test_portfolio_settles_on_leading_engine():
+    problem = _crossing()
+    master = MasterModel(problem)
+    portfolio = _portfolio(problem, master, warmup=1, dominance=0.0, probe_interval=3)
+    solutions = list(_assignments(master))
+    portfolio.solve(solutions[0])
+    assert portfolio.choice in portfolio.wins
+    # Danach läuft nur noch die gewählte Engine, jeder dritte Aufruf bleibt ein Rennen
+    for solution in solutions[1:]:
+        portfolio.solve(solution)
+    portfolio.close()
+    assert portfolio.races == 2
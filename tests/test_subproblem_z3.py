@@ -0,0 +1,70 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+pytest.importorskip('z3')
+from cuts import OptimalityCut
+from master_model import MasterModel
+from model import ProblemInstance
+from subproblem_longest_path import SubproblemLongestPath
+from subproblem_z3 import SubproblemZ3
+
+
+def _crossing():
+    """Zug 0 fährt A -> B, Zug 1 B -> A (Release-Zeit 1); Ankünfte kosten ab 0."""
+    def route(first, second):
+        return [{"start_ub": 0, "min_duration": 0, "successors": [1]},
+                {"min_duration": 5, "resources": [{"resource": first, "release_time": 1}], "successors": [2]},
+                {"min_duration": 5, "resources": [{"resource": second, "release_time": 1}], "successors": [3]},
+                {"min_duration": 0, "successors": []}]
+    objective = [{"type": "op_delay", "train": t, "operation": 3, "threshold": 0, "coeff": 1} for t in (0, 1)]
+    return ProblemInstance.from_data({"trains": [route("A", "B"), route("B", "A")], "objective": objective})
+
+
+def _assignments(master):
+    on_a, on_b = (0, 1, 1, 2), (1, 1, 0, 2)
+    for first_a in (True, False):
+        for first_b in (True, False):
+            solution = {master.y[key]: 0.0 for key in master.y}
+            solution[master.y[on_a if first_a else (1, 2, 0, 1)]] = 1.0
+            solution[master.y[on_b if first_b else (0, 2, 1, 1)]] = 1.0
+            yield solution
+
+
+def test_z3_engine_agrees_with_longest_path():
+    problem = _crossing()
+    master = MasterModel(problem)
+    z3_engine, reference = SubproblemZ3(problem, master), SubproblemLongestPath(problem, master)
+    infeasible = 0
+    for solution in _assignments(master):
+        cut, expected = z3_engine.solve(solution), reference.solve(solution)
+        assert type(cut) is type(expected)
+        if isinstance(cut, OptimalityCut):
+            assert cut.objective_value == expected.objective_value
+            assert cut.coefficients == expected.coefficients
+        else:
+            infeasible += 1
+            # Der Core enthält nur die beiden Reihenfolgen des Gegenverkehrs
+            assert set(cut.conflict_vars) == set(expected.conflict_vars)
+    # Unterschiedliche Reihenfolgen auf A und B verklemmen
+    assert infeasible == 2
+
+
+def test_z3_model_is_built_once():
+    problem = _crossing()
+    master = MasterModel(problem)
+    engine = SubproblemZ3(problem, master)
+    for solution in _assignments(master):
+        engine.solve(solution)
+    assertions = len(engine.solver.assertions())
+    for solution in _assignments(master):
+        engine.solve(solution)
+    assert len(engine.solver.assertions()) == assertions
+
+    # Engere Zeitfenster kommen über ein neues Zug-Literal hinzu
+    problem.update_bounds(start_lb={(0, 1): 7})
+    engine.refresh_bounds()
+    solution = list(_assignments(master))[1]  # Zug 0 zuerst auf A und B
+    assert engine.solve(solution).objective_value == SubproblemLongestPath(problem, master).solve(solution).objective_value
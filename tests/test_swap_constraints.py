@@ -0,0 +1,39 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model import ProblemInstance
+
+
+def _write_head_on(path, release_time):
+    """Zug 0 fährt A -> B, Zug 1 fährt B -> A; A wird von Zug 0 auf der Strecke zweimal benutzt."""
+    def op(resource, successors, duration=5):
+        resources = [{"resource": resource, "release_time": release_time}] if resource else []
+        return {"min_duration": duration, "resources": resources, "successors": successors}
+    trains = [
+        [op(None, [1], 0), op("A", [2]), op("B", [3]), op("A", [4]), op("B", [5]), op(None, [])],
+        [op(None, [1], 0), op("B", [2]), op("A", [3]), op(None, [])],
+    ]
+    objective = [{"type": "op_delay", "train": 0, "operation": 5, "threshold": 0, "coeff": 1}]
+    with open(path, 'w') as f:
+        json.dump({"trains": trains, "objective": objective}, f)
+    return ProblemInstance(str(path))
+
+
+def test_head_on_swaps_keep_all_occurrences(tmp_path):
+    instance = _write_head_on(tmp_path / 'head_on.json', release_time=1)
+    assert instance.get_2_train_swap_constraints() == [
+        ((0, 1, 1, 2), (0, 2, 1, 1)),
+        ((0, 3, 1, 2), (0, 4, 1, 1)),
+    ]
+
+
+def test_swap_without_release_time_still_needs_equal_order(tmp_path):
+    # Auch ohne Release-Zeit muss das Ende-Event vor dem Start-Event des anderen Zuges liegen
+    instance = _write_head_on(tmp_path / 'head_on.json', release_time=0)
+    assert instance.get_2_train_swap_constraints() == [
+        ((0, 1, 1, 2), (0, 2, 1, 1)),
+        ((0, 3, 1, 2), (0, 4, 1, 1)),
+    ]
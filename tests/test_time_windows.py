@@ -0,0 +1,68 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import time_windows
+from master_model import MasterModel
+from model import ProblemInstance
+
+
+def _two_trains(tmp_path, exit_ub=None):
+    exit_op = {"min_duration": 0, "successors": []}
+    if exit_ub is not None: exit_op["start_ub"] = exit_ub
+    trains = [
+        [{"start_ub": 0, "min_duration": 0, "successors": [1]},
+         {"start_ub": 3, "min_duration": 5, "resources": [{"resource": "r"}], "successors": [2]},
+         exit_op],
+        [{"start_lb": 10, "min_duration": 0, "successors": [1]},
+         {"min_duration": 5, "resources": [{"resource": "r"}], "successors": [2]},
+         {"min_duration": 0, "successors": []}],
+    ]
+    path = tmp_path / "instance.json"
+    path.write_text(json.dumps({"trains": trains, "objective": []}))
+    return ProblemInstance(str(path))
+
+
+def test_forced_and_implied_orderings(tmp_path):
+    problem = _two_trains(tmp_path)
+    windows = time_windows.TimeWindows(problem)
+    assert windows.window(1, 2) == (15, float('inf'))
+    assert windows.window(0, 1) == (0, 3)
+    # Zug 1 kann r frühestens ab 15 freigeben, Zug 0 muss r bis 3 belegt haben
+    assert windows.classify_conflicts(problem.conflict_index).tolist() == [time_windows.FIRST_BEFORE]
+
+    problem = _two_trains(tmp_path, exit_ub=8)
+    windows = time_windows.TimeWindows(problem)
+    status = windows.classify_conflicts(problem.conflict_index)
+    assert status.tolist() == [time_windows.IMPLIED]
+    assert len(problem.conflict_index.restrict(status == time_windows.FREE)) == 0
+
+
+def test_unreachable_branch_is_pruned(tmp_path):
+    trains = [[
+        {"start_lb": 5, "min_duration": 0, "successors": [1, 2]},
+        {"start_ub": 3, "min_duration": 50, "successors": [3]},
+        {"min_duration": 5, "successors": [3]},
+        {"min_duration": 0, "successors": []},
+    ]]
+    path = tmp_path / "branch.json"
+    path.write_text(json.dumps({"trains": trains, "objective": []}))
+    windows = time_windows.TimeWindows(ProblemInstance(str(path)))
+    assert windows.pruned_paths == {(0, 0, 1)}
+    # Mit nur einem verbliebenen Nachfolger ist die Kante 0 -> 2 in jeder Lösung aktiv
+    assert windows.window(0, 2) == (5, float('inf'))
+    assert windows.infeasible_ops == []
+
+
+def test_forced_orders_and_unchanged_tightening(tmp_path):
+    problem = _two_trains(tmp_path)
+    windows = time_windows.TimeWindows(problem)
+    status = windows.classify_conflicts(problem.conflict_index)
+    assert windows.forced_orders(problem.conflict_index, status) == [(0, 1, 1, 1)]
+    master = MasterModel(problem)
+    assert master.fixed_orders == [(0, 1, 1, 1)]
+    # Ohne engere Zeitfenster bleibt alles wie bisher
+    assert master.tighten_time_windows() == 0
+    assert master.fixed_orders == [(0, 1, 1, 1)]
@@ -1,18 +1,28 @@
+import json
 import os
 import sys
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from model import ProblemInstance
 from utils import parse_displib_instance
 
 
+def _fixture():
+    return os.path.join(os.path.dirname(__file__), 'fixtures', 'triple_cycle.json')
+
+
 def test_three_train_cycle_no_swaps():
-    fixture = os.path.join(os.path.dirname(__file__), 'fixtures', 'triple_cycle.json')
-    instance = parse_displib_instance(fixture)
-    pairs = instance.get_no_swap_pairs()
-    expected = [
-        ((0, 1, 1, 1), (1, 0, 2, 1)),
-        ((0, 2, 2, 0), (0, 1, 1, 1)),
-        ((1, 0, 2, 1), (0, 2, 2, 0)),
-    ]
-    assert pairs == expected
+    instance = parse_displib_instance(_fixture())
+    assert instance.get_2_train_swap_constraints() == []
+    assert instance.get_3_train_cycle_constraints() == [((0, 1, 1, 1), (1, 0, 2, 1), (2, 0, 0, 2))]
+
+
+def test_three_train_cycle_with_release_times():
+    with open(_fixture()) as f: raw = json.load(f)
+    for train in raw['trains']:
+        for op in train:
+            for resource in op.get('resources', []): resource['release_time'] = 1
+    instance = ProblemInstance.from_data(raw)
+    assert instance.get_2_train_swap_constraints() == []
+    assert instance.get_3_train_cycle_constraints() == [((0, 1, 1, 1), (1, 0, 2, 1), (2, 0, 0, 2))]
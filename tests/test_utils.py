@@ -1,9 +1,11 @@
+import json
 import os
 import sys
 
 # Ensure repository root is on sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from model import ProblemInstance
 from utils import parse_displib_instance, instance_to_data
 
 
@@ -24,3 +26,12 @@ def test_no_swaps_detected():
     instance = parse_displib_instance(fixture)
     data = instance_to_data(instance)
     assert data['no_swaps'] == [((0, 1, 1, 2), (0, 2, 1, 1))]
+
+
+def test_swap_detected_with_release_time():
+    fixture = os.path.join(os.path.dirname(__file__), '..', 'data',
+                           'displib_testinstances_swapping1.json')
+    with open(fixture) as f: raw = json.load(f)
+    raw['trains'][0][1]['resources'][0]['release_time'] = 1
+    data = instance_to_data(ProblemInstance.from_data(raw))
+    assert data['no_swaps'] == [((0, 1, 1, 2), (0, 2, 1, 1))]
@@ -0,0 +1,92 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from master_model import MasterModel
+from model import ProblemInstance
+from subproblem_longest_path import SubproblemLongestPath
+from verifier import order_events, verify_solution
+
+
+def _instance():
+    """Zug 0 fährt über A oder B, Zug 1 über A (Release-Zeit 2)."""
+    train0 = [{"start_ub": 0, "min_duration": 0, "successors": [1, 2]},
+              {"min_duration": 5, "resources": [{"resource": "A"}], "successors": [3]},
+              {"min_duration": 5, "resources": [{"resource": "B"}], "successors": [3]},
+              {"min_duration": 0, "successors": []}]
+    train1 = [{"start_ub": 0, "min_duration": 0, "successors": [1]},
+              {"min_duration": 5, "resources": [{"resource": "A", "release_time": 2}], "successors": [2]},
+              {"min_duration": 0, "successors": []}]
+    objective = [{"type": "op_delay", "train": 0, "operation": 3, "threshold": 4, "increment": 10, "coeff": 2},
+                 {"type": "op_delay", "train": 1, "operation": 2, "threshold": 0, "coeff": 1}]
+    return ProblemInstance.from_data({"trains": [train0, train1], "objective": objective})
+
+
+def _events(path0, path1):
+    return ([{"train": 0, "operation": o, "time": t} for o, t in path0] +
+            [{"train": 1, "operation": o, "time": t} for o, t in path1])
+
+
+def test_feasible_solution_and_objective():
+    problem = _instance()
+    result = verify_solution(problem, _events([(0, 0), (2, 0), (3, 5)], [(0, 0), (1, 0), (2, 5)]), 17)
+    assert result.feasible, result.errors
+    assert result.objective == 17
+    # Nach der Release-Zeit darf Zug 0 über A folgen
+    assert verify_solution(problem, _events([(0, 0), (1, 7), (3, 12)], [(0, 0), (1, 0), (2, 5)])).feasible
+
+
+def test_violations_are_reported():
+    problem = _instance()
+    train1 = [(0, 0), (1, 0), (2, 5)]
+    cases = {
+        "Ressource A": [(0, 0), (1, 6), (3, 11)],  # A noch bis 7 durch Zug 1 belegt
+        "min_duration": [(0, 0), (2, 0), (3, 4)],
+        "kein Nachfolger": [(0, 0), (3, 5)],
+        "noch Nachfolger": [(0, 0), (2, 0)],
+        "start_ub": [(0, 1), (2, 1), (3, 6)],
+    }
+    for expected, path0 in cases.items():
+        result = verify_solution(problem, _events(path0, train1))
+        assert not result.feasible
+        assert any(expected in error for error in result.errors), (expected, result.errors)
+    mismatch = verify_solution(problem, _events([(0, 0), (2, 0), (3, 5)], train1), 12)
+    assert mismatch.errors == ["Angegebener Zielfunktionswert 12 weicht vom berechneten 17 ab"]
+
+
+def test_path_events_of_subproblem_solution_verify():
+    problem = _instance()
+    master = MasterModel(problem)
+    solution = {var: 0.0 for var in list(master.y.values()) + list(master.z.values())}
+    solution[master.z[0, 0, 2]] = 1.0
+    cut = SubproblemLongestPath(problem, master).solve(solution)
+    events = master.path_events(cut)
+    assert {(e["train"], e["operation"]) for e in events} == {(0, 0), (0, 2), (0, 3), (1, 0), (1, 1), (1, 2)}
+    result = verify_solution(problem, events, cut.objective_value)
+    assert result.feasible, result.errors
+
+
+def test_same_instant_swap_is_rejected():
+    fixture = os.path.join(os.path.dirname(__file__), '..', 'data', 'displib_testinstances_infeasible2.json')
+    problem = ProblemInstance(fixture)
+    swap = [{"train": t, "operation": o, "time": 5 * o} for t in (0, 1) for o in range(3)]
+    # Keine Reihenfolge der Events bei t=5 gibt beide Ressourcen vor dem Start des anderen Zuges frei
+    for events in (swap, order_events(problem, swap), swap[::-1]):
+        result = verify_solution(problem, events)
+        assert not result.feasible
+        assert any("Ende-Event" in error for error in result.errors), result.errors
+
+
+def test_handoff_in_the_same_instant_follows_event_order():
+    train = [{"min_duration": 0, "successors": [1]},
+             {"min_duration": 5, "resources": [{"resource": "A"}], "successors": [2]},
+             {"min_duration": 0, "successors": []}]
+    problem = ProblemInstance.from_data({"trains": [train, train], "objective": []})
+    events = [{"train": 0, "operation": 0, "time": 0}, {"train": 1, "operation": 0, "time": 0},
+              {"train": 0, "operation": 1, "time": 0}, {"train": 1, "operation": 1, "time": 5},
+              {"train": 0, "operation": 2, "time": 5}, {"train": 1, "operation": 2, "time": 10}]
+    assert not verify_solution(problem, events).feasible
+    ordered = order_events(problem, events)
+    assert [(e["train"], e["operation"]) for e in ordered if e["time"] == 5] == [(0, 2), (1, 1)]
+    assert verify_solution(problem, ordered).feasible
@@ -0,0 +1,153 @@
+from typing import Dict, List, Set, Tuple
+import numpy as np
+import model
+
+# Einstufung eines Konflikts (t1, o1, t2, o2) nach der Zeitfenster-Propagation
+FREE = 0            # Beide Reihenfolgen möglich, y bleibt frei
+IRRELEVANT = 1      # Eine der Operationen hat keinen Nachfolger, es entsteht nie eine Reihenfolge-Constraint
+IMPLIED = 2         # Eine Reihenfolge ist durch die Zeitfenster immer erfüllt, der Konflikt entfällt
+FIRST_BEFORE = 3    # Nur t1 vor t2 ist möglich (y[t1, o1, t2, o2] = 1)
+SECOND_BEFORE = 4   # Nur t2 vor t1 ist möglich (y[t2, o2, t1, o1] = 1)
+
+class TimeWindows:
+    """Früheste und späteste Startzeiten je Operation aus den Zuggraphen.
+
+    Vorwärts wird nur über Kanten propagiert, die in jeder Lösung gelten (eindeutiger bzw. einzig
+    verbliebener Nachfolger), rückwärts über das Maximum der erlaubten Nachfolger, da genau
+    einer davon gewählt wird. Nachfolger, die nicht mehr rechtzeitig erreichbar sind, werden als
+    unmögliche Pfade verworfen; Propagation und Pfad-Pruning wechseln sich bis zum Fixpunkt ab.
+    """
+    def __init__(self, problem: model.ProblemInstance, max_rounds: int = 10):
+        self.problem = problem
+        a = problem.arrays
+        self.earliest = a.start_lb.astype(np.float64)
+        self.latest = a.start_ub.copy()
+        self.pruned_paths: Set[Tuple[int, int, int]] = set()
+        self.infeasible_ops: List[Tuple[int, int]] = []
+        offsets, durations = a.train_offsets.tolist(), a.min_duration.tolist()
+        succ_ptr, succ_idx = a.succ_ptr.tolist(), a.succ_idx.tolist()
+        # Erlaubte Nachfolger je globaler Operation (globale Indizes)
+        self.allowed: List[List[int]] = [
+            [offsets[t] + s for s in succ_idx[succ_ptr[g]:succ_ptr[g + 1]]]
+            for t in range(len(offsets) - 1) for g in range(offsets[t], offsets[t + 1])
+        ]
+        order = self._topological_order()
+        earliest, latest = self.earliest.tolist(), self.latest.tolist()
+        for _ in range(max_rounds):
+            for g in order:
+                if len(self.allowed[g]) == 1:
+                    s = self.allowed[g][0]
+                    if earliest[g] + durations[g] > earliest[s]: earliest[s] = earliest[g] + durations[g]
+            for g in reversed(order):
+                if self.allowed[g]:
+                    bound = max(latest[s] for s in self.allowed[g]) - durations[g]
+                    if bound < latest[g]: latest[g] = bound
+            if not self._prune_paths(earliest, latest, durations): break
+        self.earliest, self.latest = np.array(earliest), np.array(latest)
+        owners = a.operation_owners()
+        self.infeasible_ops = [(int(owners[0][g]), int(owners[1][g])) for g in np.flatnonzero(self.earliest > self.latest)]
+
+    def _topological_order(self) -> List[int]:
+        indegree = [0] * len(self.allowed)
+        for succs in self.allowed:
+            for s in succs: indegree[s] += 1
+        stack = [g for g, d in enumerate(indegree) if d == 0]
+        order = []
+        while stack:
+            g = stack.pop()
+            order.append(g)
+            for s in self.allowed[g]:
+                indegree[s] -= 1
+                if indegree[s] == 0: stack.append(s)
+        if len(order) != len(self.allowed):
+            raise ValueError("Zuggraph enthält einen Zyklus")
+        return order
+
+    def _prune_paths(self, earliest: list, latest: list, durations: list) -> bool:
+        """Verwirft Nachfolger s von g mit earliest[g] + dauer > latest[s]; True, falls sich etwas geändert hat."""
+        a = self.problem.arrays
+        changed = False
+        for g, succs in enumerate(self.allowed):
+            if len(succs) < 2: continue
+            reachable = [s for s in succs if earliest[g] + durations[g] <= latest[s]]
+            # Ist kein Nachfolger erreichbar, ist die Instanz unzulässig; das erkennt das Subproblem
+            if not reachable or len(reachable) == len(succs): continue
+            t = int(np.searchsorted(a.train_offsets, g, side="right") - 1)
+            base = int(a.train_offsets[t])
+            for s in succs:
+                if s not in reachable: self.pruned_paths.add((t, g - base, s - base))
+            self.allowed[g] = reachable
+            changed = True
+        return changed
+
+    def mandatory_operations(self) -> np.ndarray:
+        """Maske der Operationen, die jeder erlaubte Weg ihres Zuges besucht.
+
+        Nur deren Zielkomponenten fallen in jeder Lösung an. Gezählt werden die Wege von
+        Operation 0 bis v und von v bis zum Ende; v liegt auf jedem Weg, wenn das Produkt gleich
+        der Anzahl aller Wege des Zuges ist.
+        """
+        a = self.problem.arrays
+        offsets = a.train_offsets.tolist()
+        order = self._topological_order()
+        n = len(self.allowed)
+        from_start, to_end = [0] * n, [0] * n
+        for t in range(len(offsets) - 1):
+            if offsets[t] < offsets[t + 1]: from_start[offsets[t]] = 1
+        for g in order:
+            for s in self.allowed[g]: from_start[s] += from_start[g]
+        for g in reversed(order):
+            to_end[g] = sum(to_end[s] for s in self.allowed[g]) if self.allowed[g] else 1
+        train_of, _ = a.operation_owners()
+        total = [to_end[offsets[t]] for t in train_of.tolist()]
+        return np.array([total[g] > 0 and from_start[g] * to_end[g] == total[g] for g in range(n)], dtype=bool)
+
+    def window(self, t_idx: int, o_idx: int) -> Tuple[float, float]:
+        g = self.problem.arrays.gid(t_idx, o_idx)
+        return float(self.earliest[g]), float(self.latest[g])
+
+    def classify_conflicts(self, conflict_index: model.ConflictIndex) -> np.ndarray:
+        """Einstufung (FREE, IRRELEVANT, ...) je Konflikt in der Reihenfolge des Index.
+
+        Für t1 vor t2 muss x[t2, o2] >= x[t1, s1] + release1 für den gewählten Nachfolger s1 gelten.
+        Diese Reihenfolge ist immer erfüllt, wenn max_s1 latest[s1] + release1 <= earliest[o2], und
+        unmöglich, wenn min_s1 earliest[s1] + release1 > latest[o2].
+        """
+        n = len(self.allowed)
+        succ_min_earliest, succ_max_latest = np.full(n, np.inf), np.full(n, np.inf)
+        has_succ = np.zeros(n, dtype=bool)
+        for g, succs in enumerate(self.allowed):
+            if not succs: continue
+            has_succ[g] = True
+            succ_min_earliest[g] = min(self.earliest[s] for s in succs)
+            succ_max_latest[g] = max(self.latest[s] for s in succs)
+
+        table = conflict_index.table
+        g1, g2 = table["first"], table["second"]
+        rel1, rel2 = table["release1"], table["release2"]
+        implied12 = succ_max_latest[g1] + rel1 <= self.earliest[g2]
+        implied21 = succ_max_latest[g2] + rel2 <= self.earliest[g1]
+        impossible12 = succ_min_earliest[g1] + rel1 > self.latest[g2]
+        impossible21 = succ_min_earliest[g2] + rel2 > self.latest[g1]
+
+        status = np.full(len(g1), FREE, dtype=np.int8)
+        status[impossible21 & ~impossible12] = FIRST_BEFORE
+        status[impossible12 & ~impossible21] = SECOND_BEFORE
+        status[implied12 | implied21] = IMPLIED
+        status[~(has_succ[g1] & has_succ[g2])] = IRRELEVANT
+        return status
+
+    def forced_orders(self, conflict_index: model.ConflictIndex, status: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """y-Schlüssel der erzwungenen Reihenfolgen, direkt aus der Konflikttabelle (ohne Conflict-Tupel)."""
+        table = conflict_index.table
+        rows = np.flatnonzero((status == FIRST_BEFORE) | (status == SECOND_BEFORE))
+        train_of, op_of = self.problem.arrays.operation_owners()
+        g1, g2 = table["first"][rows], table["second"][rows]
+        first = status[rows] == FIRST_BEFORE
+        before, after = np.where(first, g1, g2), np.where(first, g2, g1)
+        return list(zip(train_of[before].tolist(), op_of[before].tolist(), train_of[after].tolist(), op_of[after].tolist()))
+
+    def statistics(self, status: np.ndarray) -> Dict[str, int]:
+        counts = np.bincount(status, minlength=5).tolist()
+        return {"free": counts[FREE], "irrelevant": counts[IRRELEVANT], "implied": counts[IMPLIED],
+                "fixed": counts[FIRST_BEFORE] + counts[SECOND_BEFORE], "pruned_paths": len(self.pruned_paths)}
@@ -1,39 +1,44 @@
-import json
-import os
+from typing import Dict, List, Optional
 import gurobipy as gp
 from gurobipy import GRB
-from model import Operation, Train, DisplibInstance
+import instrumentation
+from cuts import FeasibilityCut, OptimalityCut
+from heuristic import GreedyDispatcher
+from master_model import MasterModel
+from model import ProblemInstance, Train
+from solution_writer import solution_path, write_solution
+from subproblem_longest_path import SubproblemLongestPath
 
-def parse_displib_instance(path: str) -> DisplibInstance:
+# Kleine Instanzen löst das monolithische Modell schneller als LBBD mit seinem Callback-Aufwand
+MONOLITHIC_MAX_CONFLICTS = 500
+MONOLITHIC_MAX_OPERATIONS = 1000
+
+def parse_displib_instance(path: str) -> ProblemInstance:
     """Parse a DISPLIB JSON instance file."""
-    # This function remains unchanged
-    with open(path) as f:
-        raw = json.load(f)
-    trains = []
-    for t_id, op_list in enumerate(raw["trains"]):
-        ops = []
-        for o_id, op in enumerate(op_list):
-            ops.append(
-                Operation(
-                    train_id=t_id, op_id=o_id, min_duration=op["min_duration"],
-                    resources=op.get("resources", []), successors=op.get("successors", []),
-                    start_lb=op.get("start_lb"), start_ub=op.get("start_ub"),
-                )
-            )
-        trains.append(Train(train_id=t_id, operations=ops))
-    objectives = raw.get("objective", [])
-    return DisplibInstance(trains=trains, objectives=objectives)
-
-
-def instance_to_data(instance: DisplibInstance) -> dict:
-    """Convert a DisplibInstance to the data dictionary used by the models."""
-    # This function remains unchanged
+    return ProblemInstance(path)
+
+
+def _enumerate_paths(train: Train) -> List[List[int]]:
+    """Alle Wege eines Zuges von Operation 0 bis zu einer Operation ohne Nachfolger."""
+    paths, stack = [], [[0]]
+    while stack:
+        path = stack.pop()
+        successors = train.operations[path[-1]].successors
+        if not successors: paths.append(path)
+        stack.extend(path + [s_idx] for s_idx in reversed(successors))
+    return paths
+
+
+def instance_to_data(instance: ProblemInstance) -> dict:
+    """Convert a ProblemInstance to the data dictionary used by the models."""
     return {
         "trains": list(range(len(instance.trains))), "train_objects": instance.trains,
-        "paths": instance.generate_paths_dict(),
-        "durations": { str((op.train_id, op.op_id)): op.min_duration for train in instance.trains for op in train.operations },
-        "conflicts": instance.get_conflicts(), "no_swaps": instance.get_no_swap_pairs(),
-        "objective": instance.objectives,
+        "paths": {str(t_idx): _enumerate_paths(train) for t_idx, train in enumerate(instance.trains)},
+        "durations": {str((t_idx, o_idx)): op.min_duration for t_idx, train in enumerate(instance.trains)
+                      for o_idx, op in enumerate(train.operations)},
+        "conflicts": {(c.t1, c.o1, c.t2, c.o2) for c in instance.conflict_index},
+        "no_swaps": instance.get_2_train_swap_constraints(),
+        "objective": [dict(vars(obj)) for obj in instance.objective_components],
     }
 
 # ====================================================================
@@ -41,35 +46,136 @@ def instance_to_data(instance: DisplibInstance) -> dict:
 # ====================================================================
 
 def save_solution(instance_path: str, objective_value: float, events: list):
-    """Speichert die gefundene Lösung im DISPLIB JSON-Format."""
-    output_dir = "output"
-    os.makedirs(output_dir, exist_ok=True)
-    solution_path = os.path.join(output_dir, f"solution_{os.path.basename(instance_path)}")
-    sorted_events = sorted(events, key=lambda e: (e["time"], e["train"], e["operation"]))
-    with open(solution_path, 'w') as f:
-        json.dump({"objective_value": int(round(objective_value)), "events": sorted_events}, f, indent=4)
-    print(f"\n✓ Lösung in '{solution_path}' gespeichert.")
-
-
-def build_monolithic_model(problem: DisplibInstance):
-    """Baut ein einzelnes, großes Gurobi-Modell für einen Lösungsversuch."""
+    """Speichert die gefundene Lösung im DISPLIB JSON-Format (events nur die der gewählten Wege)."""
+    path = write_solution(solution_path(instance_path, "output"), objective_value, events)
+    print(f"\n✓ Lösung in '{path}' gespeichert.")
+
+
+def choose_method(problem: ProblemInstance) -> str:
+    """Wählt je Instanz "monolithic" (wenige Konflikte und Operationen) oder "lbbd"."""
+    small = (len(problem.conflict_index) <= MONOLITHIC_MAX_CONFLICTS
+             and problem.arrays.num_operations <= MONOLITHIC_MAX_OPERATIONS)
+    return "monolithic" if small else "lbbd"
+
+
+def build_monolithic_model(problem: ProblemInstance, max_cycle_length: int = 3):
+    """Baut ein einzelnes, großes Gurobi-Modell für einen Lösungsversuch.
+
+    Grundlage ist das Master-Modell (z-Pfadwahl, y-Reihenfolgen mit Zeitfenster-Propagation,
+    Swap- und Zyklus-Constraints, Zielschranke für theta). Dazu kommen die Startzeiten x aller
+    Operationen mit denselben Constraints wie in den Subproblemen, über Big-M an z und y gekoppelt
+    (je Constraint das kleinste gültige M aus den Zeitfenstern, siehe bounds.BigM):
+    x[t, s] >= x[t, o] + Dauer für den gewählten Nachfolger s und x[t2, o2] >= x[t1, s1] + Release,
+    wenn (t1, o1) vor (t2, o2) liegt und s1 gewählt ist. theta ist der DISPLIB-Zielfunktionswert
+    (op_delay) über Verspätungs- und Sprungvariablen je Komponente; Komponenten auf Operationen
+    abseits des gewählten Weges kosten nichts.
+
+    Gibt Modell und x zurück; das Master-Modell hängt als _master_model am Modell.
+    """
     print("Baue monolithisches Modell...")
-    mono_model = gp.Model("Monolithic")
-    mono_model.Params.OutputFlag = 0
-    
-    x = mono_model.addVars(
-        ((train.train_id, op.op_id) for train in problem.trains for op in train.operations),
-        vtype=GRB.INTEGER, name="x"
-    )
-    
-    BIG_M = 200000
-    for train in problem.trains:
-        for op in train.operations:
-            # Hier müsste die vollständige Logik zum Bauen des monolithischen Modells implementiert werden,
-            # inklusive Pfadwahl (z-Variablen), Reihenfolge (y-Variablen) und aller Constraints.
-            # Dies ist eine sehr komplexe Aufgabe.
-            pass # Placeholder
-            
-    # Placeholder für Zielfunktion
-    mono_model.setObjective(0, GRB.MINIMIZE)
-    return mono_model, x
\ No newline at end of file
+    master = MasterModel(problem, max_cycle_length=max_cycle_length)
+    mono_model = master.model
+    mono_model.ModelName = "Monolithic"
+    stats = instrumentation.current()
+
+    with stats.timer("monolithic.build"):
+        # Ganzzahlige Startzeiten (wie in DISPLIB) in den propagierten Zeitfenstern; darauf beruhen
+        # die Big-M-Werte aus master.big_m und die Sprungkosten-Constraint unten
+        big_m = master.big_m
+        x = {}
+        for t_idx, train in enumerate(problem.trains):
+            for o_idx in range(len(train.operations)):
+                lb, ub = big_m.window(t_idx, o_idx)
+                x[t_idx, o_idx] = mono_model.addVar(lb=lb, ub=ub, vtype=GRB.INTEGER, name=f"x_{t_idx}_{o_idx}")
+
+        # Reihenfolge innerhalb eines Zuges (bei Verzweigungen nur für den gewählten Nachfolger)
+        for t_idx, train in enumerate(problem.trains):
+            for o_idx, op in enumerate(train.operations):
+                for s_idx in op.successors:
+                    z_var = master.z.get((t_idx, o_idx, s_idx))
+                    slack = big_m.precedence(t_idx, o_idx, s_idx) * (1 - z_var) if z_var is not None else 0
+                    mono_model.addConstr(x[t_idx, s_idx] >= x[t_idx, o_idx] + op.min_duration - slack)
+
+        # Ressourcenkonflikte in beiden Richtungen, je möglichem Nachfolger der ersten Operation
+        for t1, o1, t2, o2, _, max_rel1, max_rel2 in master.conflict_index:
+            for first, second, rel, y_var in (((t1, o1), (t2, o2), max_rel1, master.y[t1, o1, t2, o2]),
+                                              ((t2, o2), (t1, o1), max_rel2, master.y[t2, o2, t1, o1])):
+                t_first, o_first = first
+                for s_idx in problem.trains[t_first].operations[o_first].successors:
+                    z_var = master.z.get((t_first, o_first, s_idx))
+                    M = big_m.conflict(t_first, s_idx, rel, *second)
+                    slack = M * (1 - y_var) + (M * (1 - z_var) if z_var is not None else 0)
+                    mono_model.addConstr(x[second] >= x[t_first, s_idx] + rel - slack)
+
+        # Zielfunktion: coeff * max(0, x - threshold) + increment * [x >= threshold], nur für Operationen
+        # auf dem gewählten Weg (master.on_path, siehe MasterModel._create_path_indicators)
+        costs = []
+        for k, obj in enumerate(problem.objective_components):
+            start = x[obj.train, obj.operation]
+            on_path = master.on_path.get((obj.train, obj.operation))
+            off_path = 1 - on_path if on_path is not None else 0
+            if obj.coeff:
+                delay = mono_model.addVar(lb=0.0, name=f"obj_delay_{k}")
+                mono_model.addConstr(delay >= start - obj.threshold - big_m.delay(obj) * off_path)
+                costs.append(obj.coeff * delay)
+            if obj.increment:
+                late = mono_model.addVar(vtype=GRB.BINARY, name=f"obj_late_{k}")
+                # Startzeiten sind ganzzahlig: x < threshold heißt x <= threshold - 1
+                mono_model.addConstr(start <= obj.threshold - 1 + big_m.late(obj) * (late + off_path))
+                costs.append(obj.increment * late)
+        mono_model.addConstr(master.theta >= gp.quicksum(costs))
+        mono_model.update()
+
+    mono_model._master_model = master
+    return mono_model, x
+
+
+def solve_monolithic(problem: ProblemInstance, time_limit: float, threads: Optional[int] = None,
+                     max_cycle_length: int = 3, heuristic: Optional[str] = "fifo") -> dict:
+    """Löst die Instanz mit dem monolithischen Modell; Ergebnis mit denselben Schlüsseln wie lbbd_main.optimize.
+
+    Die Greedy-Disposition dient wie bei LBBD als MIP-Start (y/z und Startzeiten). Die Big-M-Constraints
+    lassen gleichzeitige Events zu; Reihenfolgen, deren Kanten einen Zyklus mit Gewicht 0 schließen (Tausch
+    oder Rotation im selben Zeitpunkt), haben aber keine gültige DISPLIB-Eventliste. Jede neue Lösung wird
+    daher mit der Longest-Path-Engine geprüft und ein solcher Zyklus per Lazy-Cut ausgeschlossen.
+    """
+    mono_model, x = build_monolithic_model(problem, max_cycle_length)
+    master = mono_model._master_model
+    mono_model.setParam('TimeLimit', time_limit)
+    if threads is not None: mono_model.setParam('Threads', threads)
+
+    if heuristic is not None:
+        start = GreedyDispatcher(problem, master, priority=heuristic).run()
+        if start is not None:
+            master.set_start(start)
+            for e in start.events: x[e['train'], e['operation']].Start = e['time']
+            print(f"  -> Startlösung der Greedy-Disposition ({heuristic}): {start.objective_value:.2f}")
+
+    mono_model.Params.LazyConstraints = 1
+    order_check = SubproblemLongestPath(problem, master)
+    order_vars = list(master.y.values()) + list(master.z.values())
+    first_solution = []
+    def reject_cycles(model, where):
+        if where != GRB.Callback.MIPSOL: return
+        cut = order_check.solve(dict(zip(order_vars, model.cbGetSolution(order_vars))))
+        if isinstance(cut, FeasibilityCut):
+            cut.add_to_model(model, where)
+        elif not first_solution:
+            first_solution.append(model.cbGet(GRB.Callback.RUNTIME))
+
+    with instrumentation.current().timer("monolithic.optimize"):
+        mono_model.optimize(reject_cycles)
+    print("-----------------------------------------------------------------")
+    print(f"Monolithische Optimierung beendet. Laufzeit: {mono_model.Runtime:.2f} Sekunden, Status {mono_model.Status}.")
+
+    result = {"objective": None, "events": None, "cut": None, "master": master, "bound": None,
+              "time_to_first_solution": first_solution[0] if first_solution else None,
+              "runtime": mono_model.Runtime, "cache_hits": 0, "cache_misses": 0}
+    if mono_model.SolCount == 0: return result
+    times: Dict[tuple, int] = {key: int(round(var.X)) for key, var in x.items()}
+    events = [{'train': t, 'operation': o, 'time': time} for (t, o), time in times.items()]
+    master_solution = {var: var.X for var in list(master.y.values()) + list(master.z.values())}
+    paths = master.chosen_paths(master_solution)
+    cut = OptimalityCut(problem.calculate_objective({op: times[op] for op in paths}), events, master_solution)
+    result.update(objective=cut.objective_value, events=events, cut=cut, bound=mono_model.ObjBound)
+    return result
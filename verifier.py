@@ -0,0 +1,263 @@
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+import model
+
+class VerificationResult(NamedTuple):
+    """Ergebnis der Prüfung einer Lösung: berechneter Zielfunktionswert und gefundene Verletzungen."""
+    objective: float
+    errors: List[str]
+
+    @property
+    def feasible(self) -> bool:
+        return not self.errors
+
+class _Errors:
+    """Sammelt Fehlermeldungen bis max_errors und zählt die übrigen Verletzungen nur noch."""
+    def __init__(self, max_errors: int):
+        self.messages: List[str] = []
+        self.max_errors = max_errors
+        self.skipped = 0
+
+    def report(self, mask: np.ndarray, message):
+        """Meldet message(i) für jeden Index i, an dem mask wahr ist."""
+        violations = np.flatnonzero(mask)
+        room = max(0, self.max_errors - len(self.messages))
+        self.messages.extend(message(int(i)) for i in violations[:room])
+        self.skipped += max(0, len(violations) - room)
+
+    def result(self) -> List[str]:
+        if self.skipped: return self.messages + [f"... und {self.skipped} weitere Verletzungen"]
+        return self.messages
+
+def evaluate_objective(problem: model.ProblemInstance, gids: np.ndarray, times: np.ndarray) -> float:
+    """DISPLIB-Zielfunktion (op_delay) für Startzeiten je globaler Operation (siehe InstanceArrays.gid).
+
+    Komponenten, deren Operation nicht besucht wird, tragen nichts bei; der Sprunganteil (increment)
+    fällt ab t >= threshold an (wie ObjectiveComponent.cost).
+    """
+    components = problem.objective_components
+    if not components: return 0.0
+    a = problem.arrays
+    train, op, threshold, increment, coeff = np.array(
+        [(obj.train, obj.operation, obj.threshold, obj.increment, obj.coeff) for obj in components], dtype=np.int64).T
+    start = np.full(a.num_operations, np.nan)
+    start[gids] = times
+    t = start[a.train_offsets[train] + op]
+    visited = ~np.isnan(t)
+    t, threshold, increment, coeff = t[visited], threshold[visited], increment[visited], coeff[visited]
+    cost = coeff * np.maximum(0.0, t - threshold) + np.where(t >= threshold, increment, 0)
+    return float(cost.sum())
+
+def order_events(problem: model.ProblemInstance, events: List[Dict]) -> List[Dict]:
+    """Ordnet die Events einer Lösung nach Zeit, wie verify_solution sie prüft.
+
+    Bei gleicher Zeit bleibt die Reihenfolge eines Zuges erhalten, und das Event, mit dem ein Zug
+    eine Ressource ohne Release-Zeit freigibt, steht vor dem Event, mit dem ein anderer Zug sie
+    belegt. Lässt sich das nicht erfüllen (Tausch oder Rotation im selben Zeitpunkt), bleiben die
+    übrigen Events in Listenreihenfolge; verify_solution meldet dann die Kollision.
+    """
+    a = problem.arrays
+    n = len(events)
+    train = np.fromiter((e["train"] for e in events), dtype=np.int64, count=n)
+    times = np.fromiter((e["time"] for e in events), dtype=np.float64, count=n)
+    gid = a.train_offsets[train] + np.fromiter((e["operation"] for e in events), dtype=np.int64, count=n)
+    # Vorheriges Event desselben Zuges (dessen Operation endet mit diesem Event), -1 beim ersten
+    by_train = np.lexsort((np.arange(n), times, train))
+    previous = np.full(n, -1, dtype=np.int64)
+    same = train[by_train[1:]] == train[by_train[:-1]]
+    previous[by_train[1:][same]] = by_train[:-1][same]
+
+    order = np.argsort(times, kind="stable")
+    bounds = np.flatnonzero(np.r_[True, np.diff(times[order]) != 0, True])
+    if len(bounds) - 1 == n: return [events[i] for i in order.tolist()]
+    res_ptr, res_id, res_release = a.res_ptr.tolist(), a.res_id.tolist(), a.res_release.tolist()
+    train_list, gid_list, previous_list = train.tolist(), gid.tolist(), previous.tolist()
+    result = []
+    for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        group = order[lo:hi].tolist()
+        if len(group) == 1:
+            result.append(group[0])
+            continue
+        members = set(group)
+        releases: Dict[int, List[int]] = {}
+        for e in group:
+            p = gid_list[previous_list[e]] if previous_list[e] >= 0 else -1
+            if p < 0: continue
+            for i in range(res_ptr[p], res_ptr[p + 1]):
+                if res_release[i] == 0: releases.setdefault(res_id[i], []).append(e)
+        successors: Dict[int, List[int]] = {e: [] for e in group}
+        indegree = dict.fromkeys(group, 0)
+        for f in group:
+            before = {previous_list[f]} & members
+            g = gid_list[f]
+            for i in range(res_ptr[g], res_ptr[g + 1]):
+                before.update(e for e in releases.get(res_id[i], ()) if train_list[e] != train_list[f])
+            for e in before:
+                successors[e].append(f)
+                indegree[f] += 1
+        rank = {e: k for k, e in enumerate(group)}
+        ready = [(rank[e], e) for e in group if not indegree[e]]
+        heapq.heapify(ready)
+        placed = []
+        while ready:
+            _, e = heapq.heappop(ready)
+            placed.append(e)
+            for f in successors[e]:
+                indegree[f] -= 1
+                if not indegree[f]: heapq.heappush(ready, (rank[f], f))
+        if len(placed) < len(group):
+            done = set(placed)
+            placed.extend(e for e in group if e not in done)
+        result.extend(placed)
+    return [events[i] for i in result]
+
+def verify_solution(problem: model.ProblemInstance, events: List[Dict], objective_value: Optional[float] = None,
+                    max_errors: int = 20) -> VerificationResult:
+    """Prüft eine Lösung (DISPLIB-Events) gegen die Instanz.
+
+    Geprüft werden: jeder Zug fährt einen Weg von Operation 0 über gültige Nachfolger bis zu einer
+    Operation ohne Nachfolger, start_lb/start_ub, min_duration bis zum nächsten Event des Zuges
+    sowie die exklusive Belegung der Ressourcen. Eine Operation belegt ihre Ressourcen von ihrem
+    Start bis zum Start der nächsten Operation des Zuges (die letzte bis Start plus min_duration)
+    zuzüglich der Release-Zeit. Die Events eines Zuges sind nach Zeit geordnet, bei gleicher Zeit
+    in der Reihenfolge der Liste. Übergibt ein Zug eine Ressource ohne Release-Zeit im selben
+    Zeitpunkt an einen anderen, muss sein Ende-Event in der Liste vor dem Start-Event des anderen
+    stehen (so ist auch ein Tausch im selben Zeitpunkt unzulässig). Mit objective_value wird
+    zusätzlich der angegebene Zielwert geprüft.
+
+    Alle Prüfungen laufen auf NumPy-Arrays; die Ressourcen werden je Ressource nach Startzeit
+    sortiert und in einem Durchlauf mit laufendem Maximum der Belegungsenden geprüft.
+    """
+    a = problem.arrays
+    errors = _Errors(max_errors)
+    n, num_trains = len(events), len(a.train_offsets) - 1
+    train = np.fromiter((e["train"] for e in events), dtype=np.int64, count=n)
+    op = np.fromiter((e["operation"] for e in events), dtype=np.int64, count=n)
+    times = np.fromiter((e["time"] for e in events), dtype=np.float64, count=n)
+
+    valid_train = (train >= 0) & (train < num_trains)
+    num_ops = np.diff(a.train_offsets)[np.where(valid_train, train, 0)]
+    invalid = ~valid_train | (op < 0) | (op >= num_ops)
+    errors.report(invalid, lambda i: f"Event {i}: Zug {train[i]} / Operation {op[i]} existiert nicht")
+    if invalid.any(): return VerificationResult(float('nan'), errors.result())
+
+    # Events je Zug nach Zeit ordnen (stabil bezüglich der Reihenfolge in der Liste)
+    order = np.lexsort((np.arange(n), times, train))
+    train, times, position = train[order], times[order], order
+    gid = a.train_offsets[train] + op[order]
+    same = train[1:] == train[:-1]
+    first, last = np.r_[True, ~same], np.r_[~same, True]
+
+    present = np.zeros(num_trains, dtype=bool)
+    present[train] = True
+    errors.report(~present, lambda t: f"Zug {t}: keine Events")
+    names = lambda i: f"Zug {train[i]}, Operation {gid[i] - a.train_offsets[train[i]]}"
+    errors.report(first & (gid != a.train_offsets[train]), lambda i: f"{names(i)}: erstes Event ist nicht Operation 0")
+    num_succ = np.diff(a.succ_ptr)
+    errors.report(last & (num_succ[gid] > 0), lambda i: f"{names(i)}: letztes Event hat noch Nachfolger")
+
+    # Gültige Übergänge als Schlüssel (Operation, Nachfolger) über globale Operationsindizes
+    train_of, _ = a.operation_owners()
+    src = np.repeat(np.arange(a.num_operations), num_succ)
+    edge_keys = np.unique(src * a.num_operations + a.train_offsets[train_of[src]] + a.succ_idx)
+    steps = np.flatnonzero(same)
+    bad_step = ~np.isin(gid[steps] * a.num_operations + gid[steps + 1], edge_keys)
+    errors.report(bad_step, lambda k: f"{names(steps[k])}: Operation {gid[steps[k] + 1] - a.train_offsets[train[steps[k]]]} "
+                                      f"ist kein Nachfolger")
+
+    errors.report(times < a.start_lb[gid], lambda i: f"{names(i)}: Start {times[i]:g} vor start_lb {a.start_lb[gid[i]]}")
+    errors.report(times > a.start_ub[gid], lambda i: f"{names(i)}: Start {times[i]:g} nach start_ub {a.start_ub[gid[i]]:g}")
+    duration = a.min_duration[gid]
+    short = times[steps + 1] - times[steps] < duration[steps]
+    errors.report(short, lambda k: f"{names(steps[k])}: Dauer {times[steps[k] + 1] - times[steps[k]]:g} "
+                                   f"unter min_duration {duration[steps[k]]}")
+    end = np.where(last, times + duration, np.r_[times[1:], 0.0])
+    # Position des Ende-Events in der Liste (-1: die letzte Operation endet ohne Event)
+    end_position = np.where(last, -1, np.r_[position[1:], -1])
+    _check_resources(a, gid, train, times, end, position, end_position, errors)
+
+    objective = evaluate_objective(problem, gid, times)
+    if objective_value is not None and abs(objective - objective_value) > 1e-6:
+        errors.messages.append(f"Angegebener Zielfunktionswert {objective_value:g} weicht vom berechneten {objective:g} ab")
+    return VerificationResult(objective, errors.result())
+
+def _check_resources(a: model.InstanceArrays, gid: np.ndarray, train: np.ndarray, times: np.ndarray,
+                     end: np.ndarray, position: np.ndarray, end_position: np.ndarray, errors: _Errors):
+    """Meldet Belegungen einer Ressource durch verschiedene Züge, die sich überschneiden.
+
+    Start und Ende einer Belegung werden als (Zeit, Position des Events in der Liste) verglichen:
+    Eine Übergabe im selben Zeitpunkt ist nur zulässig, wenn das Ende-Event vor dem Start-Event
+    steht. Mit Release-Zeit liegt das Ende-Event zeitlich davor und zählt nicht. Beide Paare
+    werden auf gemeinsame Ränge abgebildet.
+
+    Je Ressource nach Start sortiert: Eine Belegung kollidiert, wenn sie vor dem größten bisherigen
+    Belegungsende beginnt und dieses zu einem anderen Zug gehört. Gehört es zum selben Zug, enthält
+    dieser Zeitpunkt auch die Belegung des anderen Zuges; diese Kollision wird dann schon früher
+    gefunden. So wird jede Ressource mit Überschneidungen erkannt (gemeldet wird je Kollision der
+    Zug mit dem größten Ende).
+    """
+    counts = a.res_ptr[gid + 1] - a.res_ptr[gid]
+    if not counts.sum(): return
+    owner = np.repeat(np.arange(len(gid)), counts)
+    slot = np.repeat(a.res_ptr[gid], counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    resource, start = a.res_id[slot].astype(np.int64), times[owner]
+    release = a.res_release[slot]
+    finish = end[owner] + release
+    start_pos, finish_pos = position[owner], np.where(release > 0, -1, end_position[owner])
+
+    m = len(owner)
+    all_times, all_pos = np.r_[start, finish], np.r_[start_pos, finish_pos]
+    by_key = np.lexsort((all_pos, all_times))
+    new = np.r_[True, (np.diff(all_times[by_key]) != 0) | (np.diff(all_pos[by_key]) != 0)]
+    rank = np.empty(2 * m, dtype=np.int64)
+    rank[by_key] = np.cumsum(new) - 1
+    start_rank, finish_rank = rank[:m], rank[m:]
+
+    order = np.lexsort((start_rank, resource))
+    owner, resource, start, finish = owner[order], resource[order], start[order], finish[order]
+    start_rank, finish_rank = start_rank[order], finish_rank[order]
+
+    # Laufendes Maximum je Ressource: Ressourcen über einen Versatz trennen, der größer als jeder Rang ist
+    span = 2 * m + 1
+    key = finish_rank + resource * span
+    running = np.maximum.accumulate(key)
+    holder = np.maximum.accumulate(np.where(key >= running, np.arange(len(key)), 0))
+    clash = (start_rank[1:] < running[:-1] - resource[1:] * span) & (train[owner[holder[:-1]]] != train[owner[1:]])
+    op_of = lambda i: gid[i] - a.train_offsets[train[i]]
+    def message(k: int) -> str:
+        i, j = owner[holder[k]], owner[k + 1]
+        until = finish[holder[k]]
+        order_note = " (Ende-Event steht erst danach in der Liste)" if until == start[k + 1] else ""
+        return (f"Ressource {a.resource_names[resource[k + 1]]}: Zug {train[j]} (Operation {op_of(j)}) beginnt bei "
+                f"{start[k + 1]:g}, belegt durch Zug {train[i]} (Operation {op_of(i)}) bis {until:g}{order_note}")
+    errors.report(clash, message)
+
+def load_solution(path: str) -> dict:
+    with open(path, 'r') as f: return json.load(f)
+
+def verify_file(instance_path: str, solution_path: Optional[str] = None, max_errors: int = 20) -> VerificationResult:
+    """Prüft eine Lösungsdatei (Standard: solutions/solution_<Instanzname>) gegen ihre Instanz."""
+    if solution_path is None: solution_path = os.path.join("solutions", f"solution_{os.path.basename(instance_path)}")
+    problem = model.ProblemInstance(instance_path)
+    solution = load_solution(solution_path)
+    return verify_solution(problem, solution["events"], solution.get("objective_value"), max_errors)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prüft eine DISPLIB-Lösung gegen ihre Instanz.")
+    parser.add_argument("instance")
+    parser.add_argument("solution", nargs="?", default=None, help="Lösungsdatei (Standard: solutions/solution_<Instanz>)")
+    parser.add_argument("--max-errors", type=int, default=20, help="Höchstzahl gemeldeter Verletzungen")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = verify_file(args.instance, args.solution, args.max_errors)
+    for error in result.errors: print(f"  - {error}")
+    status = "zulässig" if result.feasible else "UNZULÄSSIG"
+    print(f"Lösung {status}, Zielfunktionswert {result.objective:g} ({time.perf_counter() - started:.2f}s inkl. Laden)")
+    sys.exit(0 if result.feasible else 1)